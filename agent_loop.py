@@ -1,54 +1,57 @@
 """
 Agent Loop: orchestrates Gate, Career Agent, Evaluator, Notification tools.
 Flow:
-1. Employer message arrives -> Telegram notification
+1. Employer message arrives -> Telegram notification (queued, off the critical path)
 2. KEYWORD CHECK (fast, no API) -> obvious risks caught instantly
-3. LLM GATE CHECK -> AI decides: "Can I answer this or should I forward to human?"
+3. GATE CHECK -> local classifier when confident, otherwise the LLM decides: "Can I answer this or should I forward to human?"
 4. If human needed: create escalation, notify Telegram, frontend polls for resolution
-5. If AI can handle: Career Agent -> Evaluator -> revise if needed -> send
+5. If AI can handle: Career Agent -> local pre-evaluator -> (LLM) Evaluator -> revise if needed -> send
+   (drafting_mode="best_of_n": N concurrent drafts, best approved wins, one revision if none pass)
+
+aprocess() is the native asyncio pipeline; process() is a thin sync wrapper.
+Gate decisions and approved responses are cached per normalized message and
+profile/prompt version (tools/response_cache.py). Each request works on one
+profile snapshot (tools/profile_store.py), so a hot reload never mixes
+versions inside a request. A local classifier
+(agents/gate_classifier.py) answers the gate when it is confident enough.
+
+aprocess(on_event=...) reports each stage as it finishes (keyword, cache,
+gate, draft start / tokens / drafted, evaluation, revision) for the streaming endpoint; the
+sink is held in a context variable so concurrent requests never mix events.
+aprocess_batch() runs deduplicated messages with bounded concurrency and
+sends one Telegram summary instead of per-message progress notifications
+(escalation alerts stay per message so they can be answered by reply).
+
+Every aprocess() call runs inside a trace (tools/tracing.py); its id is
+returned as request_id and each stage records a span for GET /trace/{id}.
 """
+import asyncio
+import copy
 import logging
-import re
-from typing import Any
+import threading
+import time
+from concurrent.futures import Future
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable
 from config import get_settings
 from agents.career_agent import CareerAgent
 from agents.evaluator_agent import EvaluatorAgent
-from agents.gate_agent import check_gate
+from agents.gate_agent import acheck_gate
+from agents.gate_classifier import GateClassifier, log_gate_decision
+from agents.pre_evaluator import PreEvaluator
 from tools.notification_tool import NotificationTool
 from tools.escalation_store import create_escalation, link_telegram_msg
+from tools.keyword_risk import RISK_PATTERNS, keyword_risk_check  # noqa: F401 (re-export)
+from tools.metrics import get_metrics
+from tools import tracing
+from tools.profile_retrieval import prompt_context
+from tools.profile_store import ProfileSnapshot, get_profile
+from tools.response_cache import ResponseCache, normalize_message
 
 logger = logging.getLogger(__name__)
 
-RISK_PATTERNS = [
-    (r"maa[sş]", "salary"),
-    (r"[üu]cret", "salary"),
-    (r"br[üu]t", "salary"),
-    (r"salary", "salary"),
-    (r"s[öo]zle[sş]me", "legal"),
-    (r"contract\b", "legal"),
-    (r"hukuk", "legal"),
-    (r"avukat", "legal"),
-    (r"non[\s-]?compete", "legal"),
-    (r"non[\s-]?disclosure", "legal"),
-    (r"fikri m[üu]lkiyet", "legal"),
-    (r"tazminat", "legal"),
-    (r"(?<!\w)nda(?!\w)", "legal"),
-]
-
-
-def keyword_risk_check(message: str) -> dict[str, Any] | None:
-    msg = (message or "").strip().lower()
-    for pattern, category in RISK_PATTERNS:
-        if re.search(pattern, msg):
-            return {
-                "is_unknown_or_unsafe": True,
-                "confidence": 0.95,
-                "reason": f"Anahtar kelime tespiti ({category})",
-                "category": category,
-                "source": "keyword",
-            }
-    return None
-
+_PROJECT_ROOT = Path(__file__).resolve().parent
 
 HUMAN_HANDOFF_RESPONSE = (
     "Mesajınız için teşekkür ederim. Bu konu, benim asistan olarak yetki alanımın "
@@ -57,15 +60,181 @@ HUMAN_HANDOFF_RESPONSE = (
 )
 
 
+EventSink = Callable[[dict[str, Any]], None]
+_event_sink: ContextVar[EventSink | None] = ContextVar("agent_event_sink", default=None)
+# Toplu islemde "yeni mesaj" / "yanit gonderildi" bildirimleri tek ozete indirgenir
+_notify_progress: ContextVar[bool] = ContextVar("agent_notify_progress", default=True)
+
+
+def _emit(stage: str, **data: Any) -> None:
+    """Send one stage event to the current request's sink (no-op without one)."""
+    sink = _event_sink.get()
+    if sink is None:
+        return
+    try:
+        sink({"stage": stage, **data})
+    except Exception as e:
+        logger.debug("Event sink failed: %s", e)
+
+
+def _link_when_sent(esc_id: str, sent: "Future[int | None]") -> None:
+    """Outbox callback: link the Telegram message_id once the alert is delivered."""
+    msg_id = sent.result()
+    if msg_id:
+        link_telegram_msg(esc_id, msg_id)
+
+
+def _trace_outcome(result: dict[str, Any]) -> str:
+    if result.get("human_intervention"):
+        return "escalated"
+    if result.get("max_revisions_reached"):
+        return "unapproved"
+    return "cached" if result.get("cached") else "approved"
+
+
+class _BackgroundLoop:
+    """Persistent event loop in a daemon thread so sync callers reuse async client pools."""
+
+    def __init__(self):
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock = threading.Lock()
+
+    def run(self, coro):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="agent-loop-sync", daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+
+_sync_runner = _BackgroundLoop()
+
+
+class _SpeculativeDraft:
+    """First career draft started concurrently with the LLM gate.
+
+    When streaming, deltas are buffered until the gate passes; take() flushes
+    the buffer to the listener and forwards the rest live.
+    """
+
+    def __init__(self, temperature: float = 0.5):
+        self.task: asyncio.Task | None = None
+        self.temperature = temperature
+        self.used = False
+        self.discarded = False
+        self.chunks: list[str] = []
+        self._listener: Callable[[str], None] | None = None
+
+    def push(self, delta: str) -> None:
+        self.chunks.append(delta)
+        if self._listener is not None:
+            self._listener(delta)
+
+    async def take(self, listener: Callable[[str], None] | None = None) -> str:
+        self.used = True
+        if listener is not None:
+            if self.chunks:
+                listener("".join(self.chunks))
+            self._listener = listener
+        return await self.task
+
+    def discard(self) -> bool:
+        """Cancel the draft if it was never used; returns True the first time."""
+        if self.used or self.discarded:
+            return False
+        self.discarded = True
+        self.task.cancel()
+        # Iptalden once biten taslagin hatasi "never retrieved" uyarisi vermesin
+        self.task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return True
+
+
+class _Counters:
+    """Pipeline counters for /stats. Updated from the server event loop and from
+    the background loop behind the sync process(), so increments take a lock."""
+
+    def __init__(self, *names: str):
+        self._lock = threading.Lock()
+        self._values = dict.fromkeys(names, 0)
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._values[name] += n
+
+    def __getitem__(self, name: str) -> int:
+        with self._lock:
+            return self._values[name]
+
+    def snapshot(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._values)
+
+
 class AgentLoop:
     def __init__(self):
         self.settings = get_settings()
         self.career_agent = CareerAgent()
         self.evaluator = EvaluatorAgent()
         self.notification = NotificationTool()
+        self.metrics = get_metrics()
+        self.stats = _Counters(
+            "speculative_drafts",
+            "speculative_drafts_wasted",
+            "gate_classifier_decisions",
+            "gate_llm_calls",
+            "pre_eval_rejected",
+            "pre_eval_approved",
+            "llm_evaluations",
+            "best_of_n_batches",
+            "best_of_n_revisions",
+            "batches",
+            "batch_items",
+            "batch_duplicates",
+        )
+        self.cache: ResponseCache | None = None
+        if self.settings.response_cache_enabled:
+            self.cache = ResponseCache(
+                self.settings.response_cache_max_entries,
+                self.settings.response_cache_ttl_seconds,
+                self.settings.evaluation_threshold,
+            )
+        self.pre_evaluator: PreEvaluator | None = None
+        if self.settings.pre_evaluator_enabled:
+            self.pre_evaluator = PreEvaluator(
+                self.settings.evaluation_threshold,
+                min_chars=self.settings.pre_evaluator_min_chars,
+                max_chars=self.settings.pre_evaluator_max_chars,
+                auto_approve=self.settings.pre_evaluator_auto_approve,
+                auto_approve_score=self.settings.pre_evaluator_auto_approve_score,
+            )
+        self.gate_classifier = self._load_gate_classifier()
+        log_path = (self.settings.gate_log_path or "").strip()
+        self._gate_log_path = str(_PROJECT_ROOT / log_path) if log_path else None
+
+    def _load_gate_classifier(self) -> GateClassifier | None:
+        if not self.settings.gate_classifier_enabled:
+            return None
+        path = _PROJECT_ROOT / self.settings.gate_classifier_path
+        try:
+            return GateClassifier.load(str(path))
+        except FileNotFoundError:
+            logger.info("Gate classifier not found (%s), using LLM gate only", path)
+        except Exception as e:
+            logger.warning("Gate classifier could not be loaded: %s", e)
+        return None
+
+    def _discard_speculative(self, draft: _SpeculativeDraft | None) -> None:
+        if draft is not None and draft.discard():
+            self.stats.incr("speculative_drafts_wasted")
 
-    def _escalate(self, employer_message: str, reason: str, category: str, source: str) -> dict[str, Any]:
-        esc_id = create_escalation(employer_message, reason, category)
+    async def _escalate(self, employer_message: str, reason: str, category: str, source: str) -> dict[str, Any]:
+        with tracing.span("escalation", source=source, category=category) as span:
+            # Gunluk yazimi event loop'u bekletmesin
+            esc_id = await asyncio.to_thread(
+                create_escalation, employer_message, reason, category, trace_id=tracing.current_trace_id()
+            )
+            span.set(escalation_id=esc_id)
+        self.metrics.escalation(source, category)
         logger.info("Escalation created: %s (%s)", esc_id, reason)
 
         unknown_result = {
@@ -76,9 +245,8 @@ class AgentLoop:
             "source": source,
         }
         try:
-            msg_id = self.notification.notify_unknown_question(reason, employer_message)
-            if msg_id:
-                link_telegram_msg(esc_id, msg_id)
+            sent = self.notification.notify_unknown_question(reason, employer_message)
+            sent.add_done_callback(lambda f: _link_when_sent(esc_id, f))
         except Exception:
             pass
 
@@ -90,95 +258,486 @@ class AgentLoop:
             "unknown_result": unknown_result,
         }
 
-    def process(self, employer_message: str, sender: str = "İşveren") -> dict[str, Any]:
-        evaluation_log: list[dict] = []
+    async def _evaluate(
+        self, employer_message: str, response_text: str, profile: ProfileSnapshot, **span_attrs: Any
+    ) -> dict[str, Any]:
+        """Local pre-evaluator first; the LLM judge only sees drafts it defers.
+
+        span_attrs (e.g. the best-of-N candidate slot) are recorded on the evaluation spans.
+        """
+        if self.pre_evaluator is not None:
+            started = time.perf_counter()
+            with tracing.span("pre_evaluation", response_chars=len(response_text), **span_attrs) as span:
+                pre = self.pre_evaluator.evaluate(employer_message, response_text, profile)
+                span.set(verdict=pre["verdict"])
+            self.metrics.observe_stage("pre_evaluation", time.perf_counter() - started)
+            if pre["verdict"] == "reject":
+                self.stats.incr("pre_eval_rejected")
+                logger.info("Pre-evaluator rejected draft: %s", pre["feedback"])
+                return pre
+            if pre["verdict"] == "approve":
+                self.stats.incr("pre_eval_approved")
+                return pre
+        self.stats.incr("llm_evaluations")
+        started = time.perf_counter()
+        try:
+            with tracing.span("evaluation", **span_attrs):
+                return await self.evaluator.aevaluate(employer_message, response_text)
+        except Exception as e:
+            logger.exception("Evaluator LLM hatası: %s", e)
+            raise RuntimeError(f"Değerlendirici çalışamadı (LLM API hatası): {e}") from e
+        finally:
+            self.metrics.observe_stage("evaluation", time.perf_counter() - started)
+
+    def process(
+        self,
+        employer_message: str,
+        sender: str = "İşveren",
+        on_event: EventSink | None = None,
+        request_id: str | None = None,
+    ) -> dict[str, Any]:
+        """Sync wrapper around aprocess(); on_event is called from the pipeline thread."""
+        return _sync_runner.run(
+            self.aprocess(employer_message, sender, on_event=on_event, request_id=request_id)
+        )
 
+    async def aprocess(
+        self,
+        employer_message: str,
+        sender: str = "İşveren",
+        on_event: EventSink | None = None,
+        notify: bool = True,
+        request_id: str | None = None,
+    ) -> dict[str, Any]:
+        """Run the pipeline; the result carries request_id (the trace id, generated if not given)."""
+        sink_token = _event_sink.set(on_event)
+        notify_token = _notify_progress.set(notify)
         try:
-            self.notification.notify_new_employer_message(employer_message, sender)
+            with tracing.trace("process", request_id, sender=sender, message_chars=len(employer_message)) as tr:
+                result = await self._process(employer_message, sender)
+                tr.outcome = _trace_outcome(result)
+            return {**result, "request_id": tr.trace_id}
+        finally:
+            _notify_progress.reset(notify_token)
+            _event_sink.reset(sink_token)
+
+    async def aprocess_batch(
+        self,
+        items: list[tuple[str, str]],
+        concurrency: int | None = None,
+    ) -> AsyncIterator[tuple[list[int], dict[str, Any] | None, Exception | None]]:
+        """
+        Process (message, sender) items; identical messages run once.
+        Yields (indices, result, error) in completion order, where indices are
+        all positions of that message in items.
+        """
+        groups: dict[str, list[int]] = {}
+        for i, (message, _) in enumerate(items):
+            groups.setdefault(normalize_message(message), []).append(i)
+        self.stats.incr("batches")
+        self.stats.incr("batch_items", len(items))
+        self.stats.incr("batch_duplicates", len(items) - len(groups))
+        # Cagiran ne isterse istesin BATCH_CONCURRENCY_MAX asilmaz
+        limit = asyncio.Semaphore(
+            min(max(1, concurrency or self.settings.batch_concurrency), self.settings.batch_concurrency_max)
+        )
+
+        async def run(indices: list[int]):
+            message, sender = items[indices[0]]
+            async with limit:
+                try:
+                    return indices, await self.aprocess(message, sender, notify=False), None
+                except Exception as e:
+                    logger.warning("Batch item %d failed: %s", indices[0], e)
+                    return indices, None, e
+
+        summary = {"items": len(items), "unique": len(groups), "responded": 0,
+                   "escalated": 0, "unapproved": 0, "errors": 0}
+        tasks = [asyncio.create_task(run(indices)) for indices in groups.values()]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                indices, result, error = await next_done
+                n = len(indices)
+                if error is not None:
+                    summary["errors"] += n
+                elif result.get("human_intervention"):
+                    summary["escalated"] += n
+                elif result.get("max_revisions_reached"):
+                    summary["unapproved"] += n
+                else:
+                    summary["responded"] += n
+                yield indices, result, error
+        finally:
+            # Istemci koptuysa kalan isler iptal edilir
+            for task in tasks:
+                task.cancel()
+        try:
+            self.notification.notify_batch_summary(summary)
         except Exception:
             pass
 
-        kw_result = keyword_risk_check(employer_message)
+    async def _process(self, employer_message: str, sender: str) -> dict[str, Any]:
+        if _notify_progress.get():
+            started = time.perf_counter()
+            with tracing.span("notification"):
+                try:
+                    self.notification.notify_new_employer_message(employer_message, sender)
+                except Exception:
+                    pass
+            self.metrics.observe_stage("notification", time.perf_counter() - started)
+
+        started = time.perf_counter()
+        with tracing.span("keyword") as span:
+            kw_result = keyword_risk_check(employer_message)
+            span.set(risk=bool(kw_result))
+        self.metrics.observe_stage("keyword", time.perf_counter() - started)
+        _emit(
+            "keyword",
+            risk=bool(kw_result),
+            reason=kw_result["reason"] if kw_result else "",
+            category=kw_result["category"] if kw_result else "safe",
+        )
         if kw_result:
             logger.info("Keyword risk detected: %s", kw_result["reason"])
-            return self._escalate(
+            return await self._escalate(
                 employer_message,
                 reason=kw_result["reason"],
                 category=kw_result["category"],
                 source="keyword",
             )
 
+        profile = get_profile()
+        cache_key = self.cache.key(employer_message, profile.version) if self.cache else None
+        if cache_key:
+            with tracing.span("cache") as span:
+                cached = self.cache.responses.get(cache_key)
+                span.set(hit=cached is not None)
+            _emit("cache", hit=cached is not None)
+            if cached is not None:
+                logger.info("Response cache hit")
+                if _notify_progress.get():
+                    try:
+                        self.notification.notify_response_sent(cached["response"][:200], employer_message[:200])
+                    except Exception:
+                        pass
+                return {**copy.deepcopy(cached), "cached": True}
+
+        draft: _SpeculativeDraft | None = None
+        if self.settings.speculative_drafting:
+            draft = _SpeculativeDraft()
+            draft.task = asyncio.create_task(self._speculate(employer_message, profile, draft))
+            self.stats.incr("speculative_drafts")
+
         try:
-            gate_result = check_gate(
-                employer_message,
-                profile_context=self.career_agent._profile_context,
-                escalation_context=self.career_agent._escalation_context,
+            return await self._gate_and_respond(employer_message, profile, draft, cache_key)
+        finally:
+            # Gate eskalasyonu, hata veya istemci iptali: kullanilmayan taslak atilir
+            self._discard_speculative(draft)
+
+    async def _speculate(self, employer_message: str, profile: ProfileSnapshot, draft: _SpeculativeDraft) -> str:
+        started = time.perf_counter()
+        try:
+            with tracing.span("draft", speculative=True, temperature=draft.temperature) as span:
+                if _event_sink.get() is None:
+                    text = await self.career_agent.agenerate_response(
+                        employer_message, profile=profile, temperature=draft.temperature
+                    )
+                else:
+                    async for delta in self.career_agent.astream_response(
+                        employer_message, profile=profile, temperature=draft.temperature
+                    ):
+                        draft.push(delta)
+                    text = "".join(draft.chunks).strip()
+                span.set(response_chars=len(text or ""))
+                return text
+        finally:
+            self.metrics.observe_stage("draft", time.perf_counter() - started)
+
+    async def _gate_and_respond(
+        self,
+        employer_message: str,
+        profile: ProfileSnapshot,
+        draft: _SpeculativeDraft | None,
+        cache_key: str | None,
+    ) -> dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            with tracing.span("gate") as span:
+                gate_source = "llm_gate"
+                gate_result = self.cache.gates.get(cache_key) if cache_key else None
+                event_source = "cache" if gate_result is not None else gate_source
+                if gate_result is None and self.gate_classifier is not None:
+                    gate_result = self.gate_classifier.decide(
+                        employer_message, self.settings.gate_classifier_threshold
+                    )
+                    if gate_result is not None:
+                        gate_source = event_source = "classifier"
+                        self.stats.incr("gate_classifier_decisions")
+                if gate_result is None:
+                    self.stats.incr("gate_llm_calls")
+                    profile_context, snippets = prompt_context(profile, employer_message)
+                    gate_result = await acheck_gate(
+                        employer_message,
+                        profile_context=profile_context,
+                        escalation_context=profile.escalation_context,
+                        snippets=snippets,
+                    )
+                    # Hata sonrasi varsayilan karar cache'lenmez / loglanmaz
+                    if not gate_result.get("fallback"):
+                        if cache_key:
+                            self.cache.gates.set(cache_key, gate_result)
+                        if self._gate_log_path:
+                            try:
+                                log_gate_decision(self._gate_log_path, employer_message, gate_result)
+                            except OSError as e:
+                                logger.warning("Gate decision log failed: %s", e)
+                span.set(
+                    source=event_source,
+                    can_respond=bool(gate_result["can_respond"]),
+                    category=gate_result.get("category", "safe"),
+                )
+            self.metrics.observe_stage("gate", time.perf_counter() - started)
+            _emit(
+                "gate",
+                can_respond=bool(gate_result["can_respond"]),
+                category=gate_result.get("category", "safe"),
+                reason=gate_result.get("reason", ""),
+                source=event_source,
             )
             if not gate_result["can_respond"]:
-                logger.info("LLM gate escalated: %s", gate_result["reason"])
-                return self._escalate(
+                logger.info("Gate escalated (%s): %s", gate_source, gate_result["reason"])
+                self._discard_speculative(draft)
+                return await self._escalate(
                     employer_message,
                     reason=gate_result["reason"],
                     category=gate_result["category"],
-                    source="llm_gate",
+                    source=gate_source,
                 )
         except Exception as e:
             logger.warning("Gate check failed, proceeding with AI: %s", e)
+            _emit("gate", can_respond=True, category="safe", reason=str(e), source="error")
+
+        if self.settings.drafting_mode == "best_of_n":
+            return await self._respond_best_of_n(employer_message, profile, draft, cache_key)
+        return await self._respond_serial(employer_message, profile, draft, cache_key)
+
+    async def _draft(
+        self,
+        employer_message: str,
+        profile: ProfileSnapshot,
+        feedback: str | None = None,
+        temperature: float = 0.5,
+        stream_attempt: int | None = None,
+    ) -> str:
+        """One career draft; with stream_attempt set and a sink active, deltas go out as token events."""
+        started = time.perf_counter()
+        try:
+            with tracing.span("draft", revision=feedback is not None, temperature=temperature) as span:
+                if stream_attempt is not None and _event_sink.get() is not None:
+                    parts: list[str] = []
+                    async for delta in self.career_agent.astream_response(
+                        employer_message, evaluator_feedback=feedback, profile=profile, temperature=temperature
+                    ):
+                        parts.append(delta)
+                        _emit("token", attempt=stream_attempt, text=delta)
+                    text = "".join(parts).strip()
+                else:
+                    text = await self.career_agent.agenerate_response(
+                        employer_message, evaluator_feedback=feedback, profile=profile, temperature=temperature
+                    )
+                span.set(response_chars=len(text or ""))
+        except Exception as e:
+            logger.exception("Career Agent LLM hatası: %s", e)
+            raise RuntimeError(f"AI yanıt üretemedi (LLM API hatası): {e}") from e
+        finally:
+            self.metrics.observe_stage("draft", time.perf_counter() - started)
+        if not (text or "").strip():
+            raise RuntimeError("AI boş yanıt üretti. API anahtarınızı kontrol edin.")
+        return text
 
-        safe_result = {
-            "is_unknown_or_unsafe": False,
-            "confidence": 1.0,
-            "reason": "",
-            "category": "safe",
-            "source": "passed",
+    @staticmethod
+    def _log_entry(
+        attempt: int, eval_result: dict[str, Any], candidate: int | None = None, temperature: float | None = None
+    ) -> dict[str, Any]:
+        entry = {
+            "attempt": attempt,
+            "total_score": eval_result.get("total_score"),
+            "scores": eval_result.get("scores"),
+            "feedback": eval_result.get("feedback"),
+            "approved": eval_result.get("approved"),
+            "evaluator": eval_result.get("source", "llm"),
         }
+        if candidate is not None:
+            entry["candidate"] = candidate
+            entry["temperature"] = temperature
+        return entry
 
+    def _final_result(
+        self,
+        employer_message: str,
+        response_text: str,
+        evaluation_log: list[dict],
+        approved: bool,
+        cache_key: str | None,
+        evaluator: str = "llm",
+    ) -> dict[str, Any]:
+        result = {
+            "response": response_text,
+            "human_intervention": False,
+            "escalation_id": None,
+            "evaluation_log": evaluation_log,
+            "unknown_result": {
+                "is_unknown_or_unsafe": False,
+                "confidence": 1.0,
+                "reason": "",
+                "category": "safe",
+                "source": "passed",
+            },
+        }
+        if not approved:
+            result["max_revisions_reached"] = True
+            self.metrics.max_revisions_reached.inc()
+            return result
+        self.metrics.approved(evaluator)
+        if _notify_progress.get():
+            try:
+                self.notification.notify_response_sent(response_text[:200], employer_message[:200])
+            except Exception:
+                pass
+        if cache_key:
+            self.cache.responses.set(cache_key, copy.deepcopy(result))
+        return result
+
+    async def _respond_serial(
+        self,
+        employer_message: str,
+        profile: ProfileSnapshot,
+        draft: _SpeculativeDraft | None,
+        cache_key: str | None,
+    ) -> dict[str, Any]:
+        """Draft -> evaluate -> revise with feedback, up to max_revision_attempts."""
+        evaluation_log: list[dict] = []
         feedback_for_revision = None
         response_text = ""
         for attempt in range(1, self.settings.max_revision_attempts + 1):
-            try:
-                response_text = self.career_agent.generate_response(
-                    employer_message, evaluator_feedback=feedback_for_revision
+            _emit("draft", attempt=attempt, candidates=1)
+            if attempt == 1 and draft is not None:
+                listener = None
+                if _event_sink.get() is not None:
+                    listener = lambda delta: _emit("token", attempt=1, text=delta)  # noqa: E731
+                try:
+                    response_text = await draft.take(listener)
+                except Exception as e:
+                    logger.exception("Career Agent LLM hatası: %s", e)
+                    raise RuntimeError(f"AI yanıt üretemedi (LLM API hatası): {e}") from e
+                if not (response_text or "").strip():
+                    raise RuntimeError("AI boş yanıt üretti. API anahtarınızı kontrol edin.")
+            else:
+                response_text = await self._draft(
+                    employer_message, profile, feedback_for_revision, stream_attempt=attempt
                 )
-            except Exception as e:
-                logger.exception("Career Agent LLM hatası: %s", e)
-                raise RuntimeError(f"AI yanıt üretemedi (LLM API hatası): {e}") from e
-
-            if not (response_text or "").strip():
-                raise RuntimeError("AI boş yanıt üretti. API anahtarınızı kontrol edin.")
+            _emit("drafted", attempt=attempt, chars=len(response_text))
 
-            try:
-                eval_result = self.evaluator.evaluate(employer_message, response_text)
-            except Exception as e:
-                logger.exception("Evaluator LLM hatası: %s", e)
-                raise RuntimeError(f"Değerlendirici çalışamadı (LLM API hatası): {e}") from e
-
-            evaluation_log.append({
-                "attempt": attempt,
-                "total_score": eval_result.get("total_score"),
-                "scores": eval_result.get("scores"),
-                "feedback": eval_result.get("feedback"),
-                "approved": eval_result.get("approved"),
-            })
+            eval_result = await self._evaluate(employer_message, response_text, profile)
+            evaluation_log.append(self._log_entry(attempt, eval_result))
+            _emit("evaluation", **evaluation_log[-1])
             if eval_result.get("approved"):
-                try:
-                    self.notification.notify_response_sent(response_text[:200], employer_message[:200])
-                except Exception:
-                    pass
-                return {
-                    "response": response_text,
-                    "human_intervention": False,
-                    "escalation_id": None,
-                    "evaluation_log": evaluation_log,
-                    "unknown_result": safe_result,
-                }
+                return self._final_result(
+                    employer_message, response_text, evaluation_log, True, cache_key,
+                    evaluator=eval_result.get("source", "llm"),
+                )
             feedback_for_revision = eval_result.get("feedback", "Yanıtı daha profesyonel ve net yap.")
+            if attempt < self.settings.max_revision_attempts:
+                self.metrics.revisions.inc()
+                _emit("revision", attempt=attempt + 1, feedback=feedback_for_revision)
 
-        return {
-            "response": response_text,
-            "human_intervention": False,
-            "escalation_id": None,
-            "evaluation_log": evaluation_log,
-            "unknown_result": safe_result,
-            "max_revisions_reached": True,
-        }
+        return self._final_result(employer_message, response_text, evaluation_log, False, cache_key)
+
+    def _best_of_n_temperatures(self) -> list[float]:
+        n = max(1, self.settings.best_of_n)
+        lo, hi = self.settings.best_of_n_min_temperature, self.settings.best_of_n_max_temperature
+        if n == 1:
+            return [(lo + hi) / 2]
+        return [round(lo + (hi - lo) * i / (n - 1), 2) for i in range(n)]
+
+    async def _respond_best_of_n(
+        self,
+        employer_message: str,
+        profile: ProfileSnapshot,
+        draft: _SpeculativeDraft | None,
+        cache_key: str | None,
+    ) -> dict[str, Any]:
+        """N concurrent drafts at varied temperatures, judged concurrently; one revision if none pass."""
+        temperatures = self._best_of_n_temperatures()
+        _emit("draft", attempt=1, candidates=len(temperatures))
+        # Spekulatif taslak (varsayilan sicaklik) adaylardan biri sayilir
+        spec_slot = len(temperatures) // 2 if draft is not None else -1
+        if draft is not None:
+            temperatures[spec_slot] = draft.temperature
+        jobs = [
+            draft.take() if i == spec_slot else self._draft(employer_message, profile, temperature=t)
+            for i, t in enumerate(temperatures)
+        ]
+        drafts = await asyncio.gather(*jobs, return_exceptions=True)
+        # (slot, sicaklik, metin): basarisiz taslak atlansa da aday kendi slotuyla anilir
+        candidates = [
+            (i, t, d) for i, (t, d) in enumerate(zip(temperatures, drafts)) if isinstance(d, str) and d.strip()
+        ]
+        _emit("drafted", attempt=1, candidates=len(candidates))
+        if not candidates:
+            err = next((d for d in drafts if isinstance(d, BaseException)), None)
+            if isinstance(err, RuntimeError):
+                raise err
+            raise RuntimeError(f"AI yanıt üretemedi (LLM API hatası): {err}")
+
+        results = await asyncio.gather(
+            *(self._evaluate(employer_message, text, profile, candidate=i, temperature=t) for i, t, text in candidates),
+            return_exceptions=True,
+        )
+        # Degerlendirmesi basarisiz aday reddedilmis sayilir; hepsi basarisizsa istek basarisiz
+        evals = [
+            {"scores": {}, "total_score": None, "feedback": str(r), "approved": False, "source": "error"}
+            if isinstance(r, BaseException) else r
+            for r in results
+        ]
+        evaluation_log = [
+            self._log_entry(1, ev, candidate=i, temperature=t) for (i, t, _), ev in zip(candidates, evals)
+        ]
+        for entry in evaluation_log:
+            _emit("evaluation", **entry)
+        scored = [
+            (text, ev) for (_, _, text), ev, r in zip(candidates, evals, results) if not isinstance(r, BaseException)
+        ]
+        if not scored:
+            err = results[0]
+            raise err if isinstance(err, RuntimeError) else RuntimeError(f"Değerlendirici çalışamadı: {err}")
+        ranked = sorted(scored, key=lambda ce: ce[1].get("total_score") or 0, reverse=True)
+        self.stats.incr("best_of_n_batches")
+
+        approved = [ce for ce in ranked if ce[1].get("approved")]
+        if approved:
+            return self._final_result(
+                employer_message, approved[0][0], evaluation_log, True, cache_key,
+                evaluator=approved[0][1].get("source", "llm"),
+            )
+
+        # Hicbiri gecmedi: en iyi adayin geri bildirimiyle tek revizyon
+        self.stats.incr("best_of_n_revisions")
+        self.metrics.revisions.inc()
+        best_text, best_eval = ranked[0]
+        feedback = best_eval.get("feedback") or "Yanıtı daha profesyonel ve net yap."
+        _emit("revision", attempt=2, feedback=feedback)
+        _emit("draft", attempt=2, candidates=1)
+        revised = await self._draft(employer_message, profile, feedback, stream_attempt=2)
+        _emit("drafted", attempt=2, chars=len(revised))
+        eval_result = await self._evaluate(employer_message, revised, profile)
+        evaluation_log.append(self._log_entry(2, eval_result))
+        _emit("evaluation", **evaluation_log[-1])
+        if eval_result.get("approved"):
+            return self._final_result(
+                employer_message, revised, evaluation_log, True, cache_key,
+                evaluator=eval_result.get("source", "llm"),
+            )
+        if (eval_result.get("total_score") or 0) >= (best_eval.get("total_score") or 0):
+            best_text = revised
+        return self._final_result(employer_message, best_text, evaluation_log, False, cache_key)
@@ -1,73 +1,32 @@
 """
 Career Response Agent (Primary Agent).
 Receives employer message, uses profile context, generates professional response.
+Profile data comes from the shared ProfileStore snapshot (tools/profile_store.py).
+With PROFILE_RETRIEVAL_ENABLED only the profile snippets relevant to the message
+are sent (tools/profile_retrieval.py).
 """
-import json
-import os
 import logging
+from functools import lru_cache
+from typing import AsyncIterator
 from config import get_settings
 from prompts.career_agent_prompts import CAREER_SYSTEM_PROMPT
-from llm.gemini_client import generate_gemini
+from llm.gemini_client import agenerate_gemini, astream_gemini, generate_gemini
+from tools.profile_store import (  # noqa: F401 (re-export)
+    ProfileSnapshot,
+    build_escalation_context,
+    build_profile_context,
+    get_profile,
+)
+from tools.profile_retrieval import prompt_context
+from tools.tracing import span
 
 logger = logging.getLogger(__name__)
 
-_PROFILE_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "profile.json")
 
-
-def _load_profile_raw() -> dict:
-    try:
-        with open(_PROFILE_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception as e:
-        logger.warning("Profile load failed: %s", e)
-        return {}
-
-
-def build_profile_context(data: dict | None = None) -> str:
-    if data is None:
-        data = _load_profile_raw()
-    cp = data.get("candidate_profile", data)
-    pi = cp.get("personal_info", {})
-    tp = cp.get("technical_profile", {})
-    proj = cp.get("projects_and_experience", [])
-    edu = cp.get("education", {})
-    prefs = pi.get("work_preferences", {})
-
-    skills_flat = []
-    for cat_skills in tp.values():
-        if isinstance(cat_skills, list):
-            skills_flat.extend(cat_skills)
-
-    proj_lines = [f"  - {p.get('domain','')}: {p.get('description','')}" for p in proj]
-
-    return "\n".join([
-        f"İsim: {pi.get('name', '')}",
-        f"Ünvan: {pi.get('title', '')}",
-        f"E-posta: {pi.get('email', '')}",
-        f"Müsaitlik: {pi.get('availability', '')}",
-        f"Yetenekler: {', '.join(skills_flat)}",
-        f"Projeler:\n" + "\n".join(proj_lines),
-        f"Eğitim: {edu.get('degree', '')}",
-        f"Tercihler: Remote={prefs.get('remote_ok','?')}, Taşınma={prefs.get('relocation','?')}, Maaş notu={prefs.get('salary_expectation_note','')}",
-    ])
-
-
-def build_escalation_context(data: dict | None = None) -> str:
-    if data is None:
-        data = _load_profile_raw()
-    cfg = data.get("ai_interview_agent_config", {})
-    triggers = cfg.get("escalation_triggers_to_human", [])
-    oos = cfg.get("out_of_scope_topics", [])
-    default_msg = cfg.get("default_handoff_message", "")
-
-    lines = ["ESKALASYON KURALLARI (bu durumlarda sen cevap verme, sahibine ilet):"]
-    for t in triggers:
-        lines.append(f"  - Tetik: {t.get('trigger','')} -> Aksiyon: {t.get('action','')}")
-    lines.append("\nKAPSAM DIŞI KONULAR (cevap verme):")
-    for o in oos:
-        lines.append(f"  - {o}")
-    lines.append(f"\nVarsayılan devir mesajı: {default_msg}")
-    return "\n".join(lines)
+@lru_cache(maxsize=4)
+def _career_system_prompt(profile_context: str) -> str:
+    # Profil versiyonu basina bir kez derlenir; saglayici prefix cache'i ayni metni gorur
+    return CAREER_SYSTEM_PROMPT.format(profile_context=profile_context)
 
 
 class CareerAgent:
@@ -75,27 +34,84 @@ class CareerAgent:
 
     def __init__(self):
         self.settings = get_settings()
-        raw = _load_profile_raw()
-        self._profile_context = build_profile_context(raw)
-        self._escalation_context = build_escalation_context(raw)
+
+    def _build_request(
+        self,
+        employer_message: str,
+        evaluator_feedback: str | None,
+        profile: ProfileSnapshot | None,
+    ) -> tuple[str, str]:
+        profile = profile or get_profile()
+        profile_context, snippets = prompt_context(profile, employer_message)
+        system = _career_system_prompt(profile_context)
+        content = f"{snippets}İşveren mesajı:\n{employer_message}"
+        if evaluator_feedback:
+            content += f"\n\nDeğerlendirici geri bildirimi (buna göre revize et): {evaluator_feedback}"
+        return system, content
 
     def generate_response(
         self,
         employer_message: str,
         evaluator_feedback: str | None = None,
+        profile: ProfileSnapshot | None = None,
+        temperature: float = 0.5,
     ) -> str:
-        system = CAREER_SYSTEM_PROMPT.format(profile_context=self._profile_context)
-        content = f"İşveren mesajı:\n{employer_message}"
-        if evaluator_feedback:
-            content += f"\n\nDeğerlendirici geri bildirimi (buna göre revize et): {evaluator_feedback}"
-        try:
-            raw = generate_gemini(
-                content,
-                system_instruction=system,
-                temperature=0.5,
-                api_key=self.settings.gemini_api_key,
-            )
-            return raw or ""
-        except Exception as e:
-            logger.exception("Career agent error: %s", e)
-            raise RuntimeError(f"LLM API hatası: {e}") from e
+        system, content = self._build_request(employer_message, evaluator_feedback, profile)
+        with span("career_agent", revision=bool(evaluator_feedback), temperature=temperature):
+            try:
+                raw = generate_gemini(
+                    content,
+                    system_instruction=system,
+                    temperature=temperature,
+                    api_key=self.settings.gemini_api_key,
+                    stage="draft",
+                )
+                return raw or ""
+            except Exception as e:
+                logger.exception("Career agent error: %s", e)
+                raise RuntimeError(f"LLM API hatası: {e}") from e
+
+    async def agenerate_response(
+        self,
+        employer_message: str,
+        evaluator_feedback: str | None = None,
+        profile: ProfileSnapshot | None = None,
+        temperature: float = 0.5,
+    ) -> str:
+        system, content = self._build_request(employer_message, evaluator_feedback, profile)
+        with span("career_agent", revision=bool(evaluator_feedback), temperature=temperature):
+            try:
+                raw = await agenerate_gemini(
+                    content,
+                    system_instruction=system,
+                    temperature=temperature,
+                    api_key=self.settings.gemini_api_key,
+                    stage="draft",
+                )
+                return raw or ""
+            except Exception as e:
+                logger.exception("Career agent error: %s", e)
+                raise RuntimeError(f"LLM API hatası: {e}") from e
+
+    async def astream_response(
+        self,
+        employer_message: str,
+        evaluator_feedback: str | None = None,
+        profile: ProfileSnapshot | None = None,
+        temperature: float = 0.5,
+    ) -> AsyncIterator[str]:
+        """Same request as agenerate_response(), yielded as provider text deltas."""
+        system, content = self._build_request(employer_message, evaluator_feedback, profile)
+        with span("career_agent", activate=False, revision=bool(evaluator_feedback), temperature=temperature):
+            try:
+                async for delta in astream_gemini(
+                    content,
+                    system_instruction=system,
+                    temperature=temperature,
+                    api_key=self.settings.gemini_api_key,
+                    stage="draft",
+                ):
+                    yield delta
+            except Exception as e:
+                logger.exception("Career agent error: %s", e)
+                raise RuntimeError(f"LLM API hatası: {e}") from e
@@ -8,7 +8,9 @@ import re
 import logging
 from config import get_settings
 from prompts.career_agent_prompts import EVALUATOR_SYSTEM_PROMPT
-from llm.gemini_client import generate_gemini
+from llm.gemini_client import agenerate_gemini, generate_gemini
+from tools.metrics import get_metrics
+from tools.tracing import span
 
 logger = logging.getLogger(__name__)
 
@@ -19,15 +21,12 @@ class EvaluatorAgent:
     def __init__(self):
         self.settings = get_settings()
         self.threshold = self.settings.evaluation_threshold
+        try:
+            self._system_prompt = EVALUATOR_SYSTEM_PROMPT.format(threshold=self.threshold)
+        except KeyError:
+            self._system_prompt = EVALUATOR_SYSTEM_PROMPT.replace("{threshold}", str(self.threshold))
 
-    def evaluate(
-        self,
-        employer_message: str,
-        generated_response: str,
-    ) -> dict:
-        """
-        Returns dict: scores, total_score, feedback, approved.
-        """
+    def _build_request(self, employer_message: str, generated_response: str) -> tuple[str, str]:
         prompt = f"""İşveren mesajı:
 {employer_message}
 
@@ -35,29 +34,16 @@ class EvaluatorAgent:
 {generated_response}
 
 Eşik (approved için total_score >= bu olmalı): {self.threshold}"""
+        return self._system_prompt, prompt
 
-        try:
-            system = EVALUATOR_SYSTEM_PROMPT.format(threshold=self.threshold)
-        except KeyError:
-            system = EVALUATOR_SYSTEM_PROMPT.replace("{threshold}", str(self.threshold))
-        try:
-            text = generate_gemini(
-                prompt,
-                system_instruction=system,
-                temperature=0.2,
-                api_key=self.settings.gemini_api_key,
-            )
-        except Exception as e:
-            logger.exception("Evaluator error: %s", e)
-            raise RuntimeError(f"Evaluator LLM hatası: {e}") from e
-
-        # Parse JSON
+    def _parse_result(self, text: str) -> dict:
         try:
             if "```" in text:
                 text = re.sub(r"^.*?```(?:json)?\s*", "", text)
                 text = re.sub(r"\s*```.*$", "", text)
             data = json.loads(text)
         except json.JSONDecodeError:
+            get_metrics().parse_fallbacks["evaluator"].inc()
             data = {
                 "scores": {"professional_tone": 70, "clarity": 70, "completeness": 70, "safety": 70, "relevance": 70},
                 "total_score": 70,
@@ -70,3 +56,51 @@ Eşik (approved için total_score >= bu olmalı): {self.threshold}"""
             total = 70
         data["approved"] = total >= self.threshold
         return data
+
+    def evaluate(
+        self,
+        employer_message: str,
+        generated_response: str,
+    ) -> dict:
+        """
+        Returns dict: scores, total_score, feedback, approved.
+        """
+        system, prompt = self._build_request(employer_message, generated_response)
+        with span("evaluator_agent", response_chars=len(generated_response)) as sp:
+            try:
+                text = generate_gemini(
+                    prompt,
+                    system_instruction=system,
+                    temperature=0.2,
+                    api_key=self.settings.gemini_api_key,
+                    stage="evaluation",
+                )
+            except Exception as e:
+                logger.exception("Evaluator error: %s", e)
+                raise RuntimeError(f"Evaluator LLM hatası: {e}") from e
+            result = self._parse_result(text)
+            sp.set(total_score=result.get("total_score"), approved=result.get("approved"))
+            return result
+
+    async def aevaluate(
+        self,
+        employer_message: str,
+        generated_response: str,
+    ) -> dict:
+        """Async variant of evaluate()."""
+        system, prompt = self._build_request(employer_message, generated_response)
+        with span("evaluator_agent", response_chars=len(generated_response)) as sp:
+            try:
+                text = await agenerate_gemini(
+                    prompt,
+                    system_instruction=system,
+                    temperature=0.2,
+                    api_key=self.settings.gemini_api_key,
+                    stage="evaluation",
+                )
+            except Exception as e:
+                logger.exception("Evaluator error: %s", e)
+                raise RuntimeError(f"Evaluator LLM hatası: {e}") from e
+            result = self._parse_result(text)
+            sp.set(total_score=result.get("total_score"), approved=result.get("approved"))
+            return result
@@ -4,8 +4,11 @@ Uses LLM to analyze the message against profile/escalation rules.
 """
 import json
 import logging
+from functools import lru_cache
 from config import get_settings
-from llm.gemini_client import generate_gemini
+from llm.gemini_client import agenerate_gemini, generate_gemini
+from tools.metrics import get_metrics
+from tools.tracing import span
 
 logger = logging.getLogger(__name__)
 
@@ -25,34 +28,97 @@ Sadece JSON döndür:
 {{"can_respond": true/false, "reason": "Kısa açıklama", "category": "safe|salary|legal|technical|personal|other"}}"""
 
 
+_GATE_FALLBACK = {"can_respond": True, "reason": "Gate analiz hatası, varsayılan izin", "category": "safe", "fallback": True}
+
+
+@lru_cache(maxsize=8)
+def _gate_system_prompt(profile_context: str, escalation_context: str) -> str:
+    """Compiled once per profile version so the provider prefix cache can reuse it."""
+    return GATE_SYSTEM_PROMPT.format(
+        escalation_context=escalation_context,
+        profile_context=profile_context,
+    )
+
+
+def _gate_prompts(
+    employer_message: str, profile_context: str, escalation_context: str, snippets: str = ""
+) -> tuple[str, str]:
+    system = _gate_system_prompt(profile_context, escalation_context)
+    # Retrieval acikken mesaja ozel profil parcalari system prompt'u degistirmeden burada gelir
+    prompt = f"{snippets}İşveren mesajı:\n{employer_message}\n\nKararın (JSON):"
+    return system, prompt
+
+
+def _parse_gate_output(raw: str) -> dict:
+    raw = raw.strip()
+    if raw.startswith("```"):
+        raw = raw.split("\n", 1)[-1].rsplit("```", 1)[0].strip()
+    result = json.loads(raw)
+    return {
+        "can_respond": bool(result.get("can_respond", True)),
+        "reason": str(result.get("reason", "")),
+        "category": str(result.get("category", "safe")),
+    }
+
+
+def _decision(raw: str) -> dict:
+    try:
+        return _parse_gate_output(raw)
+    except Exception as e:
+        get_metrics().parse_fallbacks["gate"].inc()
+        logger.warning("Gate output is not valid JSON, defaulting to AI response: %s", e)
+        return dict(_GATE_FALLBACK)
+
+
 def check_gate(
     employer_message: str,
     profile_context: str,
     escalation_context: str,
+    snippets: str = "",
 ) -> dict:
     settings = get_settings()
-    system = GATE_SYSTEM_PROMPT.format(
-        escalation_context=escalation_context,
-        profile_context=profile_context,
-    )
-    prompt = f"İşveren mesajı:\n{employer_message}\n\nKararın (JSON):"
+    system, prompt = _gate_prompts(employer_message, profile_context, escalation_context, snippets)
+    with span("gate_agent") as sp:
+        try:
+            raw = generate_gemini(
+                prompt,
+                system_instruction=system,
+                temperature=0.1,
+                api_key=settings.gemini_api_key,
+                stage="gate",
+            )
+        except Exception as e:
+            logger.warning("Gate agent failed, defaulting to AI response: %s", e)
+            sp.set(fallback="api_error")
+            return dict(_GATE_FALLBACK)
+        decision = _decision(raw)
+        if decision.get("fallback"):
+            sp.set(fallback="parse_error")
+        return decision
 
-    try:
-        raw = generate_gemini(
-            prompt,
-            system_instruction=system,
-            temperature=0.1,
-            api_key=settings.gemini_api_key,
-        )
-        raw = raw.strip()
-        if raw.startswith("```"):
-            raw = raw.split("\n", 1)[-1].rsplit("```", 1)[0].strip()
-        result = json.loads(raw)
-        return {
-            "can_respond": bool(result.get("can_respond", True)),
-            "reason": str(result.get("reason", "")),
-            "category": str(result.get("category", "safe")),
-        }
-    except Exception as e:
-        logger.warning("Gate agent failed, defaulting to AI response: %s", e)
-        return {"can_respond": True, "reason": "Gate analiz hatası, varsayılan izin", "category": "safe"}
+
+async def acheck_gate(
+    employer_message: str,
+    profile_context: str,
+    escalation_context: str,
+    snippets: str = "",
+) -> dict:
+    settings = get_settings()
+    system, prompt = _gate_prompts(employer_message, profile_context, escalation_context, snippets)
+    with span("gate_agent") as sp:
+        try:
+            raw = await agenerate_gemini(
+                prompt,
+                system_instruction=system,
+                temperature=0.1,
+                api_key=settings.gemini_api_key,
+                stage="gate",
+            )
+        except Exception as e:
+            logger.warning("Gate agent failed, defaulting to AI response: %s", e)
+            sp.set(fallback="api_error")
+            return dict(_GATE_FALLBACK)
+        decision = _decision(raw)
+        if decision.get("fallback"):
+            sp.set(fallback="parse_error")
+        return decision
@@ -0,0 +1,260 @@
+"""
+Local gate classifier (CPU-only, no extra dependencies).
+Hashed character n-grams + multinomial logistic regression over gate labels
+("safe" = AI can respond, otherwise the escalation category). AgentLoop asks
+it first and only calls the LLM gate when its confidence is below threshold.
+
+Training data: logged LLM gate decisions (GATE_LOG_PATH) + the labeled seed
+corpus in data/gate_corpus.jsonl (same row format as the log).
+Agreement is only reported on logged LLM decisions the model did not see in
+training: train --holdout keeps a share of the log aside, and the artifact
+stores digests of its training messages so evaluate skips them.
+
+Usage:
+  python -m agents.gate_classifier train [--log data/gate_decisions.jsonl] [--holdout 0.2]
+  python -m agents.gate_classifier evaluate --log data/gate_decisions.jsonl
+"""
+import argparse
+import base64
+import json
+import math
+import os
+import random
+import threading
+import time
+import zlib
+from typing import Any, Iterable
+
+from tools.response_cache import normalize_message
+
+DEFAULT_PATH = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "data", "gate_classifier.json"))
+CORPUS_PATH = os.path.normpath(os.path.join(os.path.dirname(__file__), "..", "data", "gate_corpus.jsonl"))
+SAFE = "safe"
+
+
+def featurize(text: str, dim: int, n_min: int = 2, n_max: int = 4) -> dict[int, float]:
+    """Sublinear-tf, L2-normalized hashed char n-grams of the normalized message."""
+    t = f" {normalize_message(text)} "
+    counts: dict[int, int] = {}
+    mask = dim - 1
+    for n in range(n_min, n_max + 1):
+        for i in range(len(t) - n + 1):
+            idx = zlib.crc32(t[i:i + n].encode("utf-8")) & mask
+            counts[idx] = counts.get(idx, 0) + 1
+    feats = {k: 1.0 + math.log(v) for k, v in counts.items()}
+    norm = math.sqrt(sum(v * v for v in feats.values())) or 1.0
+    return {k: v / norm for k, v in feats.items()}
+
+
+def message_digest(text: str) -> int:
+    return zlib.crc32(normalize_message(text).encode("utf-8"))
+
+
+def label_of(example: dict) -> str:
+    if example.get("can_respond", True):
+        return SAFE
+    category = str(example.get("category") or "other")
+    return "other" if category == SAFE else category
+
+
+class GateClassifier:
+    def __init__(self, classes: list[str], dim: int = 1 << 12, n_min: int = 2, n_max: int = 4):
+        assert dim & (dim - 1) == 0, "dim must be a power of two"
+        self.classes = list(classes)
+        self.dim = dim
+        self.n_min = n_min
+        self.n_max = n_max
+        self.weights: list[list[float]] = [[0.0] * dim for _ in self.classes]
+        self.bias = [0.0] * len(self.classes)
+        # Egitimde gorulen mesajlarin ozetleri; degerlendirme bunlari disarida birakir
+        self.trained_on: set[int] = set()
+
+    def _scores(self, feats: dict[int, float]) -> list[float]:
+        return [
+            b + sum(w[k] * v for k, v in feats.items())
+            for w, b in zip(self.weights, self.bias)
+        ]
+
+    @staticmethod
+    def _softmax(scores: list[float]) -> list[float]:
+        m = max(scores)
+        exps = [math.exp(s - m) for s in scores]
+        total = sum(exps)
+        return [e / total for e in exps]
+
+    def predict_proba(self, text: str) -> dict[str, float]:
+        probs = self._softmax(self._scores(featurize(text, self.dim, self.n_min, self.n_max)))
+        return dict(zip(self.classes, probs))
+
+    def predict(self, text: str) -> tuple[str, float]:
+        probs = self.predict_proba(text)
+        label = max(probs, key=probs.get)
+        return label, probs[label]
+
+    def decide(self, text: str, threshold: float) -> dict[str, Any] | None:
+        """Gate result dict if confident enough, else None (ask the LLM gate)."""
+        label, p = self.predict(text)
+        if p < threshold:
+            return None
+        return {
+            "can_respond": label == SAFE,
+            "reason": f"Yerel sınıflandırıcı kararı ({label}, p={p:.2f})",
+            "category": label,
+            "confidence": p,
+        }
+
+    def fit(self, examples: list[tuple[str, str]], epochs: int = 40, lr: float = 0.5,
+            l2: float = 1e-4, seed: int = 7) -> None:
+        rnd = random.Random(seed)
+        self.trained_on.update(message_digest(t) for t, _ in examples)
+        data = [(featurize(t, self.dim, self.n_min, self.n_max), self.classes.index(y)) for t, y in examples]
+        for epoch in range(epochs):
+            rnd.shuffle(data)
+            step = lr / (1.0 + epoch * 0.1)
+            for feats, y in data:
+                probs = self._softmax(self._scores(feats))
+                for c, p in enumerate(probs):
+                    grad = p - (1.0 if c == y else 0.0)
+                    if abs(grad) < 1e-6:
+                        continue
+                    w = self.weights[c]
+                    for k, v in feats.items():
+                        w[k] -= step * (grad * v + l2 * w[k])
+                    self.bias[c] -= step * grad
+
+    def save(self, path: str = DEFAULT_PATH) -> None:
+        """Weights are stored int8-quantized (per-class scale) to keep the artifact small."""
+        weights = []
+        for w in self.weights:
+            scale = max((abs(v) for v in w), default=0.0) / 127 or 1.0
+            q = bytes((round(v / scale) & 0xFF) for v in w)
+            weights.append({"scale": scale, "q": base64.b64encode(q).decode("ascii")})
+        payload = {
+            "format": 1,
+            "classes": self.classes,
+            "dim": self.dim,
+            "ngram": [self.n_min, self.n_max],
+            "bias": [round(b, 4) for b in self.bias],
+            "weights": weights,
+            "trained_on": sorted(self.trained_on),
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_PATH) -> "GateClassifier":
+        with open(path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        model = cls(payload["classes"], payload["dim"], *payload["ngram"])
+        model.bias = list(payload["bias"])
+        model.weights = [
+            [(b - 256 if b > 127 else b) * w["scale"] for b in base64.b64decode(w["q"])]
+            for w in payload["weights"]
+        ]
+        model.trained_on = set(payload.get("trained_on", []))
+        return model
+
+
+_log_lock = threading.Lock()
+
+
+def log_gate_decision(path: str, message: str, result: dict) -> None:
+    """Append one LLM gate decision to the JSONL training log."""
+    row = {
+        "ts": time.time(),
+        "message": message,
+        "can_respond": bool(result.get("can_respond", True)),
+        "category": result.get("category", SAFE),
+        "reason": result.get("reason", ""),
+    }
+    with _log_lock:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+def load_examples(paths: Iterable[str]) -> list[tuple[str, str]]:
+    """(message, label) pairs from JSONL gate logs."""
+    out = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                row = json.loads(line)
+                if row.get("message"):
+                    out.append((row["message"], label_of(row)))
+    return out
+
+
+def seed_corpus() -> list[tuple[str, str]]:
+    return load_examples([CORPUS_PATH])
+
+
+def held_out(model: GateClassifier, examples: list[tuple[str, str]]) -> list[tuple[str, str]]:
+    """Examples whose message the model was not trained on."""
+    return [(t, y) for t, y in examples if message_digest(t) not in model.trained_on]
+
+
+def evaluation_report(model: GateClassifier, examples: list[tuple[str, str]],
+                      thresholds: Iterable[float] = (0.6, 0.7, 0.8, 0.9, 0.95)) -> str:
+    preds = [(model.predict(t), y) for t, y in examples]
+    n = len(preds) or 1
+    agree = sum(1 for (label, _), y in preds if label == y)
+    lines = [
+        f"Örnek sayısı: {len(preds)}",
+        f"LLM gate ile genel uyum: {agree / n:.1%}",
+        "",
+        f"{'eşik':>6} {'LLM atlanan':>12} {'uyum (atlananlarda)':>20} {'yanlış güvenli':>15}",
+    ]
+    for th in thresholds:
+        covered = [(label, y) for (label, p), y in preds if p >= th]
+        ok = sum(1 for label, y in covered if label == y)
+        unsafe = sum(1 for label, y in covered if label == SAFE and y != SAFE)
+        acc = ok / len(covered) if covered else 0.0
+        lines.append(f"{th:>6.2f} {len(covered) / n:>12.1%} {acc:>20.1%} {unsafe:>15}")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(prog="python -m agents.gate_classifier")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    tr = sub.add_parser("train", help="train on seed corpus + gate logs and save the artifact")
+    tr.add_argument("--log", action="append", default=[], help="gate decision JSONL (repeatable)")
+    tr.add_argument("--out", default=DEFAULT_PATH)
+    tr.add_argument("--holdout", type=float, default=0.0, help="fraction of logged examples kept for the report")
+    tr.add_argument("--epochs", type=int, default=40)
+    ev = sub.add_parser("evaluate", help="report agreement with LLM gate labels")
+    ev.add_argument("--log", action="append", default=[])
+    ev.add_argument("--model", default=DEFAULT_PATH)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "train":
+        logged = load_examples(args.log)
+        random.Random(7).shuffle(logged)
+        cut = int(len(logged) * (1 - args.holdout))
+        train, held = seed_corpus() + logged[:cut], logged[cut:]
+        classes = [SAFE] + sorted({y for _, y in train} - {SAFE})
+        model = GateClassifier(classes)
+        model.fit(train, epochs=args.epochs)
+        model.save(args.out)
+        print(f"Model kaydedildi: {args.out} ({len(train)} örnek, sınıflar: {', '.join(classes)})")
+        held = held_out(model, held)
+        if held:
+            print(evaluation_report(model, held))
+        else:
+            print("Held-out küme yok: uyum raporlanmadı (--log ve --holdout ile loglanmış LLM kararlarını ayırın).")
+    else:
+        model = GateClassifier.load(args.model)
+        logged = load_examples(args.log)
+        held = held_out(model, logged)
+        if len(held) < len(logged):
+            print(f"Eğitimde görülen {len(logged) - len(held)} örnek rapordan çıkarıldı.")
+        if held:
+            print(evaluation_report(model, held))
+        else:
+            print("Held-out küme yok: uyum raporlanmadı (--log ile eğitimde kullanılmamış LLM kararları verin).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Deterministic pre-evaluator (runs before the LLM judge).
+Cheap rule and text-statistics checks on a career draft:
+- reject: empty / too short / too long, placeholder text, salary figures,
+  legal commitments, claims about skills that are not in the profile,
+  repeated sentences -> structured feedback for the revision loop
+- approve: clearly safe drafts with high heuristic scores (only if enabled)
+- defer: everything else goes to the LLM judge
+The result has the same shape as EvaluatorAgent._parse_result (scores,
+total_score, feedback, approved) plus "verdict" and "source".
+"""
+import re
+from functools import lru_cache
+from typing import Any
+
+from tools.keyword_risk import turkish_fold
+from tools.profile_store import ProfileSnapshot
+
+_PLACEHOLDER = re.compile(
+    r"\[[^\]\n]{0,40}(?:isim|(?<!\w)ad(?:i|iniz)?(?!\w)|şirket|tarih|saat|pozisyon|name|company|date|time|position|role|link)[^\]\n]{0,40}\]"
+    r"|\{\{?[^{}\n]{1,40}\}?\}"
+    r"|<[^<>\n]{0,40}(?:isim|(?<!\w)ad(?:i|iniz)?(?!\w)|şirket|tarih|name|company|date)[^<>\n]{0,40}>"
+    r"|\bx{3,}\b|lorem ipsum|\btodo\b|\btbd\b"
+)
+_MONEY = re.compile(
+    r"(?:₺|\$|€|£)\s?\d"
+    r"|\d[\d.,]*\s?(?:k|bin|milyon|tl|try|usd|eur|euro|dolar|lira|₺|\$|€)(?!\w)"
+    # Kelime sinirlari: "net" "internet" icinde eslesmesin; maaş/ücret ekleri serbest
+    r"|(?<!\w)(?:maaş\w*|ücret\w*|brüt|net|salary)(?!\w)\D{0,30}\d{2,}"
+)
+_LEGAL_TERM = re.compile(
+    r"sözleşme|nda(?!\w)|gizlilik|rekabet yasağ|fikri mülkiyet|tazminat|bağlilik|cezai şart|contract|non-compete"
+)
+_COMMIT = re.compile(
+    r"kabul ediyorum|kabul ederim|imzalarim|imzalayabilirim|imzaliyorum|taahhüt|onayliyorum|onaylarim"
+    r"|i accept|i agree|i will sign"
+)
+_EXPERIENCE = re.compile(
+    r"deneyim|tecrübe|kullandim|kullaniyorum|çaliştim|çalişiyorum|geliştirdim|uzman|hakim|hâkim|biliyorum"
+    r"|experience|worked with|i use|i used|proficient|expert"
+)
+_NEGATION = re.compile(
+    r"(?<!\w)(?:yok|değil|değilim|bulunmuyor|henüz|maalesef|no|not|never|haven't|don't)(?!\w)"
+)
+_POLITE = re.compile(r"teşekkür|merhaba|saygi|memnuniyet|rica|sevinirim|thank|regards|dear|hello")
+_SENTENCE = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORD = re.compile(r"\w{4,}")
+_STOPWORDS = frozenset(
+    "için olarak ancak fakat bizim sizin benim şirket merhaba teşekkür ederim rica ediyoruz "
+    "istiyoruz musunuz misiniz mısınız nedir hangi nasil this that with your have from would".split()
+)
+
+# Yaygin teknoloji adlari; profilde yoksa "deneyimim var" iddiasi reddedilir
+TECH_TERMS = (
+    "kubernetes", "k8s", "react", "react native", "angular", "vue", "golang", "rust", "kotlin", "swift",
+    "aws", "azure", "gcp", "google cloud", "terraform", "ansible", "jenkins", "kafka", "rabbitmq", "redis",
+    "mongodb", "mysql", "oracle", "elasticsearch", "graphql", "django", "flask", "node.js", "nodejs",
+    "typescript", "javascript", "php", "laravel", "ruby", "rails", "scala", "hadoop", "spark",
+    "tensorflow", "pytorch", "flutter", "unreal engine", "c++", "salesforce", "sap",
+)
+_TECH = re.compile(
+    "|".join(rf"(?<![\w.+#]){re.escape(t)}(?![\w+#])" for t in sorted(TECH_TERMS, key=len, reverse=True))
+)
+
+
+@lru_cache(maxsize=4)
+def _profile_terms(profile_context: str) -> frozenset[str]:
+    """Technology names that the profile itself mentions."""
+    return frozenset(_TECH.findall(turkish_fold(profile_context)))
+
+
+def _sentences(folded: str) -> list[str]:
+    return [s.strip() for s in _SENTENCE.split(folded) if s.strip()]
+
+
+class PreEvaluator:
+    """Microsecond-scale local checks; only ambiguous drafts reach the LLM judge."""
+
+    def __init__(
+        self,
+        threshold: int,
+        *,
+        min_chars: int = 40,
+        max_chars: int = 1500,
+        auto_approve: bool = False,
+        auto_approve_score: int = 90,
+    ):
+        self.threshold = threshold
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.auto_approve = auto_approve
+        self.auto_approve_score = auto_approve_score
+
+    def _issues(self, text: str, sentences: list[str], folded: str, profile: ProfileSnapshot) -> list[tuple[str, str]]:
+        """(criterion, feedback) pairs for hard failures."""
+        issues: list[tuple[str, str]] = []
+        length = len(text)
+        if length == 0:
+            return [("completeness", "Yanıt boş; işverenin mesajına doğrudan cevap veren bir metin yaz.")]
+        if length < self.min_chars:
+            issues.append(("completeness", f"Yanıt çok kısa ({length} karakter); soruyu eksiksiz yanıtla."))
+        if length > self.max_chars:
+            issues.append(("clarity", f"Yanıt çok uzun ({length} karakter); {self.max_chars} karakterin altında, öz yaz."))
+        m = _PLACEHOLDER.search(folded)
+        if m:
+            issues.append(("completeness", f"Yanıtta doldurulmamış yer tutucu var ('{m.group(0)}'); gerçek bilgiyle değiştir veya çıkar."))
+        if _MONEY.search(folded):
+            issues.append(("safety", "Yanıtta ücret/rakam var; maaş konusunda rakam verme, konuyu adayın kendisine bırak."))
+        for s in sentences:
+            if _LEGAL_TERM.search(s) and _COMMIT.search(s) and not _NEGATION.search(s):
+                issues.append(("safety", "Yanıtta hukuki taahhüt var; sözleşme/gizlilik konularında onay verme, adaya ilet."))
+                break
+        known = _profile_terms(profile.profile_context)
+        claimed = set()
+        for s in sentences:
+            if not _EXPERIENCE.search(s) or _NEGATION.search(s):
+                continue
+            for t in _TECH.findall(s):
+                if t not in known:
+                    claimed.add(t)
+        if claimed:
+            issues.append(("safety", f"Profilde olmayan yetenek iddiası: {', '.join(sorted(claimed))}; sadece profildeki yeteneklerden bahset."))
+        if len(sentences) >= 3 and len(set(sentences)) < len(sentences):
+            issues.append(("clarity", "Yanıtta tekrarlanan cümleler var; tekrarı kaldır."))
+        return issues
+
+    def _scores(self, employer_message: str, text: str, sentences: list[str], folded: str) -> dict[str, int]:
+        tone = 100
+        if not _POLITE.search(folded):
+            tone -= 20
+        if "!!" in text or re.search(r"\b[A-ZÇĞİÖŞÜ]{5,}\b", text):
+            tone -= 15
+
+        words = [len(s.split()) for s in sentences] or [0]
+        avg = sum(words) / len(words)
+        clarity = 100 if 6 <= avg <= 30 else 75
+
+        completeness = 100 if len(text) >= 120 else 80
+        if employer_message.count("?") > 1 and len(text) < 200:
+            completeness = 75
+
+        msg_words = {w for w in _WORD.findall(turkish_fold(employer_message)) if w not in _STOPWORDS}
+        if msg_words:
+            overlap = len(msg_words & set(_WORD.findall(folded))) / len(msg_words)
+            relevance = 60 + round(40 * min(1.0, overlap * 3))
+        else:
+            relevance = 80
+        return {
+            "professional_tone": tone,
+            "clarity": clarity,
+            "completeness": completeness,
+            "safety": 100,
+            "relevance": relevance,
+        }
+
+    def evaluate(self, employer_message: str, response: str, profile: ProfileSnapshot) -> dict[str, Any]:
+        text = (response or "").strip()
+        folded = turkish_fold(text)
+        sentences = _sentences(folded)
+        scores = self._scores(employer_message or "", text, sentences, folded)
+        issues = self._issues(text, sentences, folded, profile)
+
+        if issues:
+            for criterion, _ in issues:
+                scores[criterion] = 0
+            # Kesin hata: toplam esigin altina cekilir
+            total = min(round(sum(scores.values()) / len(scores)), self.threshold - 1)
+            return {
+                "scores": scores,
+                "total_score": total,
+                "feedback": " ".join(dict.fromkeys(f for _, f in issues)),
+                "approved": False,
+                "verdict": "reject",
+                "source": "pre_evaluator",
+            }
+
+        total = round(sum(scores.values()) / len(scores))
+        if self.auto_approve and total >= max(self.auto_approve_score, self.threshold) and scores["relevance"] >= 80:
+            return {
+                "scores": scores,
+                "total_score": total,
+                "feedback": "Yerel ön değerlendirme: kural ihlali yok, onaylandı.",
+                "approved": True,
+                "verdict": "approve",
+                "source": "pre_evaluator",
+            }
+        return {
+            "scores": scores,
+            "total_score": total,
+            "feedback": "",
+            "approved": False,
+            "verdict": "defer",
+            "source": "pre_evaluator",
+        }
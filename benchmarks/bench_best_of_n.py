@@ -0,0 +1,107 @@
+"""
+Serial revise loop vs. best-of-N drafting against a stubbed LLM.
+The stub sleeps a fixed latency per call (career draft / judge) and the judge
+approves according to a scenario, so the numbers isolate orchestration cost:
+  all_pass     every draft is approved
+  first_fails  the default-temperature first draft fails, revisions/other
+               temperatures pass
+  all_fail     nothing passes (worst case: serial = max_revision_attempts x 2 calls)
+Usage: python benchmarks/bench_best_of_n.py [--draft-ms 300] [--judge-ms 200] [--n 3]
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import agent_loop  # noqa: E402
+import agents.career_agent as career_agent  # noqa: E402
+import agents.evaluator_agent as evaluator_agent  # noqa: E402
+from config import get_settings  # noqa: E402
+
+MESSAGE = "Merhaba, FastAPI deneyiminizden bahseder misiniz? Bir de önümüzdeki hafta görüşme için müsait misiniz?"
+DRAFT = (
+    "Merhaba, mesajınız için teşekkür ederim. FastAPI ile REST API'ler geliştirdim ve PostgreSQL ile "
+    "birlikte üretim ortamında kullandım. Önümüzdeki hafta görüşme için müsaitim, uygun saatleri "
+    "paylaşırsanız sevinirim. Saygılarımla. [t={t} fb={fb}]"
+)
+SCENARIOS = ("all_pass", "first_fails", "all_fail")
+
+
+class StubLLM:
+    def __init__(self, draft_s: float, judge_s: float, scenario: str):
+        self.draft_s = draft_s
+        self.judge_s = judge_s
+        self.scenario = scenario
+        self.calls = 0
+
+    def _approve(self, draft: str) -> bool:
+        if self.scenario == "all_pass":
+            return True
+        if self.scenario == "all_fail":
+            return False
+        m = re.search(r"\[t=([\d.]+) fb=(\w+)\]", draft)
+        return bool(m) and (m.group(2) == "True" or float(m.group(1)) >= 0.6)
+
+    async def __call__(self, prompt: str, *, system_instruction=None, temperature=0.5, api_key="", model=""):
+        self.calls += 1
+        if "Üretilen yanıt:" in prompt:
+            await asyncio.sleep(self.judge_s)
+            ok = self._approve(prompt)
+            return json.dumps({
+                "scores": {k: 90 if ok else 50 for k in ("professional_tone", "clarity", "completeness", "safety", "relevance")},
+                "total_score": 90 if ok else 50,
+                "feedback": "Onay" if ok else "Daha somut örnek ver.",
+            })
+        await asyncio.sleep(self.draft_s)
+        return DRAFT.format(t=temperature, fb="geri bildirimi" in prompt)
+
+
+async def _safe_gate(*args, **kwargs):
+    return {"can_respond": True, "reason": "", "category": "safe"}
+
+
+def run(mode: str, scenario: str, draft_s: float, judge_s: float, n: int) -> dict:
+    settings = get_settings()
+    settings.telegram_bot_token = ""
+    settings.response_cache_enabled = False
+    settings.drafting_mode = mode
+    settings.best_of_n = n
+    stub = StubLLM(draft_s, judge_s, scenario)
+    career_agent.agenerate_gemini = stub
+    evaluator_agent.agenerate_gemini = stub
+    agent_loop.acheck_gate = _safe_gate
+
+    loop = agent_loop.AgentLoop()
+    loop.gate_classifier = None
+    t0 = time.perf_counter()
+    result = loop.process(MESSAGE)
+    elapsed = time.perf_counter() - t0
+    return {
+        "mode": mode,
+        "scenario": scenario,
+        "latency_s": elapsed,
+        "llm_calls": stub.calls,
+        "approved": not result.get("max_revisions_reached", False),
+        "log_entries": len(result["evaluation_log"]),
+    }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--draft-ms", type=float, default=300)
+    ap.add_argument("--judge-ms", type=float, default=200)
+    ap.add_argument("--n", type=int, default=3)
+    args = ap.parse_args()
+
+    print(f"{'scenario':<12} {'mode':<10} {'latency':>9} {'LLM calls':>10} {'approved':>9}")
+    for scenario in SCENARIOS:
+        rows = [run(mode, scenario, args.draft_ms / 1000, args.judge_ms / 1000, args.n) for mode in ("serial", "best_of_n")]
+        for r in rows:
+            print(f"{r['scenario']:<12} {r['mode']:<10} {r['latency_s']:>8.2f}s {r['llm_calls']:>10} {str(r['approved']):>9}")
+        saved = rows[0]["latency_s"] - rows[1]["latency_s"]
+        print(f"{'':<12} {'saved':<10} {saved:>8.2f}s")
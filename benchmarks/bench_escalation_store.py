@@ -0,0 +1,68 @@
+"""
+Escalation store lookup cost vs. record count: indexed store vs. legacy linear scan.
+Usage: python benchmarks/bench_escalation_store.py [--sizes 1000,10000,100000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.escalation_store import EscalationStore
+
+
+def legacy_find(store: dict, telegram_msg_id: int):
+    """The original find_by_telegram_msg_id: scan every record."""
+    for esc_id, data in store.items():
+        if data.get("telegram_msg_id") == telegram_msg_id:
+            return esc_id, data
+    return None
+
+
+def run(size: int, lookups: int = 2000, seed: int = 7) -> dict:
+    store = EscalationStore(max_resolved=size, resolved_ttl=3600)
+    t0 = time.perf_counter()
+    for i in range(size):
+        esc_id = store.create(f"mesaj {i}", "reason", "salary")
+        store.link_telegram_msg(esc_id, i)
+    t_create = time.perf_counter() - t0
+
+    rnd = random.Random(seed)
+    ids = [rnd.randrange(size) for _ in range(lookups)]
+
+    t0 = time.perf_counter()
+    for msg_id in ids:
+        store.find_by_telegram_msg_id(msg_id)
+    t_indexed = time.perf_counter() - t0
+
+    legacy_ids = ids[: max(1, lookups // 20)]
+    t0 = time.perf_counter()
+    for msg_id in legacy_ids:
+        legacy_find(store._records, msg_id)
+    t_legacy = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for esc_id in list(store._records)[: lookups]:
+        store.resolve(esc_id, "yanit", "ham")
+    t_resolve = time.perf_counter() - t0
+
+    return {
+        "records": size,
+        "create_link_us": t_create / size * 1e6,
+        "indexed_lookup_us": t_indexed / len(ids) * 1e6,
+        "legacy_lookup_us": t_legacy / len(legacy_ids) * 1e6,
+        "resolve_us": t_resolve / min(lookups, size) * 1e6,
+    }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1000,10000,100000")
+    args = ap.parse_args()
+    print(f"{'records':>8} {'create+link':>12} {'indexed':>10} {'legacy':>10} {'resolve':>10}  (us/op)")
+    for size in (int(x) for x in args.sizes.split(",")):
+        r = run(size)
+        print(f"{r['records']:>8} {r['create_link_us']:>12.2f} {r['indexed_lookup_us']:>10.2f} "
+              f"{r['legacy_lookup_us']:>10.1f} {r['resolve_us']:>10.2f}")
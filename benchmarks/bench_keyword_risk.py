@@ -0,0 +1,91 @@
+"""
+Keyword risk engine throughput: legacy per-pattern loop vs. compiled single pass.
+Usage: python benchmarks/bench_keyword_risk.py [--n 100000] [--seed 7]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.keyword_risk import RISK_PATTERNS, build_matcher
+
+SAFE_TEMPLATES = [
+    "Merhaba, CV'nizi inceledik. Sizi {day} {hour} teknik mülakata davet etmek istiyoruz.",
+    "{company} olarak backend pozisyonumuz için görüşme ayarlamak isteriz, uygun musunuz?",
+    "FastAPI ve PostgreSQL deneyiminizden bahseder misiniz? Ekibimiz {company} bünyesinde.",
+    "Unity ile multiplayer projelerinizi inceledik, {day} kısa bir tanışma yapalım mı?",
+    "Remote çalışma modelimiz var. {day} {hour} için takvim daveti gönderebilir miyiz?",
+]
+RISKY_TEMPLATES = [
+    "Brüt maaş beklentiniz nedir? {company} için {day} dönüş yapabilir misiniz?",
+    "SÖZLEŞMEDE İKİ YIL BAĞLILIK VAR, TAZMİNAT MADDESİNİ KABUL EDİYOR MUSUNUZ?",
+    "Please sign the NDA and the non-compete before {day}.",
+    "Ücret aralığımız sabit; FİKRİ MÜLKİYET devri hakkında görüşünüz nedir?",
+    "Hukuk departmanımız contract taslağını {day} iletecek.",
+    # str.lower() "İ" -> "i̇" yaptigi icin eski dongu bunu kaciriyor
+    "{company} olarak TAZMİNAT ve FİKRİ MÜLKİYET konularını {day} konuşalım.",
+]
+FILL = {
+    "day": ["Pazartesi", "Çarşamba", "Perşembe", "İleriki hafta"],
+    "hour": ["10:00", "14:00", "16:30"],
+    "company": ["ABC Teknoloji", "XYZ Yazılım", "İSTANBUL Games", "Işık Labs"],
+}
+
+
+def synthetic_messages(n: int, seed: int, risky_ratio: float = 0.2) -> list[str]:
+    rnd = random.Random(seed)
+    out = []
+    for _ in range(n):
+        pool = RISKY_TEMPLATES if rnd.random() < risky_ratio else SAFE_TEMPLATES
+        tpl = rnd.choice(pool)
+        out.append(tpl.format(**{k: rnd.choice(v) for k, v in FILL.items()}))
+    return out
+
+
+def legacy_check(message: str):
+    """The original agent_loop.keyword_risk_check loop (first category only)."""
+    msg = (message or "").strip().lower()
+    for pattern, category in RISK_PATTERNS:
+        if re.search(pattern, msg):
+            return category
+    return None
+
+
+def run(n: int, seed: int) -> dict:
+    messages = synthetic_messages(n, seed)
+    matcher = build_matcher()
+
+    t0 = time.perf_counter()
+    legacy = [legacy_check(m) for m in messages]
+    t_legacy = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    compiled = [matcher.check(m) for m in messages]
+    t_compiled = time.perf_counter() - t0
+
+    return {
+        "messages": n,
+        "legacy_msgs_per_sec": n / t_legacy,
+        "compiled_msgs_per_sec": n / t_compiled,
+        "speedup": t_legacy / t_compiled,
+        "legacy_flagged": sum(1 for r in legacy if r),
+        "compiled_flagged": sum(1 for r in compiled if r),
+        "multi_category": sum(1 for r in compiled if r and len(r["categories"]) > 1),
+    }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=100_000)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+    res = run(args.n, args.seed)
+    print(f"Messages:            {res['messages']}")
+    print(f"Legacy loop:         {res['legacy_msgs_per_sec']:,.0f} msg/s")
+    print(f"Compiled single pass:{res['compiled_msgs_per_sec']:,.0f} msg/s  (x{res['speedup']:.2f})")
+    print(f"Flagged legacy/new:  {res['legacy_flagged']} / {res['compiled_flagged']}")
+    print(f"Multi-category hits: {res['multi_category']}")
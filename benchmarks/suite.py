@@ -0,0 +1,398 @@
+"""
+Offline microbenchmarks for the CPU-side hot paths (no LLM, no network).
+pytest-benchmark style: each case is calibrated so one round lasts at least
+--min-time, then timed for --rounds rounds. Per-call min/median/mean/stddev
+and ops/s are written to a JSON file. `compare` flags cases whose median got
+slower than --threshold percent (exit code 1 when any regressed).
+
+Usage:
+  python benchmarks/suite.py run [--out benchmarks/results.json] [-k escalation] [--rounds 15]
+  python benchmarks/suite.py compare base.json new.json [--threshold 10]
+  python benchmarks/suite.py list
+
+The scenario benchmarks next to this file (bench_keyword_risk.py,
+bench_escalation_store.py, bench_best_of_n.py) compare old vs. new designs;
+this suite tracks the current code over time.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Callable
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_OUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results.json")
+
+# name -> setup(); setup returns the zero-argument callable that is timed
+CASES: dict[str, Callable[[], Callable[[], Any]]] = {}
+
+SAFE_MESSAGE = (
+    "Merhaba, CV'nizi inceledik. Sizi önümüzdeki hafta teknik mülakata davet etmek istiyoruz. "
+    "FastAPI ve PostgreSQL deneyiminizden de bahsedebilir misiniz? Çarşamba 14:00 uygun mu?"
+)
+RISKY_MESSAGE = (
+    "Brüt maaş beklentiniz nedir? Ayrıca sözleşmede iki yıl bağlılık ve rekabet yasağı maddesi var, "
+    "imzalamadan önce tazminat koşullarını kabul ediyor musunuz?"
+)
+DRAFT = (
+    "Merhaba, davetiniz için çok teşekkür ederim. Çarşamba 14:00 teknik mülakat için bana uygun. "
+    "Görüşmede FastAPI ve PostgreSQL ile geliştirdiğim projelerden bahsetmekten memnuniyet duyarım. "
+    "Saygılarımla."
+)
+EVALUATOR_OUTPUT = """```json
+{"scores": {"professional_tone": 92, "clarity": 88, "completeness": 85, "safety": 95, "relevance": 90},
+ "total_score": 90, "feedback": "Net ve profesyonel; müsaitlik açıkça belirtilmiş."}
+```"""
+GATE_OUTPUT = """```json
+{"can_respond": false, "reason": "Maaş ve sözleşme pazarlığı", "category": "salary"}
+```"""
+
+
+def case(name: str):
+    def register(setup: Callable[[], Callable[[], Any]]):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+def _profile_data() -> dict:
+    from tools.profile_store import get_profile_store
+    with open(get_profile_store().path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# --- keyword risk ---
+
+@case("keyword_risk_check.safe")
+def _keyword_safe():
+    from tools.keyword_risk import keyword_risk_check
+    keyword_risk_check(SAFE_MESSAGE)
+    return lambda: keyword_risk_check(SAFE_MESSAGE)
+
+
+@case("keyword_risk_check.risky")
+def _keyword_risky():
+    from tools.keyword_risk import keyword_risk_check
+    keyword_risk_check(RISKY_MESSAGE)
+    return lambda: keyword_risk_check(RISKY_MESSAGE)
+
+
+# --- profile / prompts ---
+
+@case("build_profile_context")
+def _profile_context():
+    from tools.profile_store import build_profile_context
+    data = _profile_data()
+    return lambda: build_profile_context(data)
+
+
+@case("profile_retrieval.select")
+def _profile_retrieval_select():
+    from tools.profile_retrieval import ProfileIndex, build_chunks, build_identity
+    data = _profile_data()
+    index = ProfileIndex(build_identity(data), build_chunks(data))
+    return lambda: index.select("Unity ile multiplayer ve PostgreSQL deneyiminizden bahseder misiniz?", 4, 400)
+
+
+@case("build_escalation_context")
+def _escalation_context():
+    from tools.profile_store import build_escalation_context
+    data = _profile_data()
+    return lambda: build_escalation_context(data)
+
+
+@case("profile_snapshot.from_bytes")
+def _snapshot_parse():
+    from tools.profile_store import ProfileSnapshot, get_profile_store
+    with open(get_profile_store().path, "rb") as f:
+        raw = f.read()
+    return lambda: ProfileSnapshot.from_bytes(raw)
+
+
+@case("prompt.career_system")
+def _career_prompt():
+    from agents.career_agent import _career_system_prompt
+    from tools.profile_store import get_profile
+    ctx = get_profile().profile_context
+    # lru_cache atlanir: format maliyetinin kendisi olculur
+    return lambda: _career_system_prompt.__wrapped__(ctx)
+
+
+@case("prompt.gate_system")
+def _gate_prompt():
+    from agents.gate_agent import _gate_system_prompt
+    from tools.profile_store import get_profile
+    snap = get_profile()
+    return lambda: _gate_system_prompt.__wrapped__(snap.profile_context, snap.escalation_context)
+
+
+@case("prompt.evaluator_request")
+def _evaluator_prompt():
+    from agents.evaluator_agent import EvaluatorAgent
+    agent = EvaluatorAgent()
+    return lambda: agent._build_request(SAFE_MESSAGE, DRAFT)
+
+
+# --- LLM output parsing ---
+
+@case("evaluator.parse_result")
+def _evaluator_parse():
+    from agents.evaluator_agent import EvaluatorAgent
+    agent = EvaluatorAgent()
+    return lambda: agent._parse_result(EVALUATOR_OUTPUT)
+
+
+@case("gate.parse_output")
+def _gate_parse():
+    from agents.gate_agent import _parse_gate_output
+    return lambda: _parse_gate_output(GATE_OUTPUT)
+
+
+# --- local models ---
+
+@case("pre_evaluator.evaluate")
+def _pre_evaluator():
+    from agents.pre_evaluator import PreEvaluator
+    from tools.profile_store import get_profile
+    pre = PreEvaluator(70)
+    profile = get_profile()
+    return lambda: pre.evaluate(SAFE_MESSAGE, DRAFT, profile)
+
+
+@case("gate_classifier.decide")
+def _gate_classifier():
+    from agents.gate_classifier import DEFAULT_PATH, GateClassifier
+    model = GateClassifier.load(DEFAULT_PATH)
+    return lambda: model.decide(SAFE_MESSAGE, 0.9)
+
+
+@case("response_cache.key")
+def _cache_key():
+    from tools.response_cache import ResponseCache
+    cache = ResponseCache(1024, 3600, 70)
+    return lambda: cache.key(SAFE_MESSAGE, "0123456789abcdef")
+
+
+@case("metrics.observe_stage")
+def _metrics_observe():
+    from tools.metrics import Metrics
+    m = Metrics()
+    return lambda: m.observe_stage("gate", 0.01)
+
+
+@case("governor.call")
+def _governor_call():
+    from llm.governor import Governor
+    gov = Governor()
+    return lambda: gov.call("openrouter", "bench", "draft", lambda: None)
+
+
+@case("hedging.call")
+def _hedging_call():
+    from llm.hedging import Hedger
+    hedger = Hedger(enabled=True, min_samples=1, budgets={"gate": 0.1}, caps={"gate": 2})
+    hedger.observe("gate", "bench", 1.0)
+    # Esik asilmayan hizli yol: sure olcumu + pencere guncellemesi
+    return lambda: hedger.call("gate", "bench", lambda: None)
+
+
+@case("router.call")
+def _router_call():
+    from llm.router import Backend, Router
+    backends = [Backend(f"b{i}", "openrouter", "k", "m") for i in range(3)]
+    router = Router(backends)
+    return lambda: router.call(backends, lambda b: b.name)
+
+
+@case("tracing.request_spans")
+def _tracing_request():
+    from tools import tracing
+
+    def run():
+        # Tipik bir istek: trace + 8 span (ring buffer sinirli)
+        with tracing.trace("process"):
+            for name in ("notification", "keyword", "gate", "gate_agent", "llm", "draft", "llm", "evaluation"):
+                with tracing.span(name, prompt_chars=100) as span:
+                    span.set(response_chars=200)
+    return run
+
+
+# --- escalation store at scale ---
+
+ESCALATION_RECORDS = 100_000
+
+
+def _filled_store():
+    from tools.escalation_store import EscalationStore
+    store = EscalationStore(max_resolved=ESCALATION_RECORDS, resolved_ttl=3600)
+    ids = []
+    for i in range(ESCALATION_RECORDS):
+        esc_id = store.create(f"mesaj {i}", "reason", "salary")
+        store.link_telegram_msg(esc_id, i)
+        ids.append(esc_id)
+    return store, ids
+
+
+@case("escalation_store.create")
+def _esc_create():
+    store, _ = _filled_store()
+    return lambda: store.create(RISKY_MESSAGE, "Maaş sorusu", "salary")
+
+
+@case("escalation_store.find_by_telegram_msg_id")
+def _esc_lookup():
+    store, _ = _filled_store()
+    msg_ids = itertools.cycle(range(0, ESCALATION_RECORDS, 7))
+    return lambda: store.find_by_telegram_msg_id(next(msg_ids))
+
+
+@case("escalation_store.resolve")
+def _esc_resolve():
+    store, ids = _filled_store()
+    esc_ids = itertools.cycle(ids)
+    return lambda: store.resolve(next(esc_ids), DRAFT, "uygunum")
+
+
+# --- HTTP response sanitisation ---
+
+@case("main.response_body")
+def _response_body():
+    from main import _response_body
+    result = {
+        "response": DRAFT,
+        "human_intervention": False,
+        "escalation_id": None,
+        "evaluation_log": [
+            {"attempt": i, "total_score": 60 + 10 * i, "scores": {"clarity": 80}, "feedback": "Daha net ol.",
+             "approved": i == 3, "evaluator": "llm"}
+            for i in range(1, 4)
+        ],
+        "unknown_result": {"is_unknown_or_unsafe": False, "confidence": 1.0, "reason": "", "category": "safe"},
+    }
+    return lambda: _response_body(result)
+
+
+def measure(fn: Callable[[], Any], rounds: int = 15, min_time: float = 0.01) -> dict[str, Any]:
+    """Calibrate iterations per round to reach min_time, then time `rounds` rounds."""
+    number = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_time or number >= 1 << 24:
+            break
+        number = max(number * 2, int(number * min_time / max(elapsed, 1e-9)))
+    per_call = []
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        per_call.append((time.perf_counter() - t0) / number)
+    median = statistics.median(per_call)
+    return {
+        "rounds": rounds,
+        "iterations": number,
+        "min_s": min(per_call),
+        "median_s": median,
+        "mean_s": statistics.fmean(per_call),
+        "stddev_s": statistics.stdev(per_call) if rounds > 1 else 0.0,
+        "ops_per_s": 1.0 / median if median else 0.0,
+    }
+
+
+def run(selected: list[str] | None = None, rounds: int = 15, min_time: float = 0.01) -> dict[str, Any]:
+    results = {}
+    for name, setup in CASES.items():
+        if selected and not any(k in name for k in selected):
+            continue
+        results[name] = measure(setup(), rounds, min_time)
+    return {
+        "machine": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+        },
+        "timestamp": time.time(),
+        "benchmarks": results,
+    }
+
+
+def compare(base: dict[str, Any], new: dict[str, Any], threshold: float = 10.0) -> list[dict[str, Any]]:
+    """Per-case median change in percent; 'regressed' when slower than threshold."""
+    rows = []
+    for name, b in base["benchmarks"].items():
+        n = new["benchmarks"].get(name)
+        if n is None:
+            continue
+        change = (n["median_s"] / b["median_s"] - 1.0) * 100 if b["median_s"] else 0.0
+        rows.append({
+            "name": name,
+            "base_s": b["median_s"],
+            "new_s": n["median_s"],
+            "change_pct": round(change, 1),
+            "regressed": change > threshold,
+        })
+    return rows
+
+
+def _fmt(seconds: float) -> str:
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds * 1e6:.2f}µs"
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(prog="python benchmarks/suite.py")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    r = sub.add_parser("run", help="run the suite and write JSON results")
+    r.add_argument("--out", default=DEFAULT_OUT)
+    r.add_argument("-k", action="append", default=[], help="substring filter on case names (repeatable)")
+    r.add_argument("--rounds", type=int, default=15)
+    r.add_argument("--min-time", type=float, default=0.01, help="minimum seconds per round")
+    c = sub.add_parser("compare", help="compare two result files")
+    c.add_argument("base")
+    c.add_argument("new")
+    c.add_argument("--threshold", type=float, default=10.0, help="allowed median slowdown in percent")
+    sub.add_parser("list", help="list case names")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "list":
+        print("\n".join(CASES))
+        return 0
+    if args.cmd == "run":
+        report = run(args.k, args.rounds, args.min_time)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"{'benchmark':<42} {'median':>10} {'min':>10} {'stddev':>10} {'ops/s':>12}")
+        for name, m in report["benchmarks"].items():
+            print(f"{name:<42} {_fmt(m['median_s']):>10} {_fmt(m['min_s']):>10} "
+                  f"{_fmt(m['stddev_s']):>10} {m['ops_per_s']:>12,.0f}")
+        print(f"\nSonuçlar: {args.out}")
+        return 0
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    rows = compare(base, new, args.threshold)
+    print(f"{'benchmark':<42} {'base':>10} {'new':>10} {'change':>9}")
+    for row in rows:
+        flag = "  REGRESSION" if row["regressed"] else ""
+        print(f"{row['name']:<42} {_fmt(row['base_s']):>10} {_fmt(row['new_s']):>10} {row['change_pct']:>+8.1f}%{flag}")
+    regressed = [row["name"] for row in rows if row["regressed"]]
+    if regressed:
+        print(f"\n{len(regressed)} benchmark %{args.threshold:g} eşiğinin üzerinde yavaşladı.")
+        return 1
+    print(f"\nRegresyon yok (eşik %{args.threshold:g}).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
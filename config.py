@@ -1,5 +1,6 @@
 """Configuration for Career Assistant AI Agent."""
 from pathlib import Path
+from typing import Any
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 
@@ -19,8 +20,125 @@ class Settings(BaseSettings):
     gemini_api_key: str = ""
     telegram_bot_token: str = ""
     telegram_chat_id: str = ""
+    telegram_outbox_size: int = 500
+    telegram_max_retries: int = 5
+    telegram_reply_workers: int = 4
+    telegram_reply_queue: int = 32
+    telegram_state_path: str = "data/telegram_state.json"
+    profile_path: str = "data/profile.json"
+    # profile.json degisikligi en fazla bu aralikla kontrol edilir (hot reload)
+    profile_check_interval_seconds: float = 1.0
+    # Tum profil yerine mesajla ilgili profil parcalari (tools/profile_retrieval.py, BM25)
+    profile_retrieval_enabled: bool = False
+    profile_retrieval_top_k: int = 4
+    profile_retrieval_token_budget: int = 400
     evaluation_threshold: int = 70
     max_revision_attempts: int = 3
+    # Yerel on degerlendirici: bariz hatalari LLM judge'a gitmeden reddeder
+    pre_evaluator_enabled: bool = True
+    pre_evaluator_auto_approve: bool = False
+    pre_evaluator_auto_approve_score: int = 90
+    pre_evaluator_min_chars: int = 40
+    pre_evaluator_max_chars: int = 1500
+    escalation_max_resolved: int = 10_000
+    escalation_resolved_ttl_seconds: int = 24 * 3600
+    # Asilinca en eski cevaplanmamis eskalasyon dusurulur
+    escalation_max_pending: int = 10_000
+    # Telegram dinleyicisi calisirken eskalasyon degisiklikleri bu gunluge eklenir
+    escalation_state_path: str = "data/escalations.jsonl"
+    response_cache_enabled: bool = True
+    response_cache_max_entries: int = 1024
+    response_cache_ttl_seconds: int = 3600
+    # "serial": taslak -> degerlendirme -> revizyon dongusu
+    # "best_of_n": N taslak farkli sicakliklarla paralel, en iyi onayli kazanir
+    drafting_mode: str = "serial"
+    best_of_n: int = 3
+    best_of_n_min_temperature: float = 0.3
+    best_of_n_max_temperature: float = 0.9
+    # Gate ve ilk taslak ayni anda baslar; gate eskale ederse taslak atilir
+    speculative_drafting: bool = False
+    # POST /process/batch: ayni anda islenen tekil mesaj sayisi ve istek basina ust sinir
+    batch_concurrency: int = 4
+    batch_concurrency_max: int = 16
+    batch_max_items: int = 500
+    # Yerel gate siniflandiricisi; esigin altinda LLM gate'e dusulur
+    gate_classifier_enabled: bool = True
+    gate_classifier_path: str = "data/gate_classifier.json"
+    gate_classifier_threshold: float = 0.9
+    # Bos degilse LLM gate kararlari JSONL olarak yazilir (egitim verisi)
+    gate_log_path: str = ""
+
+    # GET /metrics (prometheus_client); coklu worker icin PROMETHEUS_MULTIPROC_DIR ayarlanir
+    metrics_enabled: bool = True
+    # GET /trace/{id}: son N istegin span kayitlari; yol bossa JSONL disa aktarimi kapali
+    tracing_enabled: bool = True
+    trace_buffer_size: int = 1000
+    trace_export_path: str = ""
+    trace_export_max_bytes: int = 10 * 1024 * 1024
+    trace_export_backups: int = 3
+
+    # LLM connection pool
+    openrouter_base_url: str = "https://openrouter.ai/api/v1"
+    llm_pool_max_connections: int = 20
+    llm_pool_max_keepalive: int = 10
+    llm_keepalive_expiry: float = 30.0
+    llm_connect_timeout: float = 10.0
+    llm_read_timeout: float = 60.0
+    # Onbellekte tutulan en fazla client (LRU)
+    llm_pool_max_clients: int = 64
+    # LLM yuk yonetimi (llm/governor.py): AIMD es zamanlilik, token bucket, Retry-After
+    llm_governor_enabled: bool = True
+    llm_initial_concurrency: int = 8
+    llm_min_concurrency: int = 1
+    llm_max_concurrency: int = 32
+    llm_latency_target_seconds: float = 20.0
+    # Saniyede istek; 0 = sinirsiz
+    llm_model_rps: float = 0.0
+    llm_provider_rps: float = 0.0
+    llm_rate_burst: int = 10
+    llm_rate_limit_retries: int = 2
+    llm_default_retry_after_seconds: float = 2.0
+    llm_queue_timeout_seconds: float = 60.0
+    # Hedged istekler (llm/hedging.py): ogrenilen yuzdelik gecilince ikinci istek; varsayilan kapali
+    llm_hedging_enabled: bool = False
+    llm_hedge_percentile: float = 0.95
+    llm_hedge_min_samples: int = 20
+    llm_hedge_window: int = 256
+    # Asama basina hedge edilebilecek cagri orani ve ayni anda en fazla hedge (env'de JSON)
+    llm_hedge_budget: dict[str, float] = {"gate": 0.1, "draft": 0.05, "evaluation": 0.1, "professionalize": 0.2}
+    llm_hedge_cap: dict[str, int] = {"gate": 4, "draft": 2, "evaluation": 4, "professionalize": 2}
+    # Coklu backend yonlendirme (llm/router.py); bos ise GEMINI_API_KEY'in tek backend'i
+    # JSON liste: [{"name", "provider", "base_url", "api_key", "model"}, ...]
+    llm_backends: list[dict[str, str]] = []
+    llm_router_ewma_alpha: float = 0.3
+    llm_breaker_failures: int = 3
+    llm_breaker_open_seconds: float = 30.0
+    # Asama basina model profili (llm/profiles.py); model: ad veya {backend adi: model}
+    # gate/evaluation kucuk model, draft daha buyuk model; temperature bos ise cagirani kullanir
+    llm_stage_profiles: dict[str, dict[str, Any]] = {
+        "gate": {
+            "model": {"openrouter": "google/gemini-2.0-flash-lite-001", "gemini": "gemini-1.5-flash-8b"},
+            "max_tokens": 200,
+            "temperature": 0.1,
+            "timeout": 15,
+        },
+        "evaluation": {
+            "model": {"openrouter": "google/gemini-2.0-flash-lite-001", "gemini": "gemini-1.5-flash-8b"},
+            "max_tokens": 512,
+            "temperature": 0.2,
+            "timeout": 20,
+        },
+        "draft": {
+            "model": {"openrouter": "google/gemini-2.0-flash-001", "gemini": "gemini-1.5-flash"},
+            "max_tokens": 1024,
+            "timeout": 45,
+        },
+        "professionalize": {"max_tokens": 600, "temperature": 0.3, "timeout": 30},
+    }
+    # Statik system prompt'lar icin saglayici tarafi prefix cache
+    llm_prefix_cache: bool = True
+    gemini_cache_ttl_seconds: int = 3600
+    gemini_cache_refresh_margin_seconds: int = 300
 
     model_config = {
         "env_file": _ENV_FILE if _ENV_FILE.exists() else None,
@@ -1,3 +1,3 @@
-from .gemini_client import generate_gemini
+from .gemini_client import agenerate_gemini, astream_gemini, generate_gemini, stream_gemini
 
-__all__ = ["generate_gemini"]
+__all__ = ["agenerate_gemini", "astream_gemini", "generate_gemini", "stream_gemini"]
@@ -0,0 +1,260 @@
+"""
+Pooled LLM client registry.
+OpenRouter (OpenAI-compatible) clients are cached per (provider, api_key,
+base_url); model and system prompt are passed per call, so every stage of a
+request reuses the same client and keep-alive httpx pool (same TLS connection).
+Gemini GenerativeModel objects are bound to a model and system instruction by
+the SDK and are cached per (api_key, model, system_instruction). Both caches
+are LRU-bounded (LLM_POOL_MAX_CLIENTS).
+The Gemini SDK owns its transport: the pool limits and connect timeout do not
+apply to it; only the read timeout is passed per call (request_options).
+"""
+import asyncio
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ClientKey:
+    provider: str
+    api_key: str
+    base_url: str = ""
+
+
+class ConnectionStats:
+    """Counts new vs. reused TCP/TLS connections seen by a transport."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seen: "weakref.WeakSet[Any]" = weakref.WeakSet()
+        self.requests = 0
+        self.new_connections = 0
+        self.reused_connections = 0
+
+    def observe(self, network_stream: Any) -> None:
+        with self._lock:
+            self.requests += 1
+            if network_stream is None:
+                return
+            if network_stream in self._seen:
+                self.reused_connections += 1
+            else:
+                self._seen.add(network_stream)
+                self.new_connections += 1
+
+    def snapshot(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "new_connections": self.new_connections,
+                "reused_connections": self.reused_connections,
+            }
+
+
+class _CountingTransport(httpx.HTTPTransport):
+    def __init__(self, stats: ConnectionStats, **kwargs):
+        super().__init__(**kwargs)
+        self._stats = stats
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        response = super().handle_request(request)
+        self._stats.observe(response.extensions.get("network_stream"))
+        return response
+
+
+class _AsyncCountingTransport(httpx.AsyncHTTPTransport):
+    def __init__(self, stats: ConnectionStats, **kwargs):
+        super().__init__(**kwargs)
+        self._stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await super().handle_async_request(request)
+        self._stats.observe(response.extensions.get("network_stream"))
+        return response
+
+
+class ClientRegistry:
+    """Thread-safe cache of provider clients backed by pooled connections."""
+
+    def __init__(
+        self,
+        *,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        connect_timeout: float = 10.0,
+        read_timeout: float = 60.0,
+        openrouter_base_url: str = "https://openrouter.ai/api/v1",
+        max_clients: int = 64,
+    ):
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.read_timeout = read_timeout
+        self._openrouter_base_url = openrouter_base_url
+        self._max_clients = max(1, max_clients)
+        self._lock = threading.Lock()
+        self._clients: "OrderedDict[Any, Any]" = OrderedDict()
+        self._http_pools: dict[tuple[str, str], httpx.Client] = {}
+        # Async pools are bound to the event loop that created them
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = weakref.WeakKeyDictionary()
+        self._async_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = weakref.WeakKeyDictionary()
+        self._conn_stats: dict[str, ConnectionStats] = {}
+        self._gemini_configured_key: str | None = None
+        self.hits = 0
+        self.misses = 0
+
+    def _stats_for(self, provider: str) -> ConnectionStats:
+        stats = self._conn_stats.get(provider)
+        if stats is None:
+            stats = self._conn_stats[provider] = ConnectionStats()
+        return stats
+
+    def _cached_locked(self, clients: "OrderedDict[Any, Any]", key: Any) -> Any:
+        client = clients.get(key)
+        if client is None:
+            self.misses += 1
+            return None
+        clients.move_to_end(key)
+        self.hits += 1
+        return client
+
+    def _store_locked(self, clients: "OrderedDict[Any, Any]", key: Any, client: Any) -> None:
+        clients[key] = client
+        # En uzun suredir kullanilmayan client atilir; httpx havuzu paylasimli kalir
+        while len(clients) > self._max_clients:
+            clients.popitem(last=False)
+
+    def _http_pool(self, provider: str, api_key: str) -> httpx.Client:
+        pool = self._http_pools.get((provider, api_key))
+        if pool is None:
+            transport = _CountingTransport(self._stats_for(provider), limits=self._limits)
+            pool = httpx.Client(transport=transport, timeout=self._timeout)
+            self._http_pools[(provider, api_key)] = pool
+        return pool
+
+    def openrouter(self, api_key: str, base_url: str = "") -> OpenAI:
+        key = ClientKey("openrouter", api_key, base_url)
+        with self._lock:
+            client = self._cached_locked(self._clients, key)
+            if client is not None:
+                return client
+            client = OpenAI(
+                base_url=base_url or self._openrouter_base_url,
+                api_key=api_key,
+                http_client=self._http_pool("openrouter", api_key),
+                timeout=self._timeout,
+            )
+            self._store_locked(self._clients, key, client)
+            return client
+
+    def async_openrouter(self, api_key: str, base_url: str = "") -> AsyncOpenAI:
+        """Async client for the running event loop; must be called from a coroutine."""
+        loop = asyncio.get_running_loop()
+        key = ClientKey("openrouter", api_key, base_url)
+        with self._lock:
+            clients = self._async_clients.setdefault(loop, OrderedDict())
+            client = self._cached_locked(clients, key)
+            if client is not None:
+                return client
+            pools = self._async_pools.setdefault(loop, {})
+            pool = pools.get(("openrouter", api_key))
+            if pool is None:
+                transport = _AsyncCountingTransport(self._stats_for("openrouter_async"), limits=self._limits)
+                pool = pools[("openrouter", api_key)] = httpx.AsyncClient(transport=transport, timeout=self._timeout)
+            client = AsyncOpenAI(
+                base_url=base_url or self._openrouter_base_url,
+                api_key=api_key,
+                http_client=pool,
+                timeout=self._timeout,
+            )
+            self._store_locked(clients, key, client)
+            return client
+
+    def gemini(self, api_key: str, model: str, system_instruction: str | None) -> Any:
+        import google.generativeai as genai
+
+        key = ("gemini", api_key, model, system_instruction or "")
+        with self._lock:
+            gen_model = self._cached_locked(self._clients, key)
+            if gen_model is not None:
+                return gen_model
+            self._configure_gemini_locked(api_key)
+            kwargs = {}
+            if system_instruction:
+                kwargs["system_instruction"] = system_instruction
+            gen_model = genai.GenerativeModel(model, **kwargs)
+            self._store_locked(self._clients, key, gen_model)
+            return gen_model
+
+    def _configure_gemini_locked(self, api_key: str) -> None:
+        import google.generativeai as genai
+
+        # genai.configure global bir client olusturur; sadece key degisince cagir
+        if self._gemini_configured_key != api_key:
+            genai.configure(api_key=api_key)
+            self._gemini_configured_key = api_key
+
+    def configure_gemini(self, api_key: str) -> None:
+        with self._lock:
+            self._configure_gemini_locked(api_key)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "clients": len(self._clients) + sum(len(c) for c in self._async_clients.values()),
+                "client_hits": self.hits,
+                "client_misses": self.misses,
+                "connections": {p: s.snapshot() for p, s in self._conn_stats.items()},
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            for pool in self._http_pools.values():
+                try:
+                    pool.close()
+                except Exception:
+                    pass
+            self._http_pools.clear()
+            self._clients.clear()
+
+    async def aclose(self) -> None:
+        """Close the async pools owned by the running event loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            pools = self._async_pools.pop(loop, {})
+            self._async_clients.pop(loop, None)
+        for pool in pools.values():
+            try:
+                await pool.aclose()
+            except Exception:
+                pass
+
+
+@lru_cache()
+def get_registry() -> ClientRegistry:
+    s = get_settings()
+    return ClientRegistry(
+        max_connections=s.llm_pool_max_connections,
+        max_keepalive_connections=s.llm_pool_max_keepalive,
+        keepalive_expiry=s.llm_keepalive_expiry,
+        connect_timeout=s.llm_connect_timeout,
+        read_timeout=s.llm_read_timeout,
+        openrouter_base_url=s.openrouter_base_url,
+        max_clients=s.llm_pool_max_clients,
+    )
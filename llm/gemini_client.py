@@ -1,15 +1,159 @@
 """
 LLM client - OpenRouter (OpenAI-compatible) veya Gemini.
-API key sk-or- ile basliyorsa OpenRouter, diger durumlarda Gemini kullanir.
+API key sk-or- ile basliyorsa OpenRouter, diger durumlarda Gemini kullanir;
+LLM_BACKENDS tanimliysa cagri en hizli saglikli backend'e yonlendirilir ve
+hata durumunda siradakine gecilir (llm/router.py, circuit breaker).
+Clients come from the pooled registry in llm/client_pool.py.
+agenerate_gemini is the native asyncio variant used by the async pipeline;
+stream_gemini / astream_gemini yield text deltas for streaming endpoints.
+System instructions go through the provider prefix cache (llm/prefix_cache.py).
+Every call is timed into the per provider/model histogram (tools/metrics.py)
+and recorded as an "llm" span of the current request trace (tools/tracing.py).
+Calls run under the adaptive load governor (llm/governor.py); stage selects
+the queue priority (professionalize > gate > evaluation > draft). Non-streaming
+calls may be hedged per stage (llm/hedging.py, opt-in). stage also selects the
+model, max output tokens, temperature and timeout (llm/profiles.py) and keys
+the per-stage latency/token report.
 """
+import asyncio
 import logging
-from typing import Optional
-from openai import OpenAI
+import time
+from typing import AsyncIterator, Iterator, Optional
+from llm.client_pool import get_registry
+from llm.governor import get_governor
+from llm.hedging import get_hedger
+from llm.prefix_cache import get_prefix_cache
+from llm.profiles import CallOptions, get_stage_report, stage_profile
+from llm.router import Backend, get_router, is_backend_failure
 
 logger = logging.getLogger(__name__)
 
-OPENROUTER_BASE = "https://openrouter.ai/api/v1"
 OPENROUTER_MODEL = "google/gemini-2.0-flash-lite-001"
+GEMINI_MODEL = "gemini-1.5-flash"
+
+
+def _resolve_api_key(api_key: str) -> str:
+    if not api_key:
+        from config import get_settings
+        api_key = (get_settings().gemini_api_key or "").strip()
+    if not api_key:
+        raise ValueError("API key tanimli degil (.env GEMINI_API_KEY)")
+    return api_key
+
+
+def _backends(api_key: str, model: str) -> list[Backend]:
+    """LLM_BACKENDS if configured, else the single backend implied by the key prefix."""
+    router = get_router()
+    if router.backends:
+        return router.backends
+    api_key = _resolve_api_key(api_key)
+    provider, resolved = _provider_model(api_key, model)
+    return [Backend(provider, provider, api_key, resolved)]
+
+
+def _build_messages(prompt: str, system_instruction: Optional[str]) -> list[dict]:
+    return get_prefix_cache().openrouter_messages(prompt, system_instruction)
+
+
+def _gemini_model(api_key: str, model: str, system_instruction: Optional[str]):
+    cached = get_prefix_cache().gemini_model(api_key, model, system_instruction or "")
+    if cached is not None:
+        return cached
+    return get_registry().gemini(api_key, model, system_instruction)
+
+
+async def _agemini_model(api_key: str, model: str, system_instruction: Optional[str]):
+    # Context cache olusturma/yenileme ag cagrisidir; event loop'u bekletmesin
+    cached = None
+    if system_instruction and get_prefix_cache().enabled:
+        cached = await asyncio.to_thread(get_prefix_cache().gemini_model, api_key, model, system_instruction)
+    if cached is not None:
+        return cached
+    return get_registry().gemini(api_key, model, system_instruction)
+
+
+def _provider_model(api_key: str, model: str) -> tuple[str, str]:
+    if api_key.startswith("sk-or"):
+        return "openrouter", model or OPENROUTER_MODEL
+    return "gemini", model or GEMINI_MODEL
+
+
+def _observe_llm(backend: Backend, model: str, started: float) -> None:
+    from tools.metrics import get_metrics
+    get_metrics().observe_llm(backend.provider, model, time.perf_counter() - started)
+
+
+def _llm_span(
+    backend: Backend, opts: CallOptions, prompt: str, system_instruction: Optional[str], stream: bool = False
+):
+    # tools paketi bu modulu import ediyor; dongusel import olmamasi icin burada
+    from tools.tracing import span
+    return span(
+        "llm",
+        # Async generator baska bir context'te kapatilabilir: ebeveyn zincirine girmez
+        activate=not stream,
+        provider=backend.provider,
+        model=opts.model,
+        backend=backend.name,
+        stream=stream,
+        prompt_chars=len(prompt),
+        system_chars=len(system_instruction or ""),
+    )
+
+
+def _openai_options(opts: CallOptions) -> dict:
+    kwargs: dict = {"model": opts.model, "temperature": opts.temperature}
+    if opts.max_tokens:
+        kwargs["max_tokens"] = opts.max_tokens
+    # timeout=None SDK'da "sinirsiz" demek; sadece profilde varsa gecilir
+    if opts.timeout:
+        kwargs["timeout"] = opts.timeout
+    return kwargs
+
+
+def _gemini_options(opts: CallOptions) -> dict:
+    config: dict = {"temperature": opts.temperature}
+    if opts.max_tokens:
+        config["max_output_tokens"] = opts.max_tokens
+    # Gemini SDK'si havuz ayarlarini almaz; okuma zaman asimi her cagriya gecilir
+    timeout = opts.timeout or get_registry().read_timeout
+    return {"generation_config": config, "request_options": {"timeout": timeout}}
+
+
+def _openrouter_usage(usage) -> tuple[int, int]:
+    get_prefix_cache().record_openrouter(usage)
+    if usage is None:
+        return 0, 0
+    return getattr(usage, "prompt_tokens", 0) or 0, getattr(usage, "completion_tokens", 0) or 0
+
+
+def _gemini_usage(usage_metadata) -> tuple[int, int]:
+    get_prefix_cache().record_gemini(usage_metadata)
+    if usage_metadata is None:
+        return 0, 0
+    return (
+        getattr(usage_metadata, "prompt_token_count", 0) or 0,
+        getattr(usage_metadata, "candidates_token_count", 0) or 0,
+    )
+
+
+def _gemini_text(response) -> tuple[str, tuple[int, int]]:
+    usage = _gemini_usage(getattr(response, "usage_metadata", None))
+    try:
+        text = response.text
+    except Exception:
+        return "", usage
+    return (text or "").strip(), usage
+
+
+def _record_usage(stage: str, backend: Backend, opts: CallOptions, span, started: float, usage: tuple[int, int] | None):
+    """Feed one call into the per-stage report (usage None = failed call)."""
+    seconds = time.perf_counter() - started
+    if usage is None:
+        get_stage_report().record(stage, backend.name, opts.model, seconds, ok=False)
+        return
+    get_stage_report().record(stage, backend.name, opts.model, seconds, *usage)
+    span.set(prompt_tokens=usage[0], completion_tokens=usage[1])
 
 
 def generate_gemini(
@@ -19,56 +163,320 @@ def generate_gemini(
     temperature: float = 0.5,
     api_key: str = "",
     model: str = "",
+    stage: str = "",
 ) -> str:
-    if not api_key:
-        from config import get_settings
-        api_key = (get_settings().gemini_api_key or "").strip()
-    if not api_key:
-        raise ValueError("API key tanimli degil (.env GEMINI_API_KEY)")
+    profile = stage_profile(stage)
 
-    if api_key.startswith("sk-or"):
-        return _call_openrouter(prompt, system_instruction, temperature, api_key, model)
-    else:
-        return _call_gemini(prompt, system_instruction, temperature, api_key, model)
+    def on_backend(backend: Backend) -> str:
+        call = _call_gemini if backend.provider == "gemini" else _call_openrouter
+        opts = profile.options(backend, model, temperature)
+        with _llm_span(backend, opts, prompt, system_instruction) as span:
+            queued = time.perf_counter()
+            attempts = 0
+
+            def attempt() -> tuple[str, tuple[int, int]]:
+                nonlocal attempts
+                attempts += 1
+                started = time.perf_counter()
+                span.set(queued_ms=round((started - queued) * 1000, 1), attempts=attempts)
+                try:
+                    return call(prompt, system_instruction, backend, opts)
+                finally:
+                    _observe_llm(backend, opts.model, started)
+
+            usage = None
+            try:
+                text, usage = get_hedger().call(
+                    stage, opts.model, lambda: get_governor().call(backend.name, opts.model, stage, attempt),
+                    on_hedge=lambda outcome: span.set(hedge=outcome),
+                )
+            finally:
+                _record_usage(stage, backend, opts, span, queued, usage)
+            span.set(response_chars=len(text))
+            return text
+
+    return get_router().call(_backends(api_key, model), on_backend)
 
 
 def _call_openrouter(
     prompt: str,
     system_instruction: Optional[str],
-    temperature: float,
-    api_key: str,
-    model: str,
-) -> str:
-    client = OpenAI(base_url=OPENROUTER_BASE, api_key=api_key)
-    messages = []
-    if system_instruction:
-        messages.append({"role": "system", "content": system_instruction})
-    messages.append({"role": "user", "content": prompt})
+    backend: Backend,
+    opts: CallOptions,
+) -> tuple[str, tuple[int, int]]:
+    client = get_registry().openrouter(backend.api_key, backend.base_url)
     response = client.chat.completions.create(
-        model=model or OPENROUTER_MODEL,
-        messages=messages,
-        temperature=temperature,
+        messages=_build_messages(prompt, system_instruction),
+        **_openai_options(opts),
     )
     raw = response.choices[0].message.content
-    return (raw or "").strip()
+    return (raw or "").strip(), _openrouter_usage(response.usage)
 
 
 def _call_gemini(
     prompt: str,
     system_instruction: Optional[str],
-    temperature: float,
-    api_key: str,
-    model: str,
+    backend: Backend,
+    opts: CallOptions,
+) -> tuple[str, tuple[int, int]]:
+    gen_model = _gemini_model(backend.api_key, opts.model, system_instruction)
+    response = gen_model.generate_content(prompt, **_gemini_options(opts))
+    return _gemini_text(response)
+
+
+async def agenerate_gemini(
+    prompt: str,
+    *,
+    system_instruction: Optional[str] = None,
+    temperature: float = 0.5,
+    api_key: str = "",
+    model: str = "",
+    stage: str = "",
 ) -> str:
-    import google.generativeai as genai
-    genai.configure(api_key=api_key)
-    kwargs = {}
-    if system_instruction:
-        kwargs["system_instruction"] = system_instruction
-    gen_model = genai.GenerativeModel(model or "gemini-1.5-flash", **kwargs)
-    response = gen_model.generate_content(prompt)
+    profile = stage_profile(stage)
+
+    async def on_backend(backend: Backend) -> str:
+        call = _acall_gemini if backend.provider == "gemini" else _acall_openrouter
+        opts = profile.options(backend, model, temperature)
+        with _llm_span(backend, opts, prompt, system_instruction) as span:
+            queued = time.perf_counter()
+            attempts = 0
+
+            async def attempt() -> tuple[str, tuple[int, int]]:
+                nonlocal attempts
+                attempts += 1
+                started = time.perf_counter()
+                span.set(queued_ms=round((started - queued) * 1000, 1), attempts=attempts)
+                try:
+                    return await call(prompt, system_instruction, backend, opts)
+                finally:
+                    _observe_llm(backend, opts.model, started)
+
+            usage = None
+            try:
+                text, usage = await get_hedger().acall(
+                    stage, opts.model, lambda: get_governor().acall(backend.name, opts.model, stage, attempt),
+                    on_hedge=lambda outcome: span.set(hedge=outcome),
+                )
+            finally:
+                _record_usage(stage, backend, opts, span, queued, usage)
+            span.set(response_chars=len(text))
+            return text
+
+    return await get_router().acall(_backends(api_key, model), on_backend)
+
+
+async def _acall_openrouter(
+    prompt: str,
+    system_instruction: Optional[str],
+    backend: Backend,
+    opts: CallOptions,
+) -> tuple[str, tuple[int, int]]:
+    client = get_registry().async_openrouter(backend.api_key, backend.base_url)
+    response = await client.chat.completions.create(
+        messages=_build_messages(prompt, system_instruction),
+        **_openai_options(opts),
+    )
+    raw = response.choices[0].message.content
+    return (raw or "").strip(), _openrouter_usage(response.usage)
+
+
+async def _acall_gemini(
+    prompt: str,
+    system_instruction: Optional[str],
+    backend: Backend,
+    opts: CallOptions,
+) -> tuple[str, tuple[int, int]]:
+    gen_model = await _agemini_model(backend.api_key, opts.model, system_instruction)
+    response = await gen_model.generate_content_async(prompt, **_gemini_options(opts))
+    return _gemini_text(response)
+
+
+def _chunk_text(chunk) -> str:
     try:
-        text = response.text
+        return chunk.text or ""
     except Exception:
         return ""
-    return (text or "").strip()
+
+
+def stream_gemini(
+    prompt: str,
+    *,
+    system_instruction: Optional[str] = None,
+    temperature: float = 0.5,
+    api_key: str = "",
+    model: str = "",
+    stage: str = "",
+) -> Iterator[str]:
+    """Yield text deltas as the provider produces them (failover only before the first delta)."""
+    router = get_router()
+    profile = stage_profile(stage)
+    order = router.route(_backends(api_key, model))
+    last: Exception | None = None
+    for i, backend in enumerate(order):
+        emitted = False
+        try:
+            opts = profile.options(backend, model, temperature)
+            for delta in _stream_backend(backend, opts, prompt, system_instruction, stage):
+                emitted = True
+                yield delta
+        except Exception as exc:
+            # Yanit akmaya basladiysa baska backend'e gecilemez
+            if emitted or not is_backend_failure(exc):
+                if emitted and is_backend_failure(exc):
+                    router.record(backend, None, ok=False)
+                else:
+                    router.release(backend)
+                raise
+            last = router.fail_over(order, i, None, exc)
+            continue
+        except BaseException:
+            router.release(backend)
+            raise
+        # Akis suresi cevap uzunluguna bagli: gecikme EWMA'sina girmez, sadece saglik
+        router.record(backend, None, ok=True)
+        return
+    raise last  # type: ignore[misc]
+
+
+def _stream_backend(
+    backend: Backend,
+    opts: CallOptions,
+    prompt: str,
+    system_instruction: Optional[str],
+    stage: str,
+) -> Iterator[str]:
+    with _llm_span(backend, opts, prompt, system_instruction, stream=True) as span:
+        chars = 0
+        usage = None
+        queued = time.perf_counter()
+        with get_governor().slot(backend.name, opts.model, stage):
+            started = time.perf_counter()
+            span.set(queued_ms=round((started - queued) * 1000, 1))
+            try:
+                if backend.provider != "gemini":
+                    client = get_registry().openrouter(backend.api_key, backend.base_url)
+                    stream = client.chat.completions.create(
+                        messages=_build_messages(prompt, system_instruction),
+                        stream=True,
+                        stream_options={"include_usage": True},
+                        **_openai_options(opts),
+                    )
+                    tokens = (0, 0)
+                    for chunk in stream:
+                        if chunk.usage is not None:
+                            tokens = _openrouter_usage(chunk.usage)
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            delta = chunk.choices[0].delta.content
+                            if not chars:
+                                span.set(first_token_ms=round((time.perf_counter() - started) * 1000, 1))
+                            chars += len(delta)
+                            yield delta
+                    usage = tokens
+                else:
+                    gen_model = _gemini_model(backend.api_key, opts.model, system_instruction)
+                    metadata = None
+                    for chunk in gen_model.generate_content(prompt, stream=True, **_gemini_options(opts)):
+                        metadata = getattr(chunk, "usage_metadata", None) or metadata
+                        text = _chunk_text(chunk)
+                        if text:
+                            if not chars:
+                                span.set(first_token_ms=round((time.perf_counter() - started) * 1000, 1))
+                            chars += len(text)
+                            yield text
+                    usage = _gemini_usage(metadata)
+            finally:
+                _observe_llm(backend, opts.model, started)
+                _record_usage(stage, backend, opts, span, queued, usage)
+                span.set(response_chars=chars)
+
+
+async def astream_gemini(
+    prompt: str,
+    *,
+    system_instruction: Optional[str] = None,
+    temperature: float = 0.5,
+    api_key: str = "",
+    model: str = "",
+    stage: str = "",
+) -> AsyncIterator[str]:
+    """Async variant of stream_gemini()."""
+    router = get_router()
+    profile = stage_profile(stage)
+    order = router.route(_backends(api_key, model))
+    last: Exception | None = None
+    for i, backend in enumerate(order):
+        emitted = False
+        try:
+            opts = profile.options(backend, model, temperature)
+            async for delta in _astream_backend(backend, opts, prompt, system_instruction, stage):
+                emitted = True
+                yield delta
+        except Exception as exc:
+            if emitted or not is_backend_failure(exc):
+                if emitted and is_backend_failure(exc):
+                    router.record(backend, None, ok=False)
+                else:
+                    router.release(backend)
+                raise
+            last = router.fail_over(order, i, None, exc)
+            continue
+        except BaseException:
+            router.release(backend)
+            raise
+        router.record(backend, None, ok=True)
+        return
+    raise last  # type: ignore[misc]
+
+
+async def _astream_backend(
+    backend: Backend,
+    opts: CallOptions,
+    prompt: str,
+    system_instruction: Optional[str],
+    stage: str,
+) -> AsyncIterator[str]:
+    with _llm_span(backend, opts, prompt, system_instruction, stream=True) as span:
+        chars = 0
+        usage = None
+        queued = time.perf_counter()
+        async with get_governor().aslot(backend.name, opts.model, stage):
+            started = time.perf_counter()
+            span.set(queued_ms=round((started - queued) * 1000, 1))
+            try:
+                if backend.provider != "gemini":
+                    client = get_registry().async_openrouter(backend.api_key, backend.base_url)
+                    stream = await client.chat.completions.create(
+                        messages=_build_messages(prompt, system_instruction),
+                        stream=True,
+                        stream_options={"include_usage": True},
+                        **_openai_options(opts),
+                    )
+                    tokens = (0, 0)
+                    async for chunk in stream:
+                        if chunk.usage is not None:
+                            tokens = _openrouter_usage(chunk.usage)
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            delta = chunk.choices[0].delta.content
+                            if not chars:
+                                span.set(first_token_ms=round((time.perf_counter() - started) * 1000, 1))
+                            chars += len(delta)
+                            yield delta
+                    usage = tokens
+                else:
+                    gen_model = await _agemini_model(backend.api_key, opts.model, system_instruction)
+                    metadata = None
+                    response = await gen_model.generate_content_async(prompt, stream=True, **_gemini_options(opts))
+                    async for chunk in response:
+                        metadata = getattr(chunk, "usage_metadata", None) or metadata
+                        text = _chunk_text(chunk)
+                        if text:
+                            if not chars:
+                                span.set(first_token_ms=round((time.perf_counter() - started) * 1000, 1))
+                            chars += len(text)
+                            yield text
+                    usage = _gemini_usage(metadata)
+            finally:
+                _observe_llm(backend, opts.model, started)
+                _record_usage(stage, backend, opts, span, queued, usage)
+                span.set(response_chars=chars)
@@ -0,0 +1,387 @@
+"""
+Adaptive load governor for LLM calls (used by llm/gemini_client.py).
+- One lane per (provider, model) with an AIMD in-flight limit: +1/limit per
+  success under the latency target, x0.5 on a rate limit (429), x0.9 when a
+  call exceeds LLM_LATENCY_TARGET_SECONDS. At most one decrease per second,
+  so a burst of concurrent failures counts once.
+- Token buckets per model and per provider (LLM_MODEL_RPS / LLM_PROVIDER_RPS,
+  0 = unlimited) shape the request rate.
+- A 429 blocks the lane until Retry-After (or LLM_DEFAULT_RETRY_AFTER_SECONDS)
+  and the call is retried up to LLM_RATE_LIMIT_RETRIES times instead of
+  surfacing as an API error.
+- Queued calls are granted by stage priority: professionalize (a human is
+  waiting on Telegram) > gate > evaluation > draft; FIFO within a stage.
+Sync (thread) and async callers share the same lanes.
+"""
+import asyncio
+import email.utils
+import heapq
+import itertools
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, TypeVar
+
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+PRIORITIES = {"professionalize": 0, "gate": 1, "evaluation": 2, "draft": 3}
+DEFAULT_PRIORITY = 2
+# Ayni anda gelen 429/yavas yanitlar limiti tek sefer dusurur
+_DECREASE_INTERVAL = 1.0
+# Bekleyenler zamana bagli izinleri (token, Retry-After) en gec bu aralikla yeniden dener
+_MAX_WAIT_STEP = 0.25
+
+
+class GovernorTimeout(RuntimeError):
+    """A call waited longer than LLM_QUEUE_TIMEOUT_SECONDS for a slot."""
+
+
+def rate_limit_delay(exc: BaseException, default: float) -> float | None:
+    """Seconds to back off if exc is a provider rate limit (429), else None."""
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(exc, "code", None)
+    if callable(status):
+        status = None
+    if status != 429 and type(exc).__name__ not in ("RateLimitError", "ResourceExhausted", "TooManyRequests"):
+        return None
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    value = headers.get("retry-after") if headers is not None else None
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+class _TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1.0, float(burst))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def wait_time(self, now: float) -> float:
+        if self.rate <= 0:
+            return 0.0
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        if self.rate > 0:
+            self.tokens -= 1
+
+
+class _Waiter:
+    __slots__ = ("priority", "granted", "cancelled", "event", "loop", "future")
+
+    def __init__(self, priority: int):
+        self.priority = priority
+        self.granted = False
+        self.cancelled = False
+        self.event: threading.Event | None = None
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.future: asyncio.Future | None = None
+
+    def grant(self) -> None:
+        self.granted = True
+        if self.future is not None:
+            self.loop.call_soon_threadsafe(_resolve, self.future)
+        else:
+            self.event.set()
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class _Lane:
+    def __init__(self, limit: float, bucket: _TokenBucket, provider_bucket: _TokenBucket):
+        self.limit = limit
+        self.in_flight = 0
+        self.queue: list[tuple[int, int, _Waiter]] = []
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self.bucket = bucket
+        self.provider_bucket = provider_bucket
+        self.stats = {"calls": 0, "rate_limited": 0, "retries": 0, "slow": 0, "timeouts": 0}
+
+
+class Governor:
+    def __init__(
+        self,
+        enabled: bool = True,
+        initial_concurrency: int = 8,
+        min_concurrency: int = 1,
+        max_concurrency: int = 32,
+        latency_target: float = 20.0,
+        model_rps: float = 0.0,
+        provider_rps: float = 0.0,
+        burst: int = 10,
+        retries: int = 2,
+        default_retry_after: float = 2.0,
+        queue_timeout: float = 60.0,
+    ):
+        self.enabled = enabled
+        self.min_concurrency = max(1, min_concurrency)
+        self.max_concurrency = max(self.min_concurrency, max_concurrency)
+        self.initial_concurrency = min(max(initial_concurrency, self.min_concurrency), self.max_concurrency)
+        self.latency_target = latency_target
+        self.model_rps = model_rps
+        self.provider_rps = provider_rps
+        self.burst = burst
+        self.retries = max(0, retries)
+        self.default_retry_after = default_retry_after
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._lanes: dict[tuple[str, str], _Lane] = {}
+        self._provider_buckets: dict[str, _TokenBucket] = {}
+        self._seq = itertools.count()
+
+    def _lane(self, provider: str, model: str) -> _Lane:
+        lane = self._lanes.get((provider, model))
+        if lane is None:
+            provider_bucket = self._provider_buckets.setdefault(
+                provider, _TokenBucket(self.provider_rps, self.burst)
+            )
+            lane = self._lanes[(provider, model)] = _Lane(
+                float(self.initial_concurrency), _TokenBucket(self.model_rps, self.burst), provider_bucket
+            )
+        return lane
+
+    def _grant(self, lane: _Lane, now: float) -> float | None:
+        """Grant queued calls while capacity allows; returns seconds until a time-based retry."""
+        while lane.queue:
+            waiter = lane.queue[0][2]
+            if waiter.cancelled:
+                heapq.heappop(lane.queue)
+                continue
+            if lane.in_flight >= int(lane.limit):
+                return None
+            if now < lane.blocked_until:
+                return lane.blocked_until - now
+            wait = max(lane.bucket.wait_time(now), lane.provider_bucket.wait_time(now))
+            if wait > 0:
+                return wait
+            heapq.heappop(lane.queue)
+            lane.bucket.take()
+            lane.provider_bucket.take()
+            lane.in_flight += 1
+            lane.stats["calls"] += 1
+            waiter.grant()
+        return None
+
+    def _decrease(self, lane: _Lane, now: float, factor: float) -> None:
+        if now - lane.last_decrease >= _DECREASE_INTERVAL:
+            lane.limit = max(float(self.min_concurrency), lane.limit * factor)
+            lane.last_decrease = now
+
+    def _enqueue(self, provider: str, model: str, waiter: _Waiter) -> tuple[_Lane, float | None]:
+        with self._lock:
+            lane = self._lane(provider, model)
+            heapq.heappush(lane.queue, (waiter.priority, next(self._seq), waiter))
+            return lane, self._grant(lane, time.monotonic())
+
+    def _give_up(self, lane: _Lane, waiter: _Waiter, timed_out: bool) -> bool:
+        """Drop a waiter; returns True if it was granted meanwhile (slot is then the caller's)."""
+        with self._lock:
+            if waiter.granted:
+                return True
+            waiter.cancelled = True
+            if timed_out:
+                lane.stats["timeouts"] += 1
+            return False
+
+    def _timeout_error(self, provider: str, model: str) -> GovernorTimeout:
+        return GovernorTimeout(f"LLM API kuyruğunda zaman aşımı ({provider}/{model}, {self.queue_timeout:.0f}s)")
+
+    def acquire(self, provider: str, model: str, stage: str = "") -> _Lane:
+        """Block until the call may start (sync callers)."""
+        waiter = _Waiter(PRIORITIES.get(stage, DEFAULT_PRIORITY))
+        waiter.event = threading.Event()
+        deadline = time.monotonic() + self.queue_timeout
+        lane, delay = self._enqueue(provider, model, waiter)
+        while not waiter.granted:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                if self._give_up(lane, waiter, timed_out=True):
+                    break
+                raise self._timeout_error(provider, model)
+            waiter.event.wait(min(remaining, delay or _MAX_WAIT_STEP, _MAX_WAIT_STEP))
+            with self._lock:
+                if waiter.granted:
+                    break
+                delay = self._grant(lane, time.monotonic())
+        return lane
+
+    async def aacquire(self, provider: str, model: str, stage: str = "") -> _Lane:
+        """Async variant of acquire(); cancellation gives the slot back."""
+        waiter = _Waiter(PRIORITIES.get(stage, DEFAULT_PRIORITY))
+        waiter.loop = asyncio.get_running_loop()
+        waiter.future = waiter.loop.create_future()
+        deadline = time.monotonic() + self.queue_timeout
+        lane, delay = self._enqueue(provider, model, waiter)
+        try:
+            while not waiter.granted:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    if self._give_up(lane, waiter, timed_out=True):
+                        break
+                    raise self._timeout_error(provider, model)
+                try:
+                    await asyncio.wait_for(
+                        asyncio.shield(waiter.future), min(remaining, delay or _MAX_WAIT_STEP, _MAX_WAIT_STEP)
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                with self._lock:
+                    if waiter.granted:
+                        break
+                    delay = self._grant(lane, time.monotonic())
+        except asyncio.CancelledError:
+            if self._give_up(lane, waiter, timed_out=False):
+                self.release(lane)
+            raise
+        return lane
+
+    def release(self, lane: _Lane, latency: float | None = None, retry_after: float | None = None) -> None:
+        """
+        Return a slot. latency is set for successful calls (drives the increase
+        / slow-call decrease); retry_after for rate-limited ones.
+        """
+        with self._lock:
+            lane.in_flight -= 1
+            now = time.monotonic()
+            if retry_after is not None:
+                lane.stats["rate_limited"] += 1
+                lane.blocked_until = max(lane.blocked_until, now + retry_after)
+                self._decrease(lane, now, 0.5)
+            elif latency is not None and latency > self.latency_target:
+                lane.stats["slow"] += 1
+                self._decrease(lane, now, 0.9)
+            elif latency is not None:
+                lane.limit = min(float(self.max_concurrency), lane.limit + 1 / lane.limit)
+            self._grant(lane, now)
+
+    def _failed(self, lane: _Lane, exc: BaseException, attempt: int) -> bool:
+        """Release after a failed call; True if it should be retried."""
+        delay = rate_limit_delay(exc, self.default_retry_after) if isinstance(exc, Exception) else None
+        self.release(lane, retry_after=delay)
+        if delay is None or attempt >= self.retries:
+            return False
+        with self._lock:
+            lane.stats["retries"] += 1
+        logger.warning("LLM rate limited, retrying after %.1fs: %s", delay, exc)
+        return True
+
+    def call(self, provider: str, model: str, stage: str, fn: Callable[[], T]) -> T:
+        """Run fn under the governor; rate-limited attempts are retried after Retry-After."""
+        if not self.enabled:
+            return fn()
+        for attempt in range(self.retries + 1):
+            lane = self.acquire(provider, model, stage)
+            started = time.perf_counter()
+            try:
+                result = fn()
+            except BaseException as e:
+                if self._failed(lane, e, attempt):
+                    continue
+                raise
+            self.release(lane, latency=time.perf_counter() - started)
+            return result
+        raise AssertionError("unreachable")
+
+    async def acall(self, provider: str, model: str, stage: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Async variant of call(); fn returns a new awaitable per attempt."""
+        if not self.enabled:
+            return await fn()
+        for attempt in range(self.retries + 1):
+            lane = await self.aacquire(provider, model, stage)
+            started = time.perf_counter()
+            try:
+                result = await fn()
+            except BaseException as e:
+                if self._failed(lane, e, attempt):
+                    continue
+                raise
+            self.release(lane, latency=time.perf_counter() - started)
+            return result
+        raise AssertionError("unreachable")
+
+    @contextmanager
+    def slot(self, provider: str, model: str, stage: str = "") -> Iterator[None]:
+        """One governed call without retry (streams: the body may have yielded already)."""
+        if not self.enabled:
+            yield
+            return
+        lane = self.acquire(provider, model, stage)
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            self._failed(lane, e, self.retries)
+            raise
+        self.release(lane, latency=time.perf_counter() - started)
+
+    @asynccontextmanager
+    async def aslot(self, provider: str, model: str, stage: str = "") -> AsyncIterator[None]:
+        """Async variant of slot()."""
+        if not self.enabled:
+            yield
+            return
+        lane = await self.aacquire(provider, model, stage)
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            self._failed(lane, e, self.retries)
+            raise
+        self.release(lane, latency=time.perf_counter() - started)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                "enabled": self.enabled,
+                "lanes": {
+                    f"{provider}/{model}": {
+                        "limit": round(lane.limit, 2),
+                        "in_flight": lane.in_flight,
+                        "queued": sum(1 for _, _, w in lane.queue if not w.cancelled),
+                        "blocked_for": round(max(0.0, lane.blocked_until - now), 2),
+                        **lane.stats,
+                    }
+                    for (provider, model), lane in self._lanes.items()
+                },
+            }
+
+
+@lru_cache()
+def get_governor() -> Governor:
+    s = get_settings()
+    return Governor(
+        enabled=s.llm_governor_enabled,
+        initial_concurrency=s.llm_initial_concurrency,
+        min_concurrency=s.llm_min_concurrency,
+        max_concurrency=s.llm_max_concurrency,
+        latency_target=s.llm_latency_target_seconds,
+        model_rps=s.llm_model_rps,
+        provider_rps=s.llm_provider_rps,
+        burst=s.llm_rate_burst,
+        retries=s.llm_rate_limit_retries,
+        default_retry_after=s.llm_default_retry_after_seconds,
+        queue_timeout=s.llm_queue_timeout_seconds,
+    )
@@ -0,0 +1,277 @@
+"""
+Hedged LLM requests (opt-in, LLM_HEDGING_ENABLED) to cut tail latency.
+If a call has not returned after the LLM_HEDGE_PERCENTILE latency learned
+online for its (stage, model), a duplicate request is sent; the first success
+wins and the loser is cancelled (async) or its result dropped (sync, the
+thread cannot be interrupted).
+
+- Latencies of successful attempts go into a sliding window per (stage,
+  model); hedging starts after LLM_HEDGE_MIN_SAMPLES observations.
+- Per stage (gate, draft, evaluation, professionalize): a budget (share of
+  calls that may be hedged, LLM_HEDGE_BUDGET) and a cap on concurrent
+  hedges (LLM_HEDGE_CAP). Stages without a budget never hedge.
+- Both attempts go through the governor (llm/governor.py), so a hedge also
+  respects rate limits and concurrency.
+Counters: /llm/stats -> hedging and career_agent_llm_hedges{stage, outcome}.
+"""
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, TypeVar
+
+from config import get_settings
+
+T = TypeVar("T")
+
+# Pencere her bu kadar yeni gozlemde bir siralanir (her cagride degil)
+_RECOMPUTE_EVERY = 16
+
+
+class LatencyWindow:
+    """Sliding window of recent latencies with a cached percentile."""
+
+    def __init__(self, size: int = 256, percentile: float = 0.95):
+        self.samples: deque[float] = deque(maxlen=max(1, size))
+        self.percentile = percentile
+        self._threshold: float | None = None
+        self._stale = 0
+
+    def observe(self, seconds: float) -> None:
+        self.samples.append(seconds)
+        self._stale += 1
+
+    def threshold(self) -> float:
+        if self._threshold is None or self._stale >= _RECOMPUTE_EVERY:
+            ordered = sorted(self.samples)
+            self._threshold = ordered[min(len(ordered) - 1, int(self.percentile * len(ordered)))]
+            self._stale = 0
+        return self._threshold
+
+
+class _StageBudget:
+    def __init__(self, budget: float, cap: int):
+        self.budget = budget
+        self.cap = cap
+        self.calls = 0
+        self.fired = 0
+        self.won = 0
+        self.in_flight = 0
+
+
+class Hedger:
+    def __init__(
+        self,
+        enabled: bool = False,
+        percentile: float = 0.95,
+        min_samples: int = 20,
+        window: int = 256,
+        budgets: dict[str, float] | None = None,
+        caps: dict[str, int] | None = None,
+    ):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_samples = max(1, min_samples)
+        self.window = window
+        self._budgets = budgets or {}
+        self._caps = caps or {}
+        self._lock = threading.Lock()
+        self._stages: dict[str, _StageBudget] = {}
+        self._latency: dict[tuple[str, str], LatencyWindow] = {}
+        self._executor: concurrent.futures.ThreadPoolExecutor | None = None
+
+    def _stage(self, stage: str) -> _StageBudget:
+        budget = self._stages.get(stage)
+        if budget is None:
+            budget = self._stages[stage] = _StageBudget(self._budgets.get(stage, 0.0), self._caps.get(stage, 0))
+        return budget
+
+    def _window(self, stage: str, model: str) -> LatencyWindow:
+        window = self._latency.get((stage, model))
+        if window is None:
+            window = self._latency[(stage, model)] = LatencyWindow(self.window, self.percentile)
+        return window
+
+    def delay(self, stage: str, model: str) -> float | None:
+        """Seconds to wait before hedging this call, None if it cannot be hedged."""
+        with self._lock:
+            budget = self._stage(stage)
+            budget.calls += 1
+            if budget.budget <= 0 or budget.cap <= 0:
+                return None
+            window = self._window(stage, model)
+            if len(window.samples) < self.min_samples:
+                return None
+            return window.threshold()
+
+    def observe(self, stage: str, model: str, seconds: float) -> None:
+        with self._lock:
+            self._window(stage, model).observe(seconds)
+
+    def _try_fire(self, stage: str) -> bool:
+        with self._lock:
+            budget = self._stage(stage)
+            if budget.in_flight >= budget.cap or budget.fired + 1 > budget.budget * budget.calls:
+                return False
+            budget.fired += 1
+            budget.in_flight += 1
+        _count(stage, "fired")
+        return True
+
+    def _settle(self, stage: str, won: bool) -> None:
+        with self._lock:
+            budget = self._stage(stage)
+            budget.in_flight -= 1
+            budget.won += won
+        if won:
+            _count(stage, "won")
+
+    def _timed(self, stage: str, model: str, fn: Callable[[], T]) -> Callable[[], T]:
+        def run() -> T:
+            started = time.perf_counter()
+            result = fn()
+            self.observe(stage, model, time.perf_counter() - started)
+            return result
+        return run
+
+    def _atimed(self, stage: str, model: str, fn: Callable[[], Awaitable[T]]) -> Callable[[], Awaitable[T]]:
+        async def run() -> T:
+            started = time.perf_counter()
+            result = await fn()
+            self.observe(stage, model, time.perf_counter() - started)
+            return result
+        return run
+
+    def _submit(self, fn: Callable[[], T]) -> "concurrent.futures.Future[T]":
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-hedge")
+        # Trace span'leri ve diger context degiskenleri isci thread'ine tasinir
+        return self._executor.submit(contextvars.copy_context().run, fn)
+
+    def call(
+        self,
+        stage: str,
+        model: str,
+        fn: Callable[[], T],
+        on_hedge: Callable[[str], None] | None = None,
+    ) -> T:
+        """Run fn, hedging it with a second fn() if it is slower than the learned percentile."""
+        if not self.enabled:
+            return fn()
+        run = self._timed(stage, model, fn)
+        delay = self.delay(stage, model)
+        if delay is None:
+            return run()
+        primary = self._submit(run)
+        try:
+            return primary.result(timeout=delay)
+        except concurrent.futures.TimeoutError:
+            pass
+        if not self._try_fire(stage):
+            return primary.result()
+        if on_hedge:
+            on_hedge("fired")
+        hedge = self._submit(run)
+        won = False
+        try:
+            pending = {primary, hedge}
+            while pending:
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for f in done:
+                    if f.exception() is None:
+                        won = f is hedge
+                        if on_hedge:
+                            on_hedge("won" if won else "lost")
+                        return f.result()
+            return primary.result()
+        finally:
+            for f in (primary, hedge):
+                f.cancel()
+            self._settle(stage, won)
+
+    async def acall(
+        self,
+        stage: str,
+        model: str,
+        fn: Callable[[], Awaitable[T]],
+        on_hedge: Callable[[str], None] | None = None,
+    ) -> T:
+        """Async variant of call(); the losing request is cancelled."""
+        if not self.enabled:
+            return await fn()
+        run = self._atimed(stage, model, fn)
+        delay = self.delay(stage, model)
+        if delay is None:
+            return await run()
+        primary = asyncio.ensure_future(run())
+        hedge: asyncio.Future | None = None
+        won = False
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done or not self._try_fire(stage):
+                return await primary
+            if on_hedge:
+                on_hedge("fired")
+            hedge = asyncio.ensure_future(run())
+            pending = {primary, hedge}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for f in done:
+                    if f.exception() is None:
+                        won = f is hedge
+                        if on_hedge:
+                            on_hedge("won" if won else "lost")
+                        return f.result()
+            return primary.result()
+        finally:
+            for f in (primary, hedge):
+                if f is not None and not f.done():
+                    f.cancel()
+                    # Iptal edilen kaybedenin hatasi "never retrieved" uyarisi vermesin
+                    f.add_done_callback(lambda t: t.cancelled() or t.exception())
+            if hedge is not None:
+                self._settle(stage, won)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "stages": {
+                    stage: {
+                        "budget": b.budget,
+                        "cap": b.cap,
+                        "calls": b.calls,
+                        "fired": b.fired,
+                        "won": b.won,
+                        "in_flight": b.in_flight,
+                    }
+                    for stage, b in self._stages.items()
+                },
+                "thresholds_ms": {
+                    f"{stage}/{model}": round(w.threshold() * 1000, 1) if len(w.samples) >= self.min_samples else None
+                    for (stage, model), w in self._latency.items()
+                },
+            }
+
+
+def _count(stage: str, outcome: str) -> None:
+    # tools paketi gemini_client uzerinden bu modulu import ediyor; dongusel import olmamasi icin burada
+    from tools.metrics import get_metrics
+    get_metrics().hedge(stage, outcome)
+
+
+@lru_cache()
+def get_hedger() -> Hedger:
+    s = get_settings()
+    return Hedger(
+        enabled=s.llm_hedging_enabled,
+        percentile=s.llm_hedge_percentile,
+        min_samples=s.llm_hedge_min_samples,
+        window=s.llm_hedge_window,
+        budgets=s.llm_hedge_budget,
+        caps=s.llm_hedge_cap,
+    )
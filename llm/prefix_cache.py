@@ -0,0 +1,220 @@
+"""
+Provider-side prefix caching for the static system prompts.
+The system prompts (profile + escalation rules) are compiled once per profile
+version by the agents; this module makes the providers reuse them:
+- OpenRouter / OpenAI-compatible: the system message is sent as a content part
+  marked with cache_control, cached tokens are read from usage.prompt_tokens_details.
+- Gemini: the system instruction is uploaded once as a CachedContent; the handle
+  is kept per (api_key, model, prompt hash) and its TTL is extended before expiry.
+  Create/refresh are network calls: they run outside the lock, one caller per
+  key does it while the others wait on its future (or keep using the handle
+  being refreshed), and any failure falls back to the plain model.
+Hit ratios (requests served with cached tokens, cached/prompt tokens) are
+reported per provider via stats().
+"""
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from datetime import timedelta
+from functools import lru_cache
+from typing import Any, Optional
+
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class PrefixStats:
+    def __init__(self):
+        self.requests = 0
+        self.hit_requests = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+
+    def observe(self, prompt_tokens: int, cached_tokens: int) -> None:
+        self.requests += 1
+        self.prompt_tokens += prompt_tokens
+        self.cached_tokens += cached_tokens
+        if cached_tokens > 0:
+            self.hit_requests += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "hit_requests": self.hit_requests,
+            "request_hit_ratio": round(self.hit_requests / self.requests, 4) if self.requests else 0.0,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "token_hit_ratio": round(self.cached_tokens / self.prompt_tokens, 4) if self.prompt_tokens else 0.0,
+        }
+
+
+class _GeminiHandle:
+    def __init__(self, cache: Any, model: Any, expires_at: float):
+        self.cache = cache
+        self.model = model
+        self.expires_at = expires_at
+
+
+def prompt_digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+class PrefixCache:
+    """Keeps provider cache handles and prefix-cache hit statistics."""
+
+    def __init__(self, enabled: bool = True, gemini_ttl: float = 3600, refresh_margin: float = 300):
+        self.enabled = enabled
+        self.gemini_ttl = gemini_ttl
+        self.refresh_margin = min(refresh_margin, gemini_ttl / 2)
+        self._lock = threading.Lock()
+        self._gemini: dict[tuple[str, str, str], _GeminiHandle] = {}
+        # Cache olusturulamayan prefix'ler (ornegin minimum token altinda) bir TTL boyunca denenmez
+        self._gemini_failed: dict[tuple[str, str, str], float] = {}
+        # Anahtar basina tek olusturma/yenileme; digerleri bu future'i bekler
+        self._gemini_inflight: dict[tuple[str, str, str], Future] = {}
+        self._stats: dict[str, PrefixStats] = {}
+        self.gemini_refreshes = 0
+
+    def _stats_for(self, provider: str) -> PrefixStats:
+        stats = self._stats.get(provider)
+        if stats is None:
+            stats = self._stats[provider] = PrefixStats()
+        return stats
+
+    # --- OpenRouter / OpenAI-compatible ---
+
+    def openrouter_messages(self, prompt: str, system_instruction: Optional[str]) -> list[dict]:
+        messages: list[dict] = []
+        if system_instruction:
+            if self.enabled:
+                messages.append({
+                    "role": "system",
+                    "content": [{"type": "text", "text": system_instruction, "cache_control": {"type": "ephemeral"}}],
+                })
+            else:
+                messages.append({"role": "system", "content": system_instruction})
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
+    def record_openrouter(self, usage: Any) -> None:
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None) or 0
+        with self._lock:
+            self._stats_for("openrouter").observe(getattr(usage, "prompt_tokens", 0) or 0, cached)
+
+    # --- Gemini ---
+
+    def gemini_model(self, api_key: str, model: str, system_instruction: str) -> Any | None:
+        """GenerativeModel bound to a live CachedContent, or None to use the plain model.
+
+        May block on a network round-trip; async callers run it in a thread.
+        """
+        if not (self.enabled and system_instruction):
+            return None
+        key = (api_key, model, prompt_digest(system_instruction))
+        now = time.monotonic()
+        with self._lock:
+            failed_at = self._gemini_failed.get(key)
+            if failed_at is not None and now - failed_at < self.gemini_ttl:
+                return None
+            handle = self._gemini.get(key)
+            if handle is not None and now < handle.expires_at - self.refresh_margin:
+                return handle.model
+            inflight = self._gemini_inflight.get(key)
+            owner = inflight is None
+            if owner:
+                inflight = self._gemini_inflight[key] = Future()
+            elif handle is not None and now < handle.expires_at:
+                # Baska bir cagri yeniliyor: suresi dolmamis handle beklemeden kullanilir
+                return handle.model
+        if not owner:
+            return inflight.result()
+        result = None
+        try:
+            result = self._gemini_create_or_refresh(key, api_key, model, system_instruction, handle, now)
+        finally:
+            with self._lock:
+                self._gemini_inflight.pop(key, None)
+            inflight.set_result(result)
+        return result
+
+    def _gemini_create_or_refresh(self, key: tuple[str, str, str], api_key: str, model: str,
+                                  system_instruction: str, handle: _GeminiHandle | None, now: float) -> Any | None:
+        # Kilit disinda calisir: CachedContent cagrilari ag round-trip'idir
+        try:
+            from google.generativeai import GenerativeModel, caching
+            from llm.client_pool import get_registry
+
+            get_registry().configure_gemini(api_key)
+        except Exception as e:
+            logger.warning("Gemini context cache unavailable: %s", e)
+            return None
+        if handle is not None and now < handle.expires_at:
+            # Suresi dolmadan uzat; handle ve model ayni kalir
+            try:
+                handle.cache.update(ttl=timedelta(seconds=self.gemini_ttl))
+                with self._lock:
+                    handle.expires_at = now + self.gemini_ttl
+                    self.gemini_refreshes += 1
+                return handle.model
+            except Exception as e:
+                logger.warning("Gemini cache refresh failed, recreating: %s", e)
+        try:
+            cache = caching.CachedContent.create(
+                model=model,
+                system_instruction=system_instruction,
+                ttl=timedelta(seconds=self.gemini_ttl),
+            )
+            gen_model = GenerativeModel.from_cached_content(cached_content=cache)
+        except Exception as e:
+            logger.warning("Gemini context cache unavailable for %s: %s", model, e)
+            with self._lock:
+                self._gemini.pop(key, None)
+                self._gemini_failed[key] = now
+            return None
+        with self._lock:
+            self._gemini[key] = _GeminiHandle(cache, gen_model, now + self.gemini_ttl)
+        return gen_model
+
+    def record_gemini(self, usage_metadata: Any) -> None:
+        if usage_metadata is None:
+            return
+        prompt = getattr(usage_metadata, "prompt_token_count", 0) or 0
+        cached = getattr(usage_metadata, "cached_content_token_count", 0) or 0
+        with self._lock:
+            self._stats_for("gemini").observe(prompt, cached)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "gemini_handles": len(self._gemini),
+                "gemini_refreshes": self.gemini_refreshes,
+                "providers": {p: s.snapshot() for p, s in self._stats.items()},
+            }
+
+    def close(self) -> None:
+        """Delete the Gemini caches we created (they are billed while they live)."""
+        with self._lock:
+            handles = list(self._gemini.values())
+            self._gemini.clear()
+        for handle in handles:
+            try:
+                handle.cache.delete()
+            except Exception:
+                pass
+
+
+@lru_cache()
+def get_prefix_cache() -> PrefixCache:
+    s = get_settings()
+    return PrefixCache(
+        enabled=s.llm_prefix_cache,
+        gemini_ttl=s.gemini_cache_ttl_seconds,
+        refresh_margin=s.gemini_cache_refresh_margin_seconds,
+    )
@@ -0,0 +1,160 @@
+"""
+Per-stage model profiles (LLM_STAGE_PROFILES) and the per-stage usage report.
+Each stage (gate, draft, evaluation, professionalize) gets its own model,
+max output tokens, temperature and request timeout, so the one-boolean gate
+and the JSON-score evaluator can run on the smallest model while drafting
+keeps a larger one.
+
+- model: a model name for every backend, or {backend name: model}; backends
+  not listed (and an empty value) keep their own model. The implicit backends
+  are named "openrouter" / "gemini".
+- temperature: overrides the caller's value when set; draft leaves it unset
+  so best-of-N can vary it.
+- An explicit model= from the caller always wins; stages without a profile
+  behave as before.
+The report (GET /llm/report) aggregates latency percentiles and prompt /
+completion tokens per (stage, backend, model) in this process.
+"""
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+from config import get_settings
+from llm.router import Backend
+
+# Rapor icin (asama, backend, model) basina tutulan son gecikme sayisi
+_REPORT_WINDOW = 512
+
+
+@dataclass(frozen=True)
+class CallOptions:
+    model: str
+    temperature: float
+    max_tokens: int | None = None
+    timeout: float | None = None
+
+
+@dataclass(frozen=True)
+class StageProfile:
+    stage: str
+    model: str | dict[str, str] = ""
+    max_tokens: int | None = None
+    temperature: float | None = None
+    timeout: float | None = None
+
+    def model_for(self, backend: Backend) -> str:
+        if isinstance(self.model, dict):
+            return self.model.get(backend.name) or backend.model
+        return self.model or backend.model
+
+    def options(self, backend: Backend, model: str, temperature: float) -> CallOptions:
+        """Effective options for one call on backend (caller's model/temperature as given)."""
+        return CallOptions(
+            model=model or self.model_for(backend),
+            temperature=temperature if self.temperature is None else self.temperature,
+            max_tokens=self.max_tokens,
+            timeout=self.timeout,
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "model": self.model,
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            "timeout": self.timeout,
+        }
+
+
+def parse_profiles(entries: dict[str, dict[str, Any]]) -> dict[str, StageProfile]:
+    fields = ("model", "max_tokens", "temperature", "timeout")
+    profiles: dict[str, StageProfile] = {}
+    for stage, entry in entries.items():
+        unknown = set(entry) - set(fields)
+        if unknown:
+            raise ValueError(f"LLM_STAGE_PROFILES[{stage}] bilinmeyen alan: {', '.join(sorted(unknown))}")
+        profiles[stage] = StageProfile(stage, **{f: entry[f] for f in fields if entry.get(f) is not None})
+    return profiles
+
+
+@lru_cache()
+def get_stage_profiles() -> dict[str, StageProfile]:
+    return parse_profiles(get_settings().llm_stage_profiles)
+
+
+def stage_profile(stage: str) -> StageProfile:
+    return get_stage_profiles().get(stage) or StageProfile(stage)
+
+
+class _UsageRow:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latencies: deque[float] = deque(maxlen=_REPORT_WINDOW)
+
+
+class StageReport:
+    """Latency and token usage per (stage, backend, model)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows: dict[tuple[str, str, str], _UsageRow] = {}
+        self.started = time.time()
+
+    def record(
+        self,
+        stage: str,
+        backend: str,
+        model: str,
+        seconds: float,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        ok: bool = True,
+    ) -> None:
+        key = (stage or "-", backend, model)
+        with self._lock:
+            row = self._rows.get(key)
+            if row is None:
+                row = self._rows[key] = _UsageRow()
+            row.calls += 1
+            if not ok:
+                row.errors += 1
+                return
+            row.latencies.append(seconds)
+            row.prompt_tokens += prompt_tokens
+            row.completion_tokens += completion_tokens
+
+    def report(self) -> list[dict[str, Any]]:
+        with self._lock:
+            items = [(key, row, sorted(row.latencies)) for key, row in self._rows.items()]
+        out = []
+        for (stage, backend, model), row, lat in sorted(items, key=lambda item: item[0]):
+            ok = row.calls - row.errors
+
+            def pct(p: float) -> float | None:
+                return round(lat[min(len(lat) - 1, int(p * len(lat)))] * 1000, 1) if lat else None
+
+            out.append({
+                "stage": stage,
+                "backend": backend,
+                "model": model,
+                "calls": row.calls,
+                "errors": row.errors,
+                "p50_ms": pct(0.5),
+                "p95_ms": pct(0.95),
+                "mean_ms": round(sum(lat) / len(lat) * 1000, 1) if lat else None,
+                "prompt_tokens": row.prompt_tokens,
+                "completion_tokens": row.completion_tokens,
+                "avg_prompt_tokens": round(row.prompt_tokens / ok, 1) if ok else None,
+                "avg_completion_tokens": round(row.completion_tokens / ok, 1) if ok else None,
+            })
+        return out
+
+
+@lru_cache()
+def get_stage_report() -> StageReport:
+    return StageReport()
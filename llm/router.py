@@ -0,0 +1,263 @@
+"""
+Latency-aware routing over several LLM backends with circuit breakers.
+A backend is an endpoint + key + model (LLM_BACKENDS, JSON list); without it
+the single backend implied by GEMINI_API_KEY is used as before.
+
+- Per backend: EWMA of latency (successful calls) and of the error rate.
+- Calls go to the fastest healthy backend (latency weighted by error rate;
+  untried backends first, in configuration order). A failed call fails over
+  to the next backend within the same request.
+- Circuit breaker: LLM_BREAKER_FAILURES consecutive failures open the circuit
+  for LLM_BREAKER_OPEN_SECONDS; then a single request probes it (half-open)
+  and closes it on success or reopens it on failure. If every circuit is open
+  the backends are still tried, oldest-opened first, instead of failing fast.
+- Errors caused by the request itself (400/413/422) do not count against the
+  backend and are not failed over.
+Diagnostics: GET /llm/routing.
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, TypeVar
+
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Hata oraninin skor uzerindeki agirligi: %20 hata ~ gecikmenin 2 kati
+_ERROR_PENALTY = 5.0
+# Istegin kendisinden kaynaklanan hatalar: baska backend'de de ayni sonucu verir
+_REQUEST_ERRORS = {400, 413, 422}
+
+
+@dataclass(frozen=True)
+class Backend:
+    name: str
+    provider: str
+    api_key: str
+    model: str
+    base_url: str = ""
+
+    def to_dict(self) -> dict[str, str]:
+        # api_key bilerek disarida
+        return {"name": self.name, "provider": self.provider, "model": self.model, "base_url": self.base_url}
+
+
+def parse_backends(entries: list[dict[str, str]], default_models: dict[str, str]) -> list[Backend]:
+    """Build backends from LLM_BACKENDS entries ({name?, provider?, base_url?, api_key, model?})."""
+    backends: list[Backend] = []
+    names: set[str] = set()
+    for entry in entries:
+        api_key = (entry.get("api_key") or "").strip()
+        base_url = (entry.get("base_url") or "").strip()
+        if not api_key:
+            raise ValueError(f"LLM_BACKENDS kaydinda api_key eksik: {entry.get('name') or base_url or '?'}")
+        provider = entry.get("provider") or ("openrouter" if base_url or api_key.startswith("sk-or") else "gemini")
+        name = entry.get("name") or provider
+        if name in names:
+            name = f"{name}-{len(backends) + 1}"
+        names.add(name)
+        model = entry.get("model") or default_models.get(provider, "")
+        backends.append(Backend(name, provider, api_key, model, base_url))
+    return backends
+
+
+def is_backend_failure(exc: BaseException) -> bool:
+    """True if exc says the backend is unhealthy (worth failing over), not the request."""
+    status = getattr(exc, "status_code", None)
+    return status not in _REQUEST_ERRORS
+
+
+class _BackendState:
+    def __init__(self, backend: Backend):
+        self.backend = backend
+        self.latency: float | None = None
+        self.error_rate = 0.0
+        self.calls = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.failovers = 0
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.probing = False
+
+    def score(self) -> float:
+        if self.latency is None:
+            # Hic denenmemis backend once denenir; hic basarisi olmayan en sona
+            return float("inf") if self.failures else 0.0
+        return self.latency * (1 + _ERROR_PENALTY * self.error_rate)
+
+
+class Router:
+    def __init__(
+        self,
+        backends: list[Backend] | None = None,
+        *,
+        alpha: float = 0.3,
+        failure_threshold: int = 3,
+        open_seconds: float = 30.0,
+    ):
+        self.backends = list(backends or [])
+        self.alpha = alpha
+        self.failure_threshold = max(1, failure_threshold)
+        self.open_seconds = open_seconds
+        self._lock = threading.Lock()
+        self._states: dict[str, _BackendState] = {}
+        self.failovers = 0
+
+    def _state(self, backend: Backend) -> _BackendState:
+        state = self._states.get(backend.name)
+        if state is None or state.backend != backend:
+            state = self._states[backend.name] = _BackendState(backend)
+        return state
+
+    def route(self, backends: list[Backend]) -> list[Backend]:
+        """Order in which to try backends; claims the half-open probe slot where due."""
+        now = time.monotonic()
+        probes: list[_BackendState] = []
+        ready: list[_BackendState] = []
+        blocked: list[_BackendState] = []
+        with self._lock:
+            for backend in backends:
+                st = self._state(backend)
+                if st.state == "open" and now - st.opened_at >= self.open_seconds:
+                    st.state = "half_open"
+                if st.state == "closed":
+                    ready.append(st)
+                elif st.state == "half_open" and not st.probing:
+                    st.probing = True
+                    probes.append(st)
+                else:
+                    blocked.append(st)
+            ready.sort(key=_BackendState.score)
+            order = probes + ready
+            if not order:
+                order = sorted(blocked, key=lambda s: s.opened_at)
+        return [s.backend for s in order]
+
+    def record(self, backend: Backend, latency: float | None, ok: bool) -> None:
+        """Feed one attempt's outcome into the EWMAs and the breaker."""
+        a = self.alpha
+        with self._lock:
+            st = self._state(backend)
+            st.calls += 1
+            st.probing = False
+            st.error_rate = (1 - a) * st.error_rate + a * (0.0 if ok else 1.0)
+            if ok:
+                if latency is not None:
+                    st.latency = latency if st.latency is None else (1 - a) * st.latency + a * latency
+                st.consecutive_failures = 0
+                if st.state != "closed":
+                    logger.info("LLM backend %s devresi kapandi", backend.name)
+                st.state = "closed"
+                return
+            st.failures += 1
+            st.consecutive_failures += 1
+            if st.state == "half_open" or st.consecutive_failures >= self.failure_threshold:
+                if st.state != "open":
+                    logger.warning("LLM backend %s devresi acildi (%d ardisik hata)", backend.name, st.consecutive_failures)
+                st.state = "open"
+                st.opened_at = time.monotonic()
+
+    def release(self, backend: Backend) -> None:
+        """Give back a probe slot without an outcome (request error, cancellation)."""
+        with self._lock:
+            self._state(backend).probing = False
+
+    def call(self, backends: list[Backend], fn: Callable[[Backend], T]) -> T:
+        """Run fn on the best backend, failing over to the next one on backend errors."""
+        order = self.route(backends)
+        last: Exception | None = None
+        for i, backend in enumerate(order):
+            started = time.perf_counter()
+            try:
+                result = fn(backend)
+            except Exception as exc:
+                if not is_backend_failure(exc):
+                    self.release(backend)
+                    raise
+                last = self.fail_over(order, i, time.perf_counter() - started, exc)
+                continue
+            except BaseException:
+                self.release(backend)
+                raise
+            self.record(backend, time.perf_counter() - started, ok=True)
+            return result
+        raise last  # type: ignore[misc]
+
+    async def acall(self, backends: list[Backend], fn: Callable[[Backend], Awaitable[T]]) -> T:
+        """Async variant of call()."""
+        order = self.route(backends)
+        last: Exception | None = None
+        for i, backend in enumerate(order):
+            started = time.perf_counter()
+            try:
+                result = await fn(backend)
+            except Exception as exc:
+                if not is_backend_failure(exc):
+                    self.release(backend)
+                    raise
+                last = self.fail_over(order, i, time.perf_counter() - started, exc)
+                continue
+            except BaseException:
+                # Hedge kaybedeni gibi iptaller backend'in sucu degil
+                self.release(backend)
+                raise
+            self.record(backend, time.perf_counter() - started, ok=True)
+            return result
+        raise last  # type: ignore[misc]
+
+    def fail_over(self, order: list[Backend], i: int, latency: float | None, exc: Exception) -> Exception:
+        """Record a backend failure of order[i] and count the failover to order[i + 1]."""
+        backend = order[i]
+        self.record(backend, latency, ok=False)
+        if i + 1 < len(order):
+            with self._lock:
+                self._state(backend).failovers += 1
+                self.failovers += 1
+            logger.warning("LLM backend %s hata verdi, %s deneniyor: %s", backend.name, order[i + 1].name, exc)
+        return exc
+
+    def stats(self) -> dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            states = list(self._states.values())
+            return {
+                "configured": bool(self.backends),
+                "failovers": self.failovers,
+                "breaker": {"failure_threshold": self.failure_threshold, "open_seconds": self.open_seconds},
+                "backends": [
+                    {
+                        **st.backend.to_dict(),
+                        "state": st.state,
+                        "latency_ms": round(st.latency * 1000, 1) if st.latency is not None else None,
+                        "error_rate": round(st.error_rate, 3),
+                        "score_ms": round(st.score() * 1000, 1) if st.latency is not None else None,
+                        "calls": st.calls,
+                        "failures": st.failures,
+                        "consecutive_failures": st.consecutive_failures,
+                        "failovers": st.failovers,
+                        "retry_in_s": (
+                            round(max(0.0, self.open_seconds - (now - st.opened_at)), 1) if st.state == "open" else None
+                        ),
+                    }
+                    for st in sorted(states, key=_BackendState.score)
+                ],
+            }
+
+
+@lru_cache()
+def get_router() -> Router:
+    from llm.gemini_client import GEMINI_MODEL, OPENROUTER_MODEL
+
+    s = get_settings()
+    return Router(
+        parse_backends(s.llm_backends, {"openrouter": OPENROUTER_MODEL, "gemini": GEMINI_MODEL}),
+        alpha=s.llm_router_ewma_alpha,
+        failure_threshold=s.llm_breaker_failures,
+        open_seconds=s.llm_breaker_open_seconds,
+    )
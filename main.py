@@ -1,17 +1,22 @@
 """
 FastAPI backend for Career Assistant AI Agent.
 """
+import asyncio
 import json
 import logging
+import uuid
 from contextlib import asynccontextmanager
 from pathlib import Path
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 
 from agent_loop import AgentLoop
+from llm.client_pool import get_registry
+from llm.prefix_cache import get_prefix_cache
 from tools.telegram_listener import TelegramReplyListener
+from tools.telegram_outbox import get_outbox
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -31,6 +36,10 @@ async def lifespan(app: FastAPI):
     yield
     if telegram_listener:
         telegram_listener.stop()
+    get_outbox().shutdown(flush=True)
+    get_prefix_cache().close()
+    get_registry().close()
+    await get_registry().aclose()
     agent_loop = None
 
 
@@ -58,6 +67,11 @@ class EmployerMessageRequest(BaseModel):
     sender: str = "İşveren"
 
 
+class BatchRequest(BaseModel):
+    items: list[EmployerMessageRequest]
+    concurrency: int | None = None
+
+
 class ProcessResponse(BaseModel):
     response: str
     human_intervention: bool
@@ -87,109 +101,352 @@ def health():
     return {"status": "ok", "service": "career-assistant-agent"}
 
 
+@app.get("/stats")
+def agent_stats():
+    """Agent loop counters (speculative drafts, wasted drafts), cache, outbox and profile state."""
+    from tools.profile_store import get_profile_store
+    if agent_loop is None:
+        raise HTTPException(status_code=503, detail="Agent not initialized")
+    body = {**agent_loop.stats.snapshot(), "telegram_outbox": get_outbox().stats(), "profile": get_profile_store().stats()}
+    if agent_loop.cache is not None:
+        body["cache"] = agent_loop.cache.stats()
+    return body
+
+
+@app.get("/llm/stats")
+def llm_stats():
+    """Client cache, connection reuse, prefix-cache hit counters, governor lanes and hedging of the LLM layer."""
+    from llm.governor import get_governor
+    from llm.hedging import get_hedger
+    return {
+        **get_registry().stats(),
+        "prefix_cache": get_prefix_cache().stats(),
+        "governor": get_governor().stats(),
+        "hedging": get_hedger().stats(),
+    }
+
+
+@app.get("/llm/routing")
+def llm_routing():
+    """Backend routing state: EWMA latency/error rate, circuit breaker state and failovers per backend."""
+    from llm.router import get_router
+    return get_router().stats()
+
+
+@app.get("/llm/report")
+def llm_report():
+    """Per-stage model profiles and latency/token usage per (stage, backend, model) for cost/quality tuning."""
+    from llm.profiles import get_stage_profiles, get_stage_report
+    report = get_stage_report()
+    return {
+        "profiles": {stage: p.to_dict() for stage, p in get_stage_profiles().items()},
+        "since": report.started,
+        "stages": report.report(),
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus exposition: per-stage and per-LLM-call latency histograms, pipeline counters."""
+    from fastapi.responses import Response
+    from tools.metrics import get_metrics
+    m = get_metrics()
+    if not m.enabled:
+        raise HTTPException(status_code=503, detail="Metrics disabled (METRICS_ENABLED=false or prometheus_client missing)")
+    body, content_type = m.render()
+    return Response(content=body, media_type=content_type)
+
+
 @app.get("/favicon.ico", include_in_schema=False)
 def favicon():
     from fastapi.responses import Response
     return Response(status_code=204)
 
 
-@app.post("/process")
-def process_message(req: EmployerMessageRequest):
-    """Receive employer message, run agent loop, return final response."""
-    if not req.message.strip():
-        raise HTTPException(status_code=400, detail="Message cannot be empty")
+def _check_ready() -> None:
     if agent_loop is None:
         raise HTTPException(status_code=503, detail="Agent not initialized")
     from config import get_settings
-    if not (get_settings().gemini_api_key or "").strip():
+    settings = get_settings()
+    if not (settings.gemini_api_key or "").strip() and not settings.llm_backends:
         raise HTTPException(
             status_code=503,
             detail="GEMINI_API_KEY .env dosyasinda tanimli degil. .env dosyasina ekleyip sunucuyu yeniden baslatin.",
         )
+
+
+def _process_error(e: Exception) -> HTTPException:
+    """Map an agent loop failure to the HTTP error shown to the client."""
+    err_msg = str(e).lower()
+    if "401" in err_msg or "authentication" in err_msg or "unauthorized" in err_msg or "user not found" in err_msg:
+        return HTTPException(status_code=503, detail="API anahtarı geçersiz veya süresi dolmuş. .env dosyasındaki GEMINI_API_KEY değerini kontrol edin.")
+    if "api" in err_msg and ("hata" in err_msg or "error" in err_msg or "fail" in err_msg):
+        return HTTPException(status_code=503, detail=f"LLM API hatası: {e}")
+    return HTTPException(status_code=500, detail=f"Sistem hatası: {e}")
+
+
+def _response_body(result: dict) -> dict:
+    """JSON-safe /process body built from an agent loop result."""
+    unknown = result.get("unknown_result")
+    if unknown is not None:
+        try:
+            c = float(unknown.get("confidence", 0.0) or 0.0)
+            if c != c:
+                c = 0.0
+        except (TypeError, ValueError):
+            c = 0.0
+        unknown = {
+            "is_unknown_or_unsafe": bool(unknown.get("is_unknown_or_unsafe", False)),
+            "confidence": c,
+            "reason": str(unknown.get("reason", "") or ""),
+            "category": str(unknown.get("category", "other") or "other"),
+        }
+    ev_log = result.get("evaluation_log") or []
+    ev_log_safe = []
+    for item in ev_log:
+        if not isinstance(item, dict):
+            continue
+        ts = item.get("total_score")
+        if isinstance(ts, (int, float)) and ts == ts:
+            ts_clean = ts
+        else:
+            ts_clean = 0
+        entry = {
+            "attempt": int(item.get("attempt", 0)) if item.get("attempt") is not None else 0,
+            "total_score": ts_clean,
+            "scores": item.get("scores") if isinstance(item.get("scores"), dict) else {},
+            "feedback": str(item.get("feedback", "") or ""),
+            "approved": bool(item.get("approved", False)),
+            "evaluator": str(item.get("evaluator", "llm") or "llm"),
+        }
+        if isinstance(item.get("candidate"), int):
+            entry["candidate"] = item["candidate"]
+        ev_log_safe.append(entry)
+    return {
+        "response": str(result.get("response", "") or ""),
+        "human_intervention": bool(result.get("human_intervention", False)),
+        "escalation_id": result.get("escalation_id"),
+        "evaluation_log": ev_log_safe,
+        "unknown_result": unknown,
+        "max_revisions_reached": bool(result.get("max_revisions_reached", False)),
+        "cached": bool(result.get("cached", False)),
+        "request_id": result.get("request_id"),
+    }
+
+
+def _request_id(header: str | None) -> str:
+    """Client-supplied X-Request-ID if it is a safe token, else a new trace id."""
+    header = (header or "").strip()
+    if header and len(header) <= 64 and all(c.isalnum() or c in "-_." for c in header):
+        return header
+    return uuid.uuid4().hex[:16]
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/process")
+async def process_message(req: EmployerMessageRequest, request: Request):
+    """
+    Receive employer message, run agent loop, return final response.
+    The body's request_id (also the X-Request-ID header) is the id of the
+    request's trace at GET /trace/{id}; a valid incoming X-Request-ID is reused.
+    """
+    if not req.message.strip():
+        raise HTTPException(status_code=400, detail="Message cannot be empty")
+    _check_ready()
+    request_id = _request_id(request.headers.get("x-request-id"))
+    headers = {"X-Request-ID": request_id}
     try:
-        result = agent_loop.process(employer_message=req.message, sender=req.sender)
+        result = await agent_loop.aprocess(employer_message=req.message, sender=req.sender, request_id=request_id)
     except Exception as e:
-        logger.exception("Process error: %s", e)
-        err_msg = str(e).lower()
-        if "401" in err_msg or "authentication" in err_msg or "unauthorized" in err_msg or "user not found" in err_msg:
-            raise HTTPException(status_code=503, detail="API anahtarı geçersiz veya süresi dolmuş. .env dosyasındaki GEMINI_API_KEY değerini kontrol edin.")
-        if "api" in err_msg and ("hata" in err_msg or "error" in err_msg or "fail" in err_msg):
-            raise HTTPException(status_code=503, detail=f"LLM API hatası: {e}")
-        raise HTTPException(status_code=500, detail=f"Sistem hatası: {e}")
+        logger.exception("Process error (%s): %s", request_id, e)
+        err = _process_error(e)
+        err.headers = headers
+        raise err
 
     try:
         # Yaniti JSON-guvenli dict yapip JSONResponse ile dondur
-        unknown = result.get("unknown_result")
-        if unknown is not None:
-            try:
-                c = float(unknown.get("confidence", 0.0) or 0.0)
-                if c != c:
-                    c = 0.0
-            except (TypeError, ValueError):
-                c = 0.0
-            unknown = {
-                "is_unknown_or_unsafe": bool(unknown.get("is_unknown_or_unsafe", False)),
-                "confidence": c,
-                "reason": str(unknown.get("reason", "") or ""),
-                "category": str(unknown.get("category", "other") or "other"),
-            }
-        ev_log = result.get("evaluation_log") or []
-        ev_log_safe = []
-        for item in ev_log:
-            if not isinstance(item, dict):
-                continue
-            ts = item.get("total_score")
-            if isinstance(ts, (int, float)) and ts == ts:
-                ts_clean = ts
-            else:
-                ts_clean = 0
-            ev_log_safe.append({
-                "attempt": int(item.get("attempt", 0)) if item.get("attempt") is not None else 0,
-                "total_score": ts_clean,
-                "scores": item.get("scores") if isinstance(item.get("scores"), dict) else {},
-                "feedback": str(item.get("feedback", "") or ""),
-                "approved": bool(item.get("approved", False)),
-            })
-        body = {
-            "response": str(result.get("response", "") or ""),
-            "human_intervention": bool(result.get("human_intervention", False)),
-            "escalation_id": result.get("escalation_id"),
-            "evaluation_log": ev_log_safe,
-            "unknown_result": unknown,
-            "max_revisions_reached": bool(result.get("max_revisions_reached", False)),
-        }
-        return JSONResponse(content=body)
+        return JSONResponse(content=_response_body(result), headers=headers)
     except Exception as e:
         logger.exception("Response build error: %s", e)
-        return JSONResponse(status_code=500, content={"detail": GENEL_HATA_MESAJI})
+        return JSONResponse(status_code=500, content={"detail": GENEL_HATA_MESAJI}, headers=headers)
 
 
-@app.get("/escalation/{esc_id}")
-def poll_escalation(esc_id: str):
-    """Frontend polls this to check if human has replied via Telegram."""
-    from tools.escalation_store import get_escalation
-    data = get_escalation(esc_id)
-    if data is None:
-        raise HTTPException(status_code=404, detail="Escalation not found")
+@app.post("/process/stream")
+async def process_message_stream(req: EmployerMessageRequest, request: Request):
+    """
+    Same pipeline as /process, streamed as Server-Sent Events: one event per
+    finished stage (keyword, cache, gate, draft, token, drafted, evaluation,
+    revision), then 'final' with the /process body or 'error' with
+    {status, detail, request_id}.
+    """
+    if not req.message.strip():
+        raise HTTPException(status_code=400, detail="Message cannot be empty")
+    _check_ready()
+    request_id = _request_id(request.headers.get("x-request-id"))
+    events: asyncio.Queue[dict | None] = asyncio.Queue()
+    task = asyncio.create_task(
+        agent_loop.aprocess(
+            employer_message=req.message, sender=req.sender, on_event=events.put_nowait, request_id=request_id
+        )
+    )
+    task.add_done_callback(lambda _: events.put_nowait(None))
+
+    async def stream():
+        try:
+            while (event := await events.get()) is not None:
+                stage = event.pop("stage")
+                yield _sse(stage, event)
+            try:
+                yield _sse("final", _response_body(task.result()))
+            except Exception as e:
+                logger.exception("Process error: %s", e)
+                err = _process_error(e)
+                yield _sse("error", {"status": err.status_code, "detail": err.detail, "request_id": request_id})
+        finally:
+            # Istemci koptuysa pipeline durdurulur
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Request-ID": request_id},
+    )
+
+
+@app.post("/process/batch")
+async def process_batch(req: BatchRequest):
+    """
+    Process many employer messages (e.g. an inbox backfill). Identical messages
+    run once; at most `concurrency` (default BATCH_CONCURRENCY, 1..BATCH_CONCURRENCY_MAX)
+    run at a time.
+    Streams NDJSON in completion order: one line per input item with its
+    "index" (plus "duplicate_of" for repeated messages), either the /process
+    body or "error": {status, detail}. Telegram gets one summary per batch.
+    """
+    from config import get_settings
+    if not req.items:
+        raise HTTPException(status_code=400, detail="Items cannot be empty")
+    max_items = get_settings().batch_max_items
+    if len(req.items) > max_items:
+        raise HTTPException(status_code=413, detail=f"En fazla {max_items} mesaj gönderilebilir")
+    max_concurrency = get_settings().batch_concurrency_max
+    if req.concurrency is not None and not 1 <= req.concurrency <= max_concurrency:
+        raise HTTPException(status_code=422, detail=f"concurrency 1 ile {max_concurrency} arasında olmalı")
+    _check_ready()
+    positions = [i for i, item in enumerate(req.items) if item.message.strip()]
+    blank = [i for i, item in enumerate(req.items) if not item.message.strip()]
+
+    def line(data: dict) -> str:
+        return json.dumps(data, ensure_ascii=False) + "\n"
+
+    async def stream():
+        for i in blank:
+            yield line({"index": i, "error": {"status": 400, "detail": "Message cannot be empty"}})
+        items = [(req.items[i].message, req.items[i].sender) for i in positions]
+        async for indices, result, error in agent_loop.aprocess_batch(items, req.concurrency):
+            if error is not None:
+                err = _process_error(error)
+                body = {"error": {"status": err.status_code, "detail": err.detail}}
+            else:
+                try:
+                    body = _response_body(result)
+                except Exception as e:
+                    logger.exception("Response build error: %s", e)
+                    body = {"error": {"status": 500, "detail": GENEL_HATA_MESAJI}}
+            first = positions[indices[0]]
+            for k in indices:
+                index = positions[k]
+                yield line({"index": index, "duplicate_of": first if index != first else None, **body})
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson", headers={"X-Accel-Buffering": "no"})
+
+
+def _escalation_view(data: dict) -> dict:
     return {
         "status": data["status"],
         "professional_response": data.get("professional_response"),
         "original_reply": data.get("original_reply"),
         "employer_message": data.get("employer_message"),
+        "trace_id": data.get("trace_id"),
     }
 
 
+@app.get("/trace/{trace_id}")
+def get_trace(trace_id: str):
+    """
+    Timing waterfall of one request: spans with parent ids, start/end offsets
+    (ms from the trace start), sizes and outcome. Only the last
+    TRACE_BUFFER_SIZE traces are kept; links point to follow-up traces
+    (e.g. the Telegram reply that resolved an escalation).
+    """
+    from tools.tracing import get_tracer
+    tracer = get_tracer()
+    if not tracer.enabled:
+        raise HTTPException(status_code=503, detail="Tracing disabled (TRACING_ENABLED=false)")
+    trace = tracer.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return trace.to_dict()
+
+
+@app.get("/escalation/{esc_id}")
+def poll_escalation(esc_id: str):
+    """Polling fallback for clients without EventSource support."""
+    from tools.escalation_store import get_escalation
+    data = get_escalation(esc_id)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Escalation not found")
+    return _escalation_view(data)
+
+
+SSE_KEEPALIVE_SECONDS = 15.0
+
+
+@app.get("/escalation/{esc_id}/events")
+async def escalation_events(esc_id: str, request: Request):
+    """
+    Server-Sent Events: a 'state' event with the current record on connect,
+    then one 'resolved' event as soon as the human answers on Telegram.
+    """
+    from tools.escalation_store import get_escalation, wait_for_resolution
+    current = get_escalation(esc_id)
+    if current is None:
+        raise HTTPException(status_code=404, detail="Escalation not found")
+
+    async def stream():
+        # Yeniden baglanan istemci kacirdigi durumu hemen gorur
+        yield f"event: state\ndata: {json.dumps(_escalation_view(current), ensure_ascii=False)}\n\n"
+        while True:
+            data = await wait_for_resolution(esc_id, timeout=SSE_KEEPALIVE_SECONDS)
+            if data is None:
+                yield "event: gone\ndata: {}\n\n"
+                return
+            if data["status"] == "resolved":
+                payload = json.dumps(_escalation_view(data), ensure_ascii=False)
+                yield f"event: resolved\ndata: {payload}\n\n"
+                return
+            if await request.is_disconnected():
+                return
+            # Proxy'ler baglantiyi kapatmasin diye yorum satiri
+            yield ": keepalive\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.get("/profile")
 def get_profile():
     """Return current profile context (for demo/documentation)."""
-    try:
-        import json
-        import os
-        path = os.path.join(os.path.dirname(__file__), "data", "profile.json")
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    from fastapi.responses import Response
+    from tools.profile_store import get_profile as current_profile
+    return Response(content=current_profile().json_body, media_type="application/json")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,92 @@
+"""
+Shared fixtures. llm_env starts the local LLM stub (tests/llm_stub.py), points
+the OpenRouter client at it, applies per-test settings overrides and resets
+the LLM singletons; everything is restored after the test. telegram_stub is a
+local Bot API stand-in (tests/telegram_stub.py).
+
+    def test_x(llm_env):
+        stub = llm_env.start("Tamam", llm_hedging_enabled=True)
+        llm_env.override(llm_backends=[{... stub.base_url ...}])
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from llm_stub import LLMStub  # noqa: E402
+from telegram_stub import TelegramStub  # noqa: E402
+
+# Pipeline testlerini dis servislerden ve onbelleklerden ayiran ayarlar
+PIPELINE = {
+    "telegram_bot_token": "",
+    "response_cache_enabled": False,
+    "gate_classifier_enabled": False,
+    "speculative_drafting": False,
+    "drafting_mode": "serial",
+}
+
+
+def _llm_caches():
+    from llm.client_pool import get_registry
+    from llm.governor import get_governor
+    from llm.hedging import get_hedger
+    from llm.prefix_cache import get_prefix_cache
+    from llm.profiles import get_stage_profiles, get_stage_report
+    from llm.router import get_router
+    return (get_registry, get_prefix_cache, get_governor, get_hedger, get_router, get_stage_profiles,
+            get_stage_report)
+
+
+class LLMEnv:
+    PIPELINE = PIPELINE
+
+    def __init__(self):
+        from config import get_settings
+        self.settings = get_settings()
+        self.server: LLMStub | None = None
+        self._saved: dict = {}
+
+    def override(self, **settings) -> None:
+        """Set settings fields for this test; the first value seen is restored afterwards."""
+        for field, value in settings.items():
+            self._saved.setdefault(field, getattr(self.settings, field))
+            setattr(self.settings, field, value)
+        # Ayarlardan kurulan tekiller yeni degerlerle yeniden olusur
+        for cache in _llm_caches():
+            cache.cache_clear()
+
+    def start(self, reply: str = "", **settings) -> LLMStub:
+        self.server = LLMStub(reply).start() if reply else LLMStub().start()
+        self.override(gemini_api_key="sk-or-test", openrouter_base_url=self.server.base_url, **settings)
+        return self.server
+
+    def close(self) -> None:
+        from llm.client_pool import get_registry
+        get_registry().close()
+        if self.server is not None:
+            self.server.stop()
+        for field, value in self._saved.items():
+            setattr(self.settings, field, value)
+        for cache in _llm_caches():
+            cache.cache_clear()
+
+
+@pytest.fixture
+def llm_env():
+    env = LLMEnv()
+    try:
+        yield env
+    finally:
+        env.close()
+
+
+@pytest.fixture
+def telegram_stub():
+    server = TelegramStub().start()
+    try:
+        yield server
+    finally:
+        server.stop()
@@ -0,0 +1,146 @@
+"""
+Local OpenAI-compatible stand-in for tests (no network, no API key).
+Emulates provider prompt caching: a system part marked with cache_control that
+was seen before is reported as cached in usage.prompt_tokens_details.
+Requests with "stream": true get the reply as SSE chunks (one per word).
+Setting rate_limited = N answers the next N requests with 429 + Retry-After;
+delays = [s1, s2, ...] makes the next requests sleep that long before answering.
+responder = f(request) -> (reply, delay) picks the reply per request instead.
+"""
+import http.server
+import json
+import socketserver
+import threading
+import time
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def handle(self):
+        try:
+            super().handle()
+        except ConnectionResetError:
+            pass  # iptal edilen hedge keep-alive baglantisini kapatti
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        req = json.loads(self.rfile.read(length))
+        server: "LLMStub" = self.server  # type: ignore[assignment]
+        server.requests.append(req)
+        with server.lock:
+            limited = server.rate_limited > 0
+            server.rate_limited -= limited
+            delay = server.delays.pop(0) if server.delays else 0.0
+        reply = server.reply
+        if server.responder is not None:
+            reply, extra = server.responder(req)
+            delay += extra
+        if delay:
+            time.sleep(delay)
+        if limited:
+            body = json.dumps({"error": {"message": "rate limited", "type": "rate_limit", "code": 429}}).encode("utf-8")
+            self.send_response(429)
+            self.send_header("Retry-After", str(server.retry_after))
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        prompt_chars = 0
+        cached_chars = 0
+        for msg in req.get("messages", []):
+            content = msg.get("content")
+            parts = content if isinstance(content, list) else [{"type": "text", "text": content or ""}]
+            for part in parts:
+                text = part.get("text", "")
+                prompt_chars += len(text)
+                if part.get("cache_control"):
+                    with server.lock:
+                        if text in server.prefixes:
+                            cached_chars += len(text)
+                        server.prefixes.add(text)
+
+        usage = {
+            "prompt_tokens": prompt_chars // 4,
+            "completion_tokens": len(reply) // 4,
+            "total_tokens": (prompt_chars + len(reply)) // 4,
+            "prompt_tokens_details": {"cached_tokens": cached_chars // 4},
+        }
+        if req.get("stream"):
+            self._send(self._stream_body(req, reply, usage), "text/event-stream")
+            return
+        body = json.dumps({
+            "id": "stub",
+            "object": "chat.completion",
+            "created": 0,
+            "model": req.get("model", "stub"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+            "usage": usage,
+        }).encode("utf-8")
+        self._send(body, "application/json")
+
+    @staticmethod
+    def _stream_body(req: dict, reply: str, usage: dict) -> bytes:
+        def chunk(delta: dict, finish: str | None = None, usage_part: dict | None = None) -> str:
+            payload = {
+                "id": "stub",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": req.get("model", "stub"),
+                "choices": [] if usage_part else [{"index": 0, "delta": delta, "finish_reason": finish}],
+            }
+            if usage_part:
+                payload["usage"] = usage_part
+            return f"data: {json.dumps(payload)}\n\n"
+
+        words = reply.split(" ")
+        out = [chunk({"role": "assistant", "content": ""})]
+        out += [chunk({"content": w if i == 0 else " " + w}) for i, w in enumerate(words)]
+        out.append(chunk({}, finish="stop"))
+        if (req.get("stream_options") or {}).get("include_usage"):
+            out.append(chunk({}, usage_part=usage))
+        out.append("data: [DONE]\n\n")
+        return "".join(out).encode("utf-8")
+
+    def _send(self, body: bytes, content_type: str) -> None:
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # istemci (iptal edilen hedge) baglantiyi kapatti
+
+    def log_message(self, *args):
+        pass
+
+
+class LLMStub(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, reply: str = "Merhaba, mesajınız için teşekkür ederim."):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.reply = reply
+        self.requests: list[dict] = []
+        self.prefixes: set[str] = set()
+        self.rate_limited = 0
+        self.retry_after = 0.2
+        self.delays: list[float] = []
+        self.responder = None
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def start(self) -> "LLMStub":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,262 @@
+"""
+Replay a JSONL file of employer messages through AgentLoop.process.
+Regression check for prompt/model changes over historical traffic.
+
+Input: one JSON object per line with "message" (or "text"), optional "sender"
+and "id". The file is read lazily; at most 2 x workers messages are in flight.
+Output: one JSONL line per input line (in completion order) with response,
+gate source, evaluation_log and per-stage latency in ms. Messages run through
+the same non-streaming path as /chat; stage timings come from the request's
+trace spans (GET /trace/{id}), so with TRACING_ENABLED=false only the total
+is reported.
+
+Progress is checkpointed to <out>.ckpt (done-line watermark + output byte
+offset). Re-running the same command resumes: the output is truncated to the
+last checkpoint and already finished lines are skipped.
+
+Usage:
+  python tests/replay.py traffic.jsonl --out results.jsonl [--workers 4] [--no-telegram]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Iterator
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Span adi -> sure hangi asamaya yazilir (ayni asamanin span'lari toplanir)
+STAGE_OF_SPAN = {
+    "keyword": "keyword",
+    "cache": "cache",
+    "gate": "gate",
+    "draft": "draft",
+    "pre_evaluation": "evaluation",
+    "evaluation": "evaluation",
+}
+
+
+class Checkpoint:
+    """Watermark of finished input lines; written atomically after the output is flushed."""
+
+    def __init__(self, path: str, input_path: str):
+        self.path = path
+        self.input_path = os.path.abspath(input_path)
+        self.done_below = 0
+        self.done: set[int] = set()
+        self.out_offset = 0
+
+    def load(self) -> bool:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return False
+        if data.get("input") != self.input_path:
+            raise SystemExit(f"Checkpoint baska bir girdiye ait: {data.get('input')}")
+        self.done_below = int(data["done_below"])
+        self.done = set(data.get("done", []))
+        self.out_offset = int(data["out_offset"])
+        return True
+
+    def is_done(self, line_no: int) -> bool:
+        return line_no < self.done_below or line_no in self.done
+
+    def mark(self, line_no: int) -> None:
+        self.done.add(line_no)
+        while self.done_below in self.done:
+            self.done.remove(self.done_below)
+            self.done_below += 1
+
+    def save(self, out_offset: int) -> None:
+        self.out_offset = out_offset
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "input": self.input_path,
+                "done_below": self.done_below,
+                "done": sorted(self.done),
+                "out_offset": out_offset,
+            }, f)
+        os.replace(tmp, self.path)
+
+
+def read_messages(path: str) -> Iterator[tuple[int, dict | None, str | None]]:
+    """(line_no, record, error) per non-empty line, without loading the file."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_no, None, f"Geçersiz JSON: {e}"
+                continue
+            if not isinstance(record, dict) or not str(record.get("message") or record.get("text") or "").strip():
+                yield line_no, None, "message alanı yok"
+                continue
+            yield line_no, record, None
+
+
+def stage_latencies(spans: list[dict], total_ms: float) -> dict[str, float]:
+    """Per-stage ms summed from the trace spans, plus the wall-clock total."""
+    out: dict[str, float] = {}
+    for span in spans:
+        name = STAGE_OF_SPAN.get(span["name"])
+        if name is not None and span["duration_ms"] is not None:
+            out[name] = out.get(name, 0.0) + span["duration_ms"]
+    out = {k: round(v, 1) for k, v in out.items()}
+    out["total"] = round(total_ms, 1)
+    return out
+
+
+def gate_decision(spans: list[dict]) -> dict[str, Any]:
+    """Gate source/category from the keyword, gate and escalation spans."""
+    gate: dict[str, Any] = {}
+    for span in spans:
+        attrs = span["attrs"]
+        if span["name"] == "gate" and "source" in attrs:
+            gate.update(source=attrs["source"], category=attrs.get("category"))
+        elif span["name"] == "escalation":
+            gate.update(source=attrs.get("source"), category=attrs.get("category"))
+    return gate
+
+
+def replay_one(loop, line_no: int, record: dict) -> dict[str, Any]:
+    from tools.tracing import get_tracer
+
+    message = str(record.get("message") or record.get("text"))
+    sender = str(record.get("sender") or "İşveren")
+    # Trace id onceden verilir; hata durumunda da span'lar okunabilir
+    request_id = f"replay-{uuid.uuid4().hex[:12]}"
+
+    def spans() -> list[dict]:
+        trace = get_tracer().get(request_id)
+        return trace.to_dict()["spans"] if trace is not None else []
+
+    row: dict[str, Any] = {"line": line_no, "id": record.get("id"), "message": message}
+    t0 = time.perf_counter()
+    try:
+        result = loop.process(message, sender, request_id=request_id)
+    except Exception as e:
+        row.update(error=str(e), latency_ms=stage_latencies(spans(), (time.perf_counter() - t0) * 1000))
+        return row
+    total_ms = (time.perf_counter() - t0) * 1000
+    trace_spans = spans()
+    gate = gate_decision(trace_spans)
+    if result.get("cached") and not gate:
+        gate.update(source="response_cache", category="safe")
+    row.update(
+        request_id=result.get("request_id", request_id),
+        response=result.get("response", ""),
+        human_intervention=bool(result.get("human_intervention")),
+        escalation_id=result.get("escalation_id"),
+        gate_source=gate.get("source"),
+        gate_category=gate.get("category"),
+        cached=bool(result.get("cached")),
+        max_revisions_reached=bool(result.get("max_revisions_reached")),
+        evaluation_log=result.get("evaluation_log", []),
+        latency_ms=stage_latencies(trace_spans, total_ms),
+    )
+    return row
+
+
+def run(input_path: str, out_path: str, workers: int = 4, checkpoint_every: int = 20,
+        no_telegram: bool = False, limit: int | None = None) -> dict[str, Any]:
+    from config import get_settings
+    if no_telegram:
+        get_settings().telegram_bot_token = ""
+    from agent_loop import AgentLoop
+
+    ckpt = Checkpoint(out_path + ".ckpt", input_path)
+    resumed = ckpt.load()
+    out = open(out_path, "r+b" if resumed and os.path.exists(out_path) else "wb")
+    # Son checkpoint'ten sonra yazilan satirlar yeniden islenecek
+    out.truncate(ckpt.out_offset if resumed else 0)
+    out.seek(0, os.SEEK_END)
+
+    loop = AgentLoop()
+    lock = threading.Lock()
+    counts = {"processed": 0, "skipped": 0, "errors": 0, "escalated": 0}
+    latencies: list[float] = []
+    since_ckpt = 0
+
+    def write(row: dict) -> None:
+        nonlocal since_ckpt
+        with lock:
+            out.write((json.dumps(row, ensure_ascii=False) + "\n").encode("utf-8"))
+            ckpt.mark(row["line"])
+            counts["processed"] += 1
+            counts["errors"] += 1 if row.get("error") else 0
+            counts["escalated"] += 1 if row.get("human_intervention") else 0
+            if "latency_ms" in row:
+                latencies.append(row["latency_ms"]["total"])
+            since_ckpt += 1
+            if since_ckpt >= checkpoint_every:
+                out.flush()
+                os.fsync(out.fileno())
+                ckpt.save(out.tell())
+                since_ckpt = 0
+
+    pending: set = set()
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="replay") as pool:
+            for n, (line_no, record, error) in enumerate(read_messages(input_path)):
+                if limit is not None and n >= limit:
+                    break
+                if ckpt.is_done(line_no):
+                    counts["skipped"] += 1
+                    continue
+                if error is not None:
+                    write({"line": line_no, "error": error})
+                    continue
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        write(fut.result())
+                pending.add(pool.submit(replay_one, loop, line_no, record))
+            for fut in pending:
+                write(fut.result())
+    finally:
+        with lock:
+            out.flush()
+            os.fsync(out.fileno())
+            ckpt.save(out.tell())
+            out.close()
+
+    latencies.sort()
+    pct = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] if latencies else 0.0  # noqa: E731
+    return {
+        **counts,
+        "elapsed_s": round(time.perf_counter() - started, 2),
+        "p50_ms": pct(0.5),
+        "p95_ms": pct(0.95),
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(description="Replay employer messages (JSONL) through AgentLoop.")
+    ap.add_argument("input", help="JSONL with one {message, sender?, id?} per line")
+    ap.add_argument("--out", required=True, help="result JSONL (checkpoint: <out>.ckpt)")
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--checkpoint-every", type=int, default=20, help="results between checkpoints")
+    ap.add_argument("--no-telegram", action="store_true", help="disable Telegram notifications")
+    ap.add_argument("--limit", type=int, default=None, help="only the first N input records")
+    args = ap.parse_args(argv)
+
+    summary = run(args.input, args.out, args.workers, args.checkpoint_every, args.no_telegram, args.limit)
+    print(
+        f"İşlenen: {summary['processed']}  atlanan (checkpoint): {summary['skipped']}  "
+        f"eskalasyon: {summary['escalated']}  hata: {summary['errors']}"
+    )
+    print(f"Süre: {summary['elapsed_s']}s  p50: {summary['p50_ms']}ms  p95: {summary['p95_ms']}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Local Telegram Bot API stand-in for tests (no network, no token).
+POST /bot<token>/<method> answers {"ok": true, "result": {"message_id": n}};
+script = [...] overrides the next answers in order: (status, body) sends that
+response, "reset" closes the connection without one (a transport error) and
+a number sleeps that long before the default answer.
+GET /bot<token>/getUpdates returns the queued updates with update_id >= offset.
+Every request is recorded in requests as (time, method, params_or_payload).
+"""
+import http.server
+import json
+import socketserver
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server: "TelegramStub" = self.server  # type: ignore[assignment]
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        with server.lock:
+            server.requests.append((time.monotonic(), url.path.rsplit("/", 1)[-1], params))
+            offset = int(params.get("offset", 0))
+            if offset < 0:
+                result = server.updates[offset:]
+            else:
+                result = [u for u in server.updates if u["update_id"] >= offset]
+        if not result and int(params.get("timeout", 0)) > 0:
+            time.sleep(0.05)  # long-poll'u kisaca taklit et
+        self._send(200, {"ok": True, "result": result})
+
+    def do_POST(self):
+        server: "TelegramStub" = self.server  # type: ignore[assignment]
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        with server.lock:
+            server.requests.append((time.monotonic(), urlparse(self.path).path.rsplit("/", 1)[-1], payload))
+            step = server.script.pop(0) if server.script else None
+        if step == "reset":
+            self.close_connection = True
+            self.connection.close()
+            return
+        if isinstance(step, tuple):
+            self._send(*step)
+            return
+        if step:
+            time.sleep(step)
+        with server.lock:
+            server.next_message_id += 1
+            message_id = server.next_message_id
+        self._send(200, {"ok": True, "result": {"message_id": message_id}})
+
+    def _send(self, status: int, body: dict) -> None:
+        data = json.dumps(body).encode("utf-8")
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+class TelegramStub(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.requests: list[tuple[float, str, dict]] = []
+        self.script: list = []
+        self.updates: list[dict] = []
+        self.next_message_id = 100
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/bottest"
+
+    def calls(self, method: str) -> list[tuple[float, dict]]:
+        with self.lock:
+            return [(t, p) for t, m, p in self.requests if m == method]
+
+    def start(self) -> "TelegramStub":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,115 @@
+"""
+POST /process/batch: deduplication, bounded concurrency, NDJSON results in
+completion order and a single Telegram summary (LLM calls stubbed).
+Run with: python -m pytest tests/test_batch.py -v
+"""
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+REPLY = (
+    "Merhaba, mesajınız için teşekkür ederim. FastAPI ile REST API'ler geliştirdim ve "
+    "PostgreSQL ile üretimde kullandım. Saygılarımla."
+)
+
+
+@pytest.fixture
+def batch_client(llm_env):
+    from fastapi.testclient import TestClient
+
+    import agent_loop
+    import main
+
+    llm_env.override(gemini_api_key="sk-or-test", **llm_env.PIPELINE)
+
+    calls = {"running": 0, "peak": 0, "drafts": 0, "notifications": []}
+
+    async def gate(*args, **kwargs):
+        return {"can_respond": True, "reason": "", "category": "safe"}
+
+    async def draft(message, **kwargs):
+        calls["drafts"] += 1
+        calls["running"] += 1
+        calls["peak"] = max(calls["peak"], calls["running"])
+        # Kisa mesajlar once biter: tamamlanma sirasi girdi sirasindan farkli olur
+        await asyncio.sleep(0.01 * len(message) / 10)
+        calls["running"] -= 1
+        return REPLY
+
+    async def judge(message, response):
+        return {"scores": {}, "total_score": 90, "feedback": "", "approved": True}
+
+    saved_gate = agent_loop.acheck_gate
+    agent_loop.acheck_gate = gate
+    loop = agent_loop.AgentLoop()
+    loop.career_agent.agenerate_response = draft
+    loop.evaluator.aevaluate = judge
+    for name in ("notify_new_employer_message", "notify_response_sent", "notify_batch_summary"):
+        setattr(loop.notification, name, lambda *a, _n=name, **k: calls["notifications"].append((_n, a)))
+    main.agent_loop = loop
+    try:
+        yield TestClient(main.app), calls
+    finally:
+        agent_loop.acheck_gate = saved_gate
+        main.agent_loop = None
+
+
+def _lines(res) -> list[dict]:
+    return [json.loads(line) for line in res.text.splitlines() if line.strip()]
+
+
+def test_batch_dedupes_and_bounds_concurrency(batch_client):
+    client, calls = batch_client
+    messages = [f"Soru {i}: " + "FastAPI deneyiminiz var mı? " * (6 - i) for i in range(6)]
+    items = [{"message": m} for m in messages] + [{"message": messages[0].upper()}, {"message": "   "}]
+
+    res = client.post("/process/batch", json={"items": items, "concurrency": 2})
+
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("application/x-ndjson")
+    lines = _lines(res)
+    assert sorted(line["index"] for line in lines) == list(range(len(items)))
+    assert calls["drafts"] == 6
+    assert calls["peak"] == 2
+    by_index = {line["index"]: line for line in lines}
+    assert by_index[6]["duplicate_of"] == 0 and by_index[6]["response"] == REPLY
+    assert by_index[7]["error"]["status"] == 400
+    # Tamamlanma sirasi: kisa mesajlar uzunlardan once gelir
+    done_order = [line["index"] for line in lines if "response" in line and line["duplicate_of"] is None]
+    assert done_order != sorted(done_order)
+
+
+def test_batch_sends_one_summary_notification(batch_client):
+    client, calls = batch_client
+    items = [{"message": "Mülakat için Pazartesi uygun musunuz?"}] * 3 + [{"message": "Docker biliyor musunuz?"}]
+
+    client.post("/process/batch", json={"items": items})
+
+    names = [name for name, _ in calls["notifications"]]
+    assert names == ["notify_batch_summary"]
+    summary = calls["notifications"][0][1][0]
+    assert summary["items"] == 4 and summary["unique"] == 2 and summary["responded"] == 4
+
+
+def test_batch_concurrency_is_bounded_by_settings(batch_client, llm_env):
+    client, calls = batch_client
+    llm_env.override(batch_concurrency_max=3)
+    items = [{"message": f"Soru {i}: FastAPI deneyiminiz var mı?"} for i in range(8)]
+
+    assert client.post("/process/batch", json={"items": items, "concurrency": 1000}).status_code == 422
+    assert client.post("/process/batch", json={"items": items, "concurrency": 0}).status_code == 422
+    assert calls["drafts"] == 0
+
+    # Dogrudan cagiran icin de ayni sinir gecerli
+    import main
+
+    async def drain():
+        return [r async for r in main.agent_loop.aprocess_batch([(i["message"], "İşveren") for i in items], 1000)]
+
+    assert len(asyncio.run(drain())) == 8
+    assert calls["peak"] <= 3
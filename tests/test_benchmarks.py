@@ -0,0 +1,28 @@
+"""
+Benchmark suite smoke test: every case runs offline, compare flags regressions.
+Run with: python -m pytest tests/test_benchmarks.py -v
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import suite  # noqa: E402
+
+
+@pytest.mark.parametrize("name", [n for n in suite.CASES if not n.startswith("escalation_store.")])
+def test_case_runs(name):
+    suite.CASES[name]()()
+
+
+def test_compare_flags_regressions_above_threshold():
+    def report(**medians):
+        return {"benchmarks": {k: {"median_s": v} for k, v in medians.items()}}
+
+    rows = suite.compare(report(a=1.0, b=1.0, gone=1.0), report(a=1.05, b=1.2, new=1.0), threshold=10)
+    by_name = {row["name"]: row for row in rows}
+    assert set(by_name) == {"a", "b"}
+    assert not by_name["a"]["regressed"]
+    assert by_name["b"]["regressed"] and by_name["b"]["change_pct"] == 20.0
@@ -0,0 +1,87 @@
+"""
+Best-of-N drafting: a failed judge call only rejects its own candidate; the
+request fails only when every evaluation failed; log entries and trace spans
+name each candidate by its temperature slot (LLM calls stubbed).
+Run with: python -m pytest tests/test_best_of_n.py -v
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+REPLY = (
+    "Merhaba, mesajınız için teşekkür ederim. FastAPI ile REST API'ler geliştirdim ve "
+    "PostgreSQL ile üretimde kullandım. Saygılarımla."
+)
+
+
+@pytest.fixture
+def make_loop(llm_env):
+    import agent_loop
+
+    llm_env.override(gemini_api_key="sk-or-test", pre_evaluator_enabled=False, best_of_n=3,
+                     **{**llm_env.PIPELINE, "drafting_mode": "best_of_n"})
+
+    async def gate(*args, **kwargs):
+        return {"can_respond": True, "reason": "", "category": "safe"}
+
+    saved_gate = agent_loop.acheck_gate
+    agent_loop.acheck_gate = gate
+
+    def build(failing: int, failing_drafts: int = 0):
+        calls = {"n": 0, "drafts": 0}
+
+        async def draft(message, temperature=None, **kwargs):
+            calls["drafts"] += 1
+            if calls["drafts"] <= failing_drafts:
+                raise RuntimeError("draft down")
+            return f"{REPLY} (t={temperature})"
+
+        async def judge(message, response):
+            calls["n"] += 1
+            if calls["n"] <= failing:
+                raise RuntimeError("judge down")
+            return {"scores": {}, "total_score": 80, "feedback": "", "approved": True}
+
+        loop = agent_loop.AgentLoop()
+        loop.career_agent.agenerate_response = draft
+        loop.evaluator.aevaluate = judge
+        loop.notification.notify_new_employer_message = lambda *a, **k: None
+        loop.notification.notify_response_sent = lambda *a, **k: None
+        return loop
+
+    try:
+        yield build
+    finally:
+        agent_loop.acheck_gate = saved_gate
+
+
+def test_failed_evaluation_rejects_only_its_candidate(make_loop):
+    result = asyncio.run(make_loop(failing=2).aprocess("FastAPI deneyiminiz var mı?"))
+    assert result["response"].startswith(REPLY) and "max_revisions_reached" not in result
+    log = result["evaluation_log"]
+    assert [e["evaluator"] for e in log].count("error") == 2
+    assert all(e["approved"] is False for e in log if e["evaluator"] == "error")
+
+
+def test_request_fails_when_every_evaluation_failed(make_loop):
+    with pytest.raises(RuntimeError):
+        asyncio.run(make_loop(failing=3).aprocess("FastAPI deneyiminiz var mı?"))
+
+
+def test_candidates_keep_their_slot_when_a_draft_fails(make_loop):
+    from tools.tracing import get_tracer
+
+    loop = make_loop(failing=0, failing_drafts=1)
+    temperatures = loop._best_of_n_temperatures()
+    result = asyncio.run(loop.aprocess("FastAPI deneyiminiz var mı?"))
+
+    log = result["evaluation_log"]
+    # Ilk slotun taslagi basarisiz: kalan adaylar 1 ve 2 olarak anilir
+    assert [(e["candidate"], e["temperature"]) for e in log] == [(1, temperatures[1]), (2, temperatures[2])]
+    spans = get_tracer().get(result["request_id"]).to_dict()["spans"]
+    evaluated = sorted((s["attrs"]["candidate"], s["attrs"]["temperature"]) for s in spans if s["name"] == "evaluation")
+    assert evaluated == [(1, temperatures[1]), (2, temperatures[2])]
@@ -0,0 +1,31 @@
+"""
+Client registry: one OpenAI-compatible client per (provider, api_key,
+base_url) whatever the model or system prompt of the call, and the LRU bound
+on cached clients.
+Run with: python -m pytest tests/test_client_pool.py -v
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm.client_pool import ClientRegistry  # noqa: E402
+
+
+def test_openrouter_client_is_shared_across_models_and_prompts():
+    registry = ClientRegistry(max_clients=2)
+    try:
+        client = registry.openrouter("sk-or-test")
+        assert registry.openrouter("sk-or-test") is client
+        assert registry.openrouter("sk-or-test", "http://127.0.0.1:1/v1") is not client
+        assert registry.stats()["clients"] == 2 and registry.stats()["client_hits"] == 1
+
+        # Sinir asilinca en uzun suredir kullanilmayan atilir
+        registry.openrouter("sk-or-test")
+        registry.openrouter("sk-or-other")
+        assert registry.stats()["clients"] == 2
+        assert registry.openrouter("sk-or-test") is client
+        assert registry.openrouter("sk-or-test", "http://127.0.0.1:1/v1") is not None
+        assert registry.stats()["clients"] == 2
+    finally:
+        registry.close()
@@ -0,0 +1,118 @@
+"""
+GET /escalation/{id}/events (Server-Sent Events): current state on connect,
+a resolve pushes 'resolved' and closes the stream, subscribers are removed
+after the client disconnects. TestClient buffers the whole response, so the
+disconnect case runs against a local uvicorn server.
+Run with: python -m pytest tests/test_escalation_events.py -v
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def sse(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import main
+    from tools.escalation_store import get_store
+
+    # Kopmayi hizli fark etsin diye keepalive kisa
+    monkeypatch.setattr(main, "SSE_KEEPALIVE_SECONDS", 0.1)
+    get_store.cache_clear()
+    try:
+        yield TestClient(main.app), get_store()
+    finally:
+        get_store.cache_clear()
+
+
+def _events(lines):
+    """(event, data) pairs from an SSE line iterator; comments are skipped."""
+    event = None
+    for line in lines:
+        if line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: "):
+            yield event, json.loads(line[len("data: "):])
+
+
+def _wait_until(predicate, timeout: float = 3.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return predicate()
+
+
+def _resolve_when_subscribed(store, esc_id: str) -> threading.Thread:
+    def run():
+        if _wait_until(lambda: esc_id in store._waiters):
+            store.resolve(esc_id, "Profesyonel yanıt", "80k")
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_state_on_connect_then_resolved_closes_stream(sse):
+    client, store = sse
+    esc_id = store.create("Maaş beklentiniz nedir?", "Maaş sorusu", "salary")
+    resolver = _resolve_when_subscribed(store, esc_id)
+
+    with client.stream("GET", f"/escalation/{esc_id}/events") as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = list(_events(response.iter_lines()))
+    resolver.join()
+    assert events[0] == ("state", {
+        "status": "pending", "professional_response": None, "original_reply": None,
+        "employer_message": "Maaş beklentiniz nedir?", "trace_id": None,
+    })
+    # Cozum tek olay olarak gelir ve akis kapanir
+    assert [e for e, _ in events[1:]] == ["resolved"]
+    assert events[1][1]["professional_response"] == "Profesyonel yanıt"
+    assert esc_id not in store._waiters
+
+
+@pytest.fixture
+def live_server(sse):
+    import uvicorn
+
+    import main
+
+    server = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=0, lifespan="off", log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    assert _wait_until(lambda: server.started)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}", sse[1]
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+
+
+def test_subscriber_removed_after_disconnect(live_server):
+    import httpx
+
+    base_url, store = live_server
+    esc_id = store.create("Sözleşme detayları?", "Hukuki", "legal")
+
+    with httpx.stream("GET", f"{base_url}/escalation/{esc_id}/events", timeout=5) as response:
+        # Uretecin referansi tutulur; toplanirsa akis erkenden kapanir
+        events = _events(response.iter_lines())
+        assert next(events)[0] == "state"
+        assert _wait_until(lambda: esc_id in store._waiters)
+    assert _wait_until(lambda: esc_id not in store._waiters)
+    assert store.get(esc_id)["status"] == "pending"
+
+
+def test_unknown_escalation_is_404(sse):
+    client, _ = sse
+    assert client.get("/escalation/yok/events").status_code == 404
@@ -0,0 +1,99 @@
+"""
+Escalation store persistence: pending escalations survive a restart through
+the append-only journal, so a Telegram reply replayed by the listener still
+matches its escalation; the journal is compacted and pending records bounded.
+Run with: python -m pytest tests/test_escalation_store.py -v
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.escalation_store import EscalationStore, get_store  # noqa: E402
+
+
+def test_pending_escalations_survive_restart(tmp_path):
+    path = tmp_path / "escalations.jsonl"
+    before = EscalationStore()
+    before.persist_to(path)
+    pending = before.create("Maaş beklentiniz nedir?", "Maaş sorusu", "salary", trace_id="t1")
+    before.link_telegram_msg(pending, 501)
+    done = before.create("Sözleşme detayları?", "Hukuki", "legal")
+    before.link_telegram_msg(done, 502)
+    before.resolve(done, "Yanıt", "ham")
+
+    after = EscalationStore()
+    after.persist_to(path)
+    esc_id, record = after.find_by_telegram_msg_id(501)
+    assert esc_id == pending and record["status"] == "pending" and record["trace_id"] == "t1"
+    # Cozulmus kayitlar sadece bellekte tutulur
+    assert after.get(done) is None and after.find_by_telegram_msg_id(502) is None
+    before.close()
+    after.close()
+
+
+def test_journal_appends_one_line_per_change_and_compacts_on_load(tmp_path):
+    path = tmp_path / "escalations.jsonl"
+    store = EscalationStore()
+    store.persist_to(path)
+    ids = [store.create(f"Soru {i}", "r", "salary") for i in range(3)]
+    store.link_telegram_msg(ids[0], 10)
+    store.resolve(ids[1], "Yanıt", "ham")
+    store.close()
+    ops = [json.loads(line)["op"] for line in path.read_text(encoding="utf-8").splitlines()]
+    assert ops == ["create", "create", "create", "link", "resolve"]
+
+    # Yarim yazilmis son satir yok sayilir
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"op": "crea')
+    reloaded = EscalationStore()
+    reloaded.persist_to(path)
+    reloaded.close()
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [(e["op"], e["id"]) for e in lines] == [("create", ids[0]), ("create", ids[2])]
+    assert lines[0]["record"]["telegram_msg_id"] == 10
+
+
+def test_pending_limit_drops_oldest(tmp_path):
+    path = tmp_path / "escalations.jsonl"
+    store = EscalationStore(max_pending=2)
+    store.persist_to(path)
+    first = store.create("Soru 1", "r", "salary")
+    store.link_telegram_msg(first, 11)
+    second, third = store.create("Soru 2", "r", "salary"), store.create("Soru 3", "r", "salary")
+    assert store.get(first) is None and store.find_by_telegram_msg_id(11) is None
+    assert store.dropped_pending == 1 and len(store) == 2
+    store.close()
+
+    reloaded = EscalationStore()
+    reloaded.persist_to(path)
+    assert reloaded.get(first) is None and {second, third} <= set(reloaded._records)
+    reloaded.close()
+
+
+def test_replayed_reply_matches_escalation_after_restart(tmp_path):
+    from tools.telegram_listener import TelegramReplyListener
+
+    path = tmp_path / "escalations.jsonl"
+    get_store.cache_clear()
+    try:
+        get_store().persist_to(path)
+        esc_id = get_store().create("Maaş beklentiniz nedir?", "Maaş sorusu", "salary")
+        get_store().link_telegram_msg(esc_id, 777)
+
+        # Yeniden baslatma: bellek bos, kayit gunlukten yuklenir
+        get_store().close()
+        get_store.cache_clear()
+        get_store().persist_to(path)
+        listener = TelegramReplyListener()
+        handled = []
+        listener._handle_reply = lambda *args: handled.append(args)
+        listener._process_update({
+            "update_id": 1,
+            "message": {"message_id": 9, "text": "80k", "reply_to_message": {"message_id": 777}},
+        })
+        assert handled == [(esc_id, 9, "Maaş beklentiniz nedir?", "80k")]
+    finally:
+        get_store().close()
+        get_store.cache_clear()
@@ -0,0 +1,34 @@
+"""
+Gate classifier evaluation: agreement is reported only on logged LLM
+decisions the model was not trained on, never on its own training data.
+Run with: python -m pytest tests/test_gate_classifier.py -v
+"""
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.gate_classifier import GateClassifier, held_out, main, seed_corpus  # noqa: E402
+
+
+def test_training_messages_are_excluded_from_the_report(tmp_path, capsys):
+    corpus = seed_corpus()
+    assert len(corpus) > 10 and {"safe", "salary", "legal"} <= {y for _, y in corpus}
+
+    out = str(tmp_path / "model.json")
+    main(["train", "--out", out, "--epochs", "5"])
+    assert "Held-out küme yok" in capsys.readouterr().out
+    model = GateClassifier.load(out)
+    assert held_out(model, corpus) == []
+
+    log = tmp_path / "gate.jsonl"
+    rows = [
+        {"message": corpus[0][0], "can_respond": True, "category": "safe"},
+        {"message": "Yarın 11:00'de kısa bir görüntülü görüşme yapabilir miyiz?", "can_respond": True,
+         "category": "safe"},
+    ]
+    log.write_text("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in rows), encoding="utf-8")
+    main(["evaluate", "--model", out, "--log", str(log)])
+    report = capsys.readouterr().out
+    assert "Eğitimde görülen 1 örnek rapordan çıkarıldı" in report and "Örnek sayısı: 1" in report
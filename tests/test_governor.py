@@ -0,0 +1,135 @@
+"""
+LLM load governor: priority queueing, AIMD limit, token bucket, Retry-After
+handling (unit + through generate_gemini against the local LLM stub).
+Run with: python -m pytest tests/test_governor.py -v
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm.governor import Governor, GovernorTimeout, rate_limit_delay  # noqa: E402
+
+
+class _RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after: str | None):
+        super().__init__("429 Too Many Requests")
+        self.response = type("R", (), {"headers": {"retry-after": retry_after} if retry_after else {}})()
+
+
+def test_professionalize_is_granted_before_queued_drafts():
+    gov = Governor(initial_concurrency=1, max_concurrency=1)
+    holder = gov.acquire("openrouter", "m", "draft")
+    order: list[str] = []
+
+    def call(stage: str):
+        lane = gov.acquire("openrouter", "m", stage)
+        order.append(stage)
+        gov.release(lane, latency=0.01)
+
+    threads = [threading.Thread(target=call, args=("draft",))]
+    threads[0].start()
+    time.sleep(0.05)
+    threads.append(threading.Thread(target=call, args=("professionalize",)))
+    threads[1].start()
+    time.sleep(0.05)
+    assert gov.stats()["lanes"]["openrouter/m"]["queued"] == 2
+    gov.release(holder, latency=0.01)
+    for t in threads:
+        t.join(2)
+    assert order == ["professionalize", "draft"]
+
+
+def test_rate_limit_blocks_lane_halves_limit_and_retries():
+    gov = Governor(initial_concurrency=8, retries=2)
+    attempts: list[float] = []
+
+    def flaky():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise _RateLimited("0.2")
+        return "ok"
+
+    assert gov.call("openrouter", "m", "draft", flaky) == "ok"
+    assert attempts[1] - attempts[0] >= 0.19
+    lane = gov.stats()["lanes"]["openrouter/m"]
+    assert lane["rate_limited"] == 1 and lane["retries"] == 1
+    assert 4.0 <= lane["limit"] < 4.5
+
+    with pytest.raises(_RateLimited):
+        Governor(retries=0).call("openrouter", "m", "draft", lambda: (_ for _ in ()).throw(_RateLimited(None)))
+    # Rate limit disi hatalar tekrar denenmez
+    with pytest.raises(ValueError):
+        gov.call("openrouter", "m", "draft", lambda: int("x"))
+
+
+def test_aimd_increase_and_slow_call_decrease():
+    gov = Governor(initial_concurrency=2, max_concurrency=4, latency_target=1.0)
+    lane = gov.acquire("gemini", "m")
+    gov.release(lane, latency=0.1)
+    assert gov.stats()["lanes"]["gemini/m"]["limit"] == 2.5
+    lane = gov.acquire("gemini", "m")
+    gov.release(lane, latency=5.0)
+    assert gov.stats()["lanes"]["gemini/m"]["limit"] == 2.25
+    assert gov.stats()["lanes"]["gemini/m"]["slow"] == 1
+
+
+def test_token_bucket_shapes_rate():
+    gov = Governor(model_rps=20, burst=1)
+    started = time.monotonic()
+    for _ in range(5):
+        gov.call("openrouter", "m", "gate", lambda: None)
+    assert time.monotonic() - started >= 0.18
+
+
+def test_async_callers_respect_limit_and_queue_timeout():
+    gov = Governor(initial_concurrency=2, max_concurrency=2)
+    running = {"now": 0, "max": 0}
+
+    async def work():
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        await asyncio.sleep(0.02)
+        running["now"] -= 1
+        return 1
+
+    async def main():
+        return await asyncio.gather(*(gov.acall("openrouter", "m", "draft", work) for _ in range(8)))
+
+    assert sum(asyncio.run(main())) == 8
+    assert running["max"] == 2
+
+    tight = Governor(initial_concurrency=1, max_concurrency=1, queue_timeout=0.1)
+    held = tight.acquire("openrouter", "m")
+    with pytest.raises(GovernorTimeout):
+        asyncio.run(tight.aacquire("openrouter", "m"))
+    assert tight.stats()["lanes"]["openrouter/m"]["timeouts"] == 1
+    tight.release(held)
+
+
+def test_retry_after_parsing():
+    assert rate_limit_delay(_RateLimited("3"), 2.0) == 3.0
+    assert rate_limit_delay(_RateLimited(None), 2.0) == 2.0
+    assert rate_limit_delay(_RateLimited("Wed, 21 Oct 2015 07:28:00 GMT"), 2.0) == 0.0
+    assert rate_limit_delay(ValueError("x"), 2.0) is None
+
+
+def test_generate_gemini_survives_provider_429s(llm_env):
+    from llm import gemini_client
+    from llm.governor import get_governor
+
+    stub = llm_env.start("Tamam")
+    # SDK'nin kendi 2 denemesi de 429 alir; governor Retry-After sonrasi tekrar dener
+    stub.rate_limited = 3
+    text = gemini_client.generate_gemini("Merhaba", api_key="sk-or-test", stage="professionalize")
+    assert text == "Tamam"
+    assert len(stub.requests) == 4
+    lane = get_governor().stats()["lanes"]["openrouter/google/gemini-2.0-flash-lite-001"]
+    assert lane["rate_limited"] == 1 and lane["retries"] == 1
@@ -0,0 +1,111 @@
+"""
+Hedged LLM requests: a stalled call is duplicated after the learned latency
+percentile and the fast duplicate wins (local LLM stub with injected latency),
+plus per-stage budget and cap.
+Run with: python -m pytest tests/test_hedging.py -v
+"""
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm.hedging import Hedger  # noqa: E402
+
+STALL = 2.0
+# Tek isinma cagrisinin gecikmesi = ogrenilen esik; yerel jitter'in cok ustunde, STALL'in cok altinda
+WARM = 0.3
+
+
+@pytest.fixture
+def stub(llm_env):
+    return llm_env.start(
+        "Tamam",
+        llm_hedging_enabled=True,
+        llm_hedge_min_samples=1,
+        llm_hedge_budget={"gate": 0.5, "professionalize": 0.5},
+        llm_hedge_cap={"gate": 1, "professionalize": 1},
+    )
+
+
+def _won(stage: str) -> float:
+    from tools.metrics import get_metrics
+    m = get_metrics()
+    if not m.enabled:
+        return 0.0
+    return m.registry.get_sample_value("career_agent_llm_hedges_total", {"stage": stage, "outcome": "won"}) or 0.0
+
+
+def test_async_stalled_call_is_hedged_and_duplicate_wins(stub):
+    from llm.gemini_client import agenerate_gemini
+    from llm.hedging import get_hedger
+
+    won_before = _won("gate")
+
+    async def scenario():
+        stub.delays = [WARM]
+        assert await agenerate_gemini("Merhaba", api_key="sk-or-test", stage="gate") == "Tamam"
+        sent = len(stub.requests)
+        stub.delays = [STALL]
+        started = time.perf_counter()
+        text = await agenerate_gemini("Merhaba", api_key="sk-or-test", stage="gate")
+        return text, time.perf_counter() - started, len(stub.requests) - sent
+
+    text, elapsed, requests = asyncio.run(scenario())
+    assert text == "Tamam"
+    assert elapsed < STALL / 2
+    assert requests == 2
+    gate = get_hedger().stats()["stages"]["gate"]
+    assert gate["fired"] == 1 and gate["won"] == 1 and gate["in_flight"] == 0
+    assert get_hedger().stats()["thresholds_ms"]["gate/google/gemini-2.0-flash-lite-001"] is not None
+    if _won("gate") or won_before:
+        assert _won("gate") == won_before + 1
+
+
+def test_sync_hedging_and_stage_without_budget(stub):
+    from llm.gemini_client import generate_gemini
+    from llm.hedging import get_hedger
+
+    for stage in ("professionalize", "draft"):
+        stub.delays = [WARM]
+        generate_gemini("Merhaba", api_key="sk-or-test", stage=stage)
+
+    stub.delays = [STALL]
+    started = time.perf_counter()
+    assert generate_gemini("Merhaba", api_key="sk-or-test", stage="professionalize") == "Tamam"
+    assert time.perf_counter() - started < STALL / 2
+    assert get_hedger().stats()["stages"]["professionalize"]["won"] == 1
+
+    # draft icin butce yok: yavas cagri beklenir
+    stub.delays = [2 * WARM]
+    started = time.perf_counter()
+    generate_gemini("Merhaba", api_key="sk-or-test", stage="draft")
+    assert time.perf_counter() - started >= 2 * WARM
+    assert get_hedger().stats()["stages"]["draft"]["fired"] == 0
+
+
+def test_cap_and_budget_limit_concurrent_hedges():
+    hedger = Hedger(enabled=True, min_samples=1, budgets={"gate": 1.0}, caps={"gate": 1})
+    hedger.observe("gate", "m", 0.001)
+    calls = {"n": 0}
+
+    async def slow_then_fast():
+        calls["n"] += 1
+        # Ilk iki (birincil) cagri yavas, hedge'ler hizli
+        await asyncio.sleep(0.3 if calls["n"] <= 2 else 0.01)
+        return calls["n"]
+
+    async def scenario():
+        return await asyncio.gather(*(hedger.acall("gate", "m", slow_then_fast) for _ in range(2)))
+
+    asyncio.run(scenario())
+    stats = hedger.stats()["stages"]["gate"]
+    assert stats["fired"] == 1 and stats["won"] == 1 and stats["in_flight"] == 0
+
+    stingy = Hedger(enabled=True, min_samples=1, budgets={"gate": 0.01}, caps={"gate": 4})
+    stingy.observe("gate", "m", 0.001)
+    assert stingy.call("gate", "m", lambda: time.sleep(0.05) or "ok") == "ok"
+    assert stingy.stats()["stages"]["gate"]["fired"] == 0
@@ -0,0 +1,87 @@
+"""
+Keyword risk engine (tools/keyword_risk.py): Turkish folding, the nda
+boundary rewrite, multi-category matches and rules from profile.json.
+Run with: python -m pytest tests/test_keyword_risk.py -v
+"""
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.keyword_risk import build_matcher, load_profile_rules, turkish_fold  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def matcher():
+    return build_matcher()
+
+
+def test_turkish_fold_collapses_dotted_and_dotless_i():
+    assert turkish_fold("İMZA ımza IMZA") == "imza imza imza"
+    # Span'ler orijinal metne gore hesaplanir: uzunluk korunur
+    assert len(turkish_fold("İSTANBUL")) == len("İSTANBUL")
+
+
+@pytest.mark.parametrize("message", ["İMZA öncesi SÖZLEŞME", "ımza öncesi sözleşme", "TAZMİNAT şartları"])
+def test_folded_variants_match(matcher, message):
+    assert matcher.check(message)["category"] == "legal"
+
+
+def test_folded_profile_keyword_matches_any_i(matcher):
+    custom = build_matcher({"ai_interview_agent_config": {"escalation_triggers_to_human": [
+        {"category": "legal", "keywords": ["İmza yetkisi"]},
+    ]}})
+    for message in ("İMZA YETKİSİ kimde?", "ımza yetkisi kimde?", "imza   yetkisi"):
+        assert custom.check(message)["categories"] == ["legal"]
+
+
+@pytest.mark.parametrize("message", ["NDA imzalamanız gerekiyor", "nda?", "Bir (NDA) var"])
+def test_nda_hits_as_a_word(matcher, message):
+    match = matcher.check(message)
+    assert match["category"] == "legal" and match["matches"][0]["text"].lower() == "nda"
+
+
+@pytest.mark.parametrize("message", ["Londra'da çalışıyorum", "Veranda toplantısı", "randa"])
+def test_nda_inside_words_does_not_hit(matcher, message):
+    assert matcher.check(message) is None
+
+
+def test_several_categories_in_one_message(matcher):
+    message = "Maaş beklentinizi ve sözleşme detaylarını konuşalım, NDA de var."
+    result = matcher.check(message)
+    # Birincil kategori kural sirasina gore: salary legal'dan once
+    assert result["category"] == "salary" and result["categories"] == ["salary", "legal"]
+    assert [m["text"] for m in result["matches"]] == ["Maaş", "sözleşme", "NDA"]
+    assert all(message[m["start"]:m["end"]] == m["text"] for m in result["matches"])
+
+
+def test_rules_loaded_from_profile_json(tmp_path):
+    path = tmp_path / "profile.json"
+    path.write_text(json.dumps({"ai_interview_agent_config": {"escalation_triggers_to_human": [
+        {"trigger": "Canlı kodlama", "category": "technical", "keywords": ["Canlı  Kodlama", "live coding"]},
+        {"trigger": "Kategorisiz", "keywords": ["yan haklar"]},
+        {"trigger": "Anahtar kelimesiz", "action": "..."},
+    ]}}, ensure_ascii=False), encoding="utf-8")
+    data = json.loads(path.read_text(encoding="utf-8"))
+
+    rules = load_profile_rules(data)
+    assert [(r.category, r.source) for r in rules] == [("technical", "profile")] * 2 + [("other", "profile")]
+    custom = build_matcher(data)
+    result = custom.check("Yarın CANLI KODLAMA ve live coding oturumu var")
+    assert result["categories"] == ["technical"]
+    assert {m["source"] for m in result["matches"]} == {"profile"}
+    assert custom.check("Yan haklar neler?")["category"] == "other"
+    # Profil kurali kelime ortasinda eslesmez
+    assert custom.check("Oyan haklarla") is None
+
+
+def test_default_profile_adds_no_hard_triggers(matcher):
+    from tools.profile_store import get_profile
+
+    # Canli kodlama / teklif gibi konular LLM gate'e kalir
+    assert load_profile_rules(get_profile().data) == []
+    assert build_matcher(get_profile().data).check("Canlı kodlama testi yapabilir miyiz?") is None
+
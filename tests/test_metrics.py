@@ -0,0 +1,127 @@
+"""
+Prometheus metrics: stage/LLM histograms and pipeline counters after real
+pipeline runs against the local LLM stub, the /stats counters across the
+server and background loops, plus multi-process aggregation.
+Run with: python -m pytest tests/test_metrics.py -v
+"""
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+
+import pytest
+
+pytest.importorskip("prometheus_client")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+# Gecerli JSON degil: gate ve evaluator varsayilan karara duser
+REPLY = "Merhaba, mesajınız için teşekkür ederim. FastAPI ile REST API'ler geliştirdim. Saygılarımla."
+
+
+@pytest.fixture
+def client(llm_env):
+    from fastapi.testclient import TestClient
+
+    import agent_loop
+    import main
+
+    llm_env.start(REPLY, **llm_env.PIPELINE)
+    main.agent_loop = agent_loop.AgentLoop()
+    try:
+        yield TestClient(main.app)
+    finally:
+        main.agent_loop = None
+
+
+def _value(name: str, **labels) -> float:
+    from tools.metrics import get_metrics
+    return get_metrics().registry.get_sample_value(name, labels) or 0.0
+
+
+def test_pipeline_populates_stage_and_llm_metrics(client):
+    before = {
+        "draft": _value("career_agent_stage_seconds_count", stage="draft"),
+        "llm": _value("career_agent_llm_request_seconds_count", provider="openrouter",
+                      model="google/gemini-2.0-flash-lite-001"),
+        "llm_draft": _value("career_agent_llm_request_seconds_count", provider="openrouter",
+                            model="google/gemini-2.0-flash-001"),
+        "gate_fallback": _value("career_agent_parse_fallbacks_total", component="gate"),
+        "eval_fallback": _value("career_agent_parse_fallbacks_total", component="evaluator"),
+        "approved": _value("career_agent_approvals_total", evaluator="llm"),
+        "escalated": _value("career_agent_escalations_total", source="keyword", category="salary"),
+    }
+
+    assert client.post("/process", json={"message": "FastAPI deneyiminizden bahseder misiniz?"}).status_code == 200
+    assert client.post("/process", json={"message": "Maaş beklentiniz nedir?"}).json()["human_intervention"]
+
+    res = client.get("/metrics")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain")
+    for stage in ("notification", "keyword", "gate", "draft", "pre_evaluation", "evaluation"):
+        assert f'career_agent_stage_seconds_bucket{{le="0.0001",stage="{stage}"}}' in res.text
+
+    assert _value("career_agent_stage_seconds_count", stage="draft") == before["draft"] + 1
+    # gate + judge kucuk modelde, taslak asama profilindeki buyuk modelde
+    assert _value("career_agent_llm_request_seconds_count", provider="openrouter",
+                  model="google/gemini-2.0-flash-lite-001") == before["llm"] + 2
+    assert _value("career_agent_llm_request_seconds_count", provider="openrouter",
+                  model="google/gemini-2.0-flash-001") == before["llm_draft"] + 1
+    assert _value("career_agent_parse_fallbacks_total", component="gate") == before["gate_fallback"] + 1
+    assert _value("career_agent_parse_fallbacks_total", component="evaluator") == before["eval_fallback"] + 1
+    assert _value("career_agent_approvals_total", evaluator="llm") == before["approved"] + 1
+    assert _value("career_agent_escalations_total", source="keyword", category="salary") == before["escalated"] + 1
+
+
+def test_agent_counters_add_up_across_loops(client):
+    import main
+
+    loop = main.agent_loop
+    # Senkron process() arka plan loop'unda, /process sunucu loop'unda sayar
+    threads = [
+        threading.Thread(target=loop.process, args=(f"Docker deneyiminiz var mı? #{i}",)) for i in range(4)
+    ]
+    for t in threads:
+        t.start()
+    for i in range(4):
+        assert client.post("/process", json={"message": f"FastAPI deneyiminiz var mı? #{i}"}).status_code == 200
+    for t in threads:
+        t.join(timeout=30)
+
+    stats = client.get("/stats").json()
+    assert stats["gate_llm_calls"] == 8 and loop.stats["gate_llm_calls"] == 8
+    assert stats["llm_evaluations"] == loop.stats.snapshot()["llm_evaluations"] > 0
+
+
+def test_disabled_metrics_are_noops():
+    from tools.metrics import Metrics
+
+    m = Metrics(enabled=False)
+    m.observe_stage("gate", 0.1)
+    m.observe_llm("openrouter", "x", 0.1)
+    m.escalation("keyword", "salary")
+    m.approved("pre_evaluator")
+    m.revisions.inc()
+    with pytest.raises(RuntimeError):
+        m.render()
+
+
+def test_multiprocess_workers_are_aggregated(tmp_path):
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path), "PYTHONPATH": ROOT}
+    worker = textwrap.dedent("""
+        from tools.metrics import Metrics
+        m = Metrics()
+        m.observe_stage("gate", 0.05)
+        m.escalation("classifier", "legal")
+    """)
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", worker], env=env, check=True, cwd=ROOT)
+    scrape = subprocess.run(
+        [sys.executable, "-c", "from tools.metrics import Metrics; print(Metrics().render()[0].decode())"],
+        env=env, check=True, cwd=ROOT, capture_output=True, text=True,
+    ).stdout
+    assert 'career_agent_stage_seconds_count{stage="gate"} 2.0' in scrape
+    assert 'career_agent_escalations_total{category="legal",source="classifier"} 2.0' in scrape
@@ -0,0 +1,69 @@
+"""
+Deterministic pre-evaluator: obvious failures are rejected locally with
+structured feedback, ambiguous drafts are deferred to the LLM judge.
+Run with: python -m pytest tests/test_pre_evaluator.py -v
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.pre_evaluator import PreEvaluator  # noqa: E402
+from tools.profile_store import get_profile  # noqa: E402
+
+INVITE = "Merhaba, sizi Çarşamba 14:00'te teknik mülakata davet etmek istiyoruz. Uygun musunuz?"
+GOOD = (
+    "Merhaba, davetiniz için çok teşekkür ederim. Çarşamba 14:00 teknik mülakat için bana uygun. "
+    "Görüşmede FastAPI ve PostgreSQL ile geliştirdiğim projelerden bahsetmekten memnuniyet duyarım. "
+    "Saygılarımla."
+)
+
+
+def _evaluate(response, message=INVITE, **kwargs):
+    return PreEvaluator(70, **kwargs).evaluate(message, response, get_profile())
+
+
+def test_result_has_evaluation_log_shape():
+    result = _evaluate(GOOD)
+    for key in ("scores", "total_score", "feedback", "approved"):
+        assert key in result
+    assert set(result["scores"]) == {"professional_tone", "clarity", "completeness", "safety", "relevance"}
+
+
+def test_clean_draft_is_deferred_unless_auto_approve():
+    assert _evaluate(GOOD)["verdict"] == "defer"
+    approved = _evaluate(GOOD, auto_approve=True)
+    assert approved["verdict"] == "approve" and approved["approved"] is True
+
+
+def test_obvious_failures_are_rejected_with_feedback():
+    cases = {
+        "": "boş",
+        "Tamam.": "kısa",
+        GOOD + " Beklentim aylık 85.000 TL net.": "ücret",
+        "Merhaba [Şirket Adı] ekibi, davetiniz için teşekkür ederim, Çarşamba uygundur.": "yer tutucu",
+        "Merhaba, teşekkürler. Sözleşmedeki rekabet yasağı maddesini kabul ediyorum, görüşmek üzere.": "hukuki",
+        "Merhaba, teşekkür ederim. Kubernetes ve Kafka ile 5 yıl deneyimim var, görüşmeye hazırım.": "yetenek",
+    }
+    for response, needle in cases.items():
+        result = _evaluate(response)
+        assert result["verdict"] == "reject", response
+        assert result["approved"] is False
+        assert result["total_score"] < 70
+        assert needle in result["feedback"].lower(), result["feedback"]
+
+
+def test_negated_or_profile_skills_are_not_claims():
+    ok = (
+        "Merhaba, sorunuz için teşekkür ederim. Kubernetes deneyimim maalesef yok, ancak Docker ile "
+        "FastAPI servislerini container olarak geliştirdim ve yayına aldım."
+    )
+    assert _evaluate(ok, message="Kubernetes deneyiminiz var mı?")["verdict"] != "reject"
+
+
+def test_money_terms_need_word_boundaries():
+    online = "Merhaba, teşekkür ederim. Görüşmeyi internet üzerinden 14:00 da yapabiliriz, uygundur."
+    assert _evaluate(online)["verdict"] != "reject"
+    for figure in ("Maaşım şu an 65000 civarında.", "Brüt 90000 bekliyorum."):
+        result = _evaluate(GOOD + " " + figure)
+        assert result["verdict"] == "reject" and "ücret" in result["feedback"].lower(), figure
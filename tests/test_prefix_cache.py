@@ -0,0 +1,146 @@
+"""
+Prefix-cache mode against a local OpenAI-compatible stand-in (tests/llm_stub.py),
+and the Gemini context cache with CachedContent faked.
+Run with: python -m pytest tests/test_prefix_cache.py -v
+"""
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def stub_llm(llm_env):
+    return llm_env.start(llm_prefix_cache=True)
+
+
+def test_static_system_prompt_sent_as_cacheable_prefix(stub_llm):
+    from agents.career_agent import CareerAgent
+
+    agent = CareerAgent()
+    agent.generate_response("Mülakat için Pazartesi uygun musunuz?")
+    agent.generate_response("Docker deneyiminizden bahseder misiniz?")
+
+    systems = [r["messages"][0] for r in stub_llm.requests]
+    assert len(systems) == 2
+    assert systems[0] == systems[1]
+    part = systems[0]["content"][0]
+    assert part["cache_control"] == {"type": "ephemeral"}
+    assert "Yetenekler" in part["text"]
+    # Istek yolunda sadece isveren mesaji gider
+    assert stub_llm.requests[1]["messages"][1]["content"].endswith("Docker deneyiminizden bahseder misiniz?")
+
+
+def test_prefix_hit_ratio_reported(stub_llm):
+    from agents.evaluator_agent import EvaluatorAgent
+    from llm.prefix_cache import get_prefix_cache
+
+    evaluator = EvaluatorAgent()
+    for i in range(4):
+        asyncio.run(evaluator.aevaluate(f"Soru {i}", "Yanıt"))
+
+    stats = get_prefix_cache().stats()["providers"]["openrouter"]
+    assert stats["requests"] == 4
+    assert stats["hit_requests"] == 3
+    assert stats["request_hit_ratio"] == 0.75
+    assert 0 < stats["token_hit_ratio"] < 1
+
+
+def test_gate_system_prompt_compiled_once(stub_llm):
+    from agents.gate_agent import _gate_system_prompt, check_gate
+
+    _gate_system_prompt.cache_clear()
+    for msg in ("Merhaba", "Müsait misiniz?", "Tanışalım mı?"):
+        check_gate(msg, profile_context="profil", escalation_context="kurallar")
+    info = _gate_system_prompt.cache_info()
+    assert info.misses == 1 and info.hits == 2
+
+
+def test_prefix_mode_disabled_sends_plain_system(stub_llm):
+    from llm.gemini_client import generate_gemini
+    from llm.prefix_cache import get_prefix_cache
+
+    get_prefix_cache().enabled = False
+    generate_gemini("Merhaba", system_instruction="Sistem")
+    assert stub_llm.requests[-1]["messages"][0] == {"role": "system", "content": "Sistem"}
+
+
+class _FakeCaches:
+    """Stands in for google.generativeai CachedContent: a slow create, counted."""
+
+    def __init__(self, delay: float = 0.2, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.created = 0
+
+    def create(self, **kwargs):
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("cache create failed")
+        self.created += 1
+        return object()
+
+
+@pytest.fixture
+def fake_gemini_cache(monkeypatch):
+    from google.generativeai import GenerativeModel, caching
+
+    fake = _FakeCaches()
+    monkeypatch.setattr(caching.CachedContent, "create", fake.create)
+    monkeypatch.setattr(GenerativeModel, "from_cached_content", classmethod(lambda cls, cached_content: ("cached",)))
+    return fake
+
+
+def test_gemini_cache_created_once_outside_the_lock(fake_gemini_cache):
+    from llm.prefix_cache import PrefixCache
+
+    cache = PrefixCache()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(cache.gemini_model, "key", "gemini-x", "Sistem") for _ in range(4)]
+        time.sleep(0.05)
+        # Olusturma surerken kilit serbest: istatistik okuma beklemez
+        started = time.perf_counter()
+        cache.stats()
+        assert time.perf_counter() - started < 0.05
+        results = [f.result() for f in futures]
+    assert results == [("cached",)] * 4
+    assert fake_gemini_cache.created == 1
+
+
+def test_gemini_cache_failure_falls_back_to_plain_model(fake_gemini_cache):
+    from llm.prefix_cache import PrefixCache
+
+    fake_gemini_cache.fail = True
+    cache = PrefixCache()
+    assert cache.gemini_model("key", "gemini-x", "Sistem") is None
+    # Basarisiz prefix bir TTL boyunca tekrar denenmez
+    fake_gemini_cache.delay = 5
+    assert cache.gemini_model("key", "gemini-x", "Sistem") is None
+
+
+def test_async_path_does_not_block_the_event_loop(fake_gemini_cache, llm_env):
+    from llm import gemini_client
+
+    llm_env.override(llm_prefix_cache=True)
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        model = await gemini_client._agemini_model("key", "gemini-x", "Sistem")
+        task.cancel()
+        return model, ticks
+
+    model, ticks = asyncio.run(main())
+    assert model == ("cached",) and ticks >= 5
@@ -0,0 +1,77 @@
+"""
+Profile retrieval: BM25 ranking of profile chunks, token budget, one index per
+profile version, snippets in the user content with a static system prompt
+(local LLM stub), and the offline coverage check on the test corpus.
+Run with: python -m pytest tests/test_profile_retrieval.py -v
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.profile_retrieval import (  # noqa: E402
+    _answerable_corpus,
+    coverage_report,
+    estimate_tokens,
+    profile_index,
+    tokenize,
+)
+from tools.profile_store import get_profile  # noqa: E402
+
+
+def test_bm25_picks_relevant_chunks_within_budget():
+    profile = get_profile()
+    index = profile_index(profile)
+    assert profile_index(profile) is index
+    assert "Müsaitlik:" in index.identity
+
+    best = index.chunks[index.search("Unity ile multiplayer oyun geliştirdiniz mi?")[0][1]]
+    assert best.section == "skills" and "Unity Engine" in best.text
+    assert [c.section for c in index.select("Remote çalışmaya açık mısınız?", 4, 400)] == ["preferences"]
+    assert index.select("Bu hafta müsait misiniz?", 4, 400) == []
+
+    picked = index.select("PostgreSQL ve Docker ile backend projeleriniz", 10, 60)
+    assert picked and sum(estimate_tokens(c.text) for c in picked) <= 60
+    # Ek ekleri farkli olsa da ayni koke esler
+    assert tokenize("projelerinizden")[0] == tokenize("projeler")[0]
+
+
+def test_offline_check_cuts_profile_tokens_and_keeps_terms():
+    report = coverage_report(get_profile(), _answerable_corpus(), top_k=4, budget=400)
+    assert report["messages"] > 10
+    assert report["token_reduction"] > 0.3
+    assert report["term_coverage"] >= 0.9
+
+
+def _text(message: dict) -> str:
+    content = message["content"]
+    return content if isinstance(content, str) else "".join(p.get("text", "") for p in content)
+
+
+@pytest.fixture
+def stub(llm_env):
+    return llm_env.start('{"can_respond": true, "reason": "ok", "category": "safe"}', profile_retrieval_enabled=True)
+
+
+def test_snippets_go_to_user_content_and_system_prompt_stays_static(stub):
+    from agents.career_agent import CareerAgent
+    from agents.gate_agent import check_gate
+    from tools.profile_retrieval import prompt_context
+
+    agent = CareerAgent()
+    agent.generate_response("PostgreSQL ile ne tür projeler geliştirdiniz?")
+    agent.generate_response("Unity ile multiplayer deneyiminiz var mı?")
+    first, second = stub.requests
+    system = _text(first["messages"][0])
+    assert system == _text(second["messages"][0])
+    assert "İsim:" in system and "Yetenekler" not in system
+    assert "PostgreSQL" in _text(first["messages"][-1]) and "Unity" not in _text(first["messages"][-1])
+    assert "Unity Engine" in _text(second["messages"][-1])
+
+    message = "Remote çalışmaya açık mısınız?"
+    context, snippets = prompt_context(get_profile(), message)
+    assert check_gate(message, context, get_profile().escalation_context, snippets)["can_respond"]
+    gate_system, gate_user = _text(stub.requests[-1]["messages"][0]), _text(stub.requests[-1]["messages"][-1])
+    assert "ESKALASYON KURALLARI" in gate_system and "Tercihler: Remote" in gate_user
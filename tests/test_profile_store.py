@@ -0,0 +1,68 @@
+"""
+ProfileStore: parse-once snapshots and mtime/inode based hot reload.
+Run with: python -m pytest tests/test_profile_store.py -v
+"""
+import json
+import os
+import shutil
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.profile_store import ProfileStore  # noqa: E402
+
+_PROFILE = os.path.join(os.path.dirname(__file__), "..", "data", "profile.json")
+
+
+def _write_atomic(path, data):
+    tmp = str(path) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def test_snapshot_is_parsed_once_and_immutable(tmp_path):
+    path = tmp_path / "profile.json"
+    shutil.copy(_PROFILE, path)
+    store = ProfileStore(str(path), check_interval=60)
+
+    snap = store.snapshot()
+    assert store.snapshot() is snap
+    assert "Yetenekler:" in snap.profile_context
+    assert "ESKALASYON KURALLARI" in snap.escalation_context
+    assert json.loads(snap.json_body) == json.load(open(path, encoding="utf-8"))
+    try:
+        snap.data["candidate_profile"] = {}
+        raise AssertionError("snapshot data must be read-only")
+    except TypeError:
+        pass
+
+
+def test_hot_reload_swaps_version_and_keeps_old_snapshot(tmp_path):
+    path = tmp_path / "profile.json"
+    shutil.copy(_PROFILE, path)
+    store = ProfileStore(str(path), check_interval=0)
+    old = store.snapshot()
+
+    data = json.load(open(path, encoding="utf-8"))
+    data["candidate_profile"]["personal_info"]["name"] = "Test Aday"
+    _write_atomic(path, data)
+
+    new = store.snapshot()
+    assert new.version != old.version
+    assert "Test Aday" in new.profile_context
+    assert "Test Aday" not in old.profile_context
+    assert store.reloads == 1
+
+
+def test_broken_edit_keeps_previous_version(tmp_path):
+    path = tmp_path / "profile.json"
+    shutil.copy(_PROFILE, path)
+    store = ProfileStore(str(path), check_interval=0)
+    good = store.snapshot()
+
+    time.sleep(0.01)
+    path.write_text("{yarim", encoding="utf-8")
+    assert store.snapshot().version == good.version
+    assert store.reloads == 0
@@ -0,0 +1,78 @@
+"""
+Per-stage model profiles: model / max tokens / temperature / timeout reach the
+provider per stage (local LLM stub), and GET /llm/report shows latency and
+token usage per stage and model.
+Run with: python -m pytest tests/test_profiles.py -v
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm.profiles import parse_profiles  # noqa: E402
+
+
+@pytest.fixture
+def stub(llm_env):
+    return llm_env.start("Tamam")
+
+
+def test_default_profiles_tier_models_per_stage(stub):
+    from fastapi.testclient import TestClient
+
+    import main
+    from llm.gemini_client import astream_gemini, generate_gemini
+
+    generate_gemini("Merhaba", api_key="sk-or-test", temperature=0.9, stage="gate")
+
+    async def draft():
+        return "".join([d async for d in astream_gemini("Merhaba", api_key="sk-or-test", temperature=0.7, stage="draft")])
+
+    assert asyncio.run(draft()) == "Tamam"
+    generate_gemini("Merhaba", api_key="sk-or-test", temperature=0.4)
+
+    gate, drafted, plain = stub.requests
+    assert (gate["model"], gate["max_tokens"], gate["temperature"]) == ("google/gemini-2.0-flash-lite-001", 200, 0.1)
+    # Taslakta sicakligi cagiran belirler (best-of-N)
+    assert (drafted["model"], drafted["max_tokens"], drafted["temperature"]) == ("google/gemini-2.0-flash-001", 1024, 0.7)
+    # Profili olmayan cagri eskisi gibi
+    assert plain["model"] == "google/gemini-2.0-flash-lite-001" and "max_tokens" not in plain
+
+    body = TestClient(main.app).get("/llm/report").json()
+    assert body["profiles"]["gate"]["max_tokens"] == 200
+    rows = {(r["stage"], r["model"]): r for r in body["stages"]}
+    gate_row = rows[("gate", "google/gemini-2.0-flash-lite-001")]
+    assert gate_row["calls"] == 1 and gate_row["errors"] == 0 and gate_row["p95_ms"] is not None
+    assert gate_row["prompt_tokens"] > 0 and gate_row["completion_tokens"] > 0
+    assert rows[("draft", "google/gemini-2.0-flash-001")]["completion_tokens"] > 0
+    assert rows[("-", "google/gemini-2.0-flash-lite-001")]["calls"] == 1
+
+
+def test_custom_profile_timeout_and_explicit_model(stub, llm_env):
+    from llm.gemini_client import generate_gemini
+    from llm.profiles import get_stage_report
+
+    llm_env.override(llm_stage_profiles={
+        "evaluation": {"model": {"openrouter": "small-judge"}, "timeout": 0.2},
+    })
+
+    generate_gemini("Merhaba", api_key="sk-or-test", stage="evaluation", model="pinned")
+    assert stub.requests[-1]["model"] == "pinned"
+
+    # SDK kendi tekrarlariyla birlikte her denemede zaman asimina ugrar
+    stub.delays = [1.0, 1.0, 1.0]
+    with pytest.raises(Exception):
+        generate_gemini("Merhaba", api_key="sk-or-test", stage="evaluation")
+    assert stub.requests[-1]["model"] == "small-judge"
+    row = next(r for r in get_stage_report().report() if r["model"] == "small-judge")
+    assert row["calls"] == 1 and row["errors"] == 1 and row["p50_ms"] is None
+
+
+def test_parse_profiles_rejects_unknown_fields():
+    profiles = parse_profiles({"gate": {"model": "m", "temperature": 0.0}})
+    assert profiles["gate"].temperature == 0.0 and profiles["gate"].max_tokens is None
+    with pytest.raises(ValueError):
+        parse_profiles({"gate": {"max_output_tokens": 10}})
@@ -0,0 +1,146 @@
+"""
+Response cache (tools/response_cache.py) and its use in AgentLoop: hits on
+repeated normalized messages, invalidation on profile/prompt/threshold
+changes, TTL and LRU bounds, and escalated or failed results never cached
+(LLM calls stubbed).
+Run with: python -m pytest tests/test_response_cache.py -v
+"""
+import asyncio
+import json
+import os
+import shutil
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.response_cache import ResponseCache, TTLCache  # noqa: E402
+
+_PROFILE = os.path.join(os.path.dirname(__file__), "..", "data", "profile.json")
+REPLY = (
+    "Merhaba, mesajınız için teşekkür ederim. FastAPI ile REST API'ler geliştirdim ve "
+    "PostgreSQL ile üretimde kullandım. Saygılarımla."
+)
+
+
+@pytest.fixture
+def make_loop(llm_env, tmp_path):
+    import agent_loop
+    from tools.profile_store import get_profile_store
+
+    profile_path = tmp_path / "profile.json"
+    shutil.copy(_PROFILE, profile_path)
+    llm_env.override(
+        gemini_api_key="sk-or-test", pre_evaluator_enabled=False, profile_path=str(profile_path),
+        profile_check_interval_seconds=0,
+        **{**llm_env.PIPELINE, "response_cache_enabled": True},
+    )
+    get_profile_store.cache_clear()
+    gate_reply = {"can_respond": True, "reason": "", "category": "safe"}
+
+    async def gate(*args, **kwargs):
+        return dict(gate_reply)
+
+    saved_gate = agent_loop.acheck_gate
+    agent_loop.acheck_gate = gate
+
+    def build(approve: bool = True, fail_draft: bool = False):
+        calls = {"draft": 0}
+
+        async def draft(message, **kwargs):
+            calls["draft"] += 1
+            if fail_draft:
+                raise RuntimeError("LLM down")
+            return REPLY
+
+        async def judge(message, response):
+            return {"scores": {}, "total_score": 90 if approve else 10, "feedback": "", "approved": approve}
+
+        loop = agent_loop.AgentLoop()
+        loop.career_agent.agenerate_response = draft
+        loop.evaluator.aevaluate = judge
+        loop.notification.notify_new_employer_message = lambda *a, **k: None
+        loop.notification.notify_response_sent = lambda *a, **k: None
+        loop.notification.notify_unknown_question = lambda *a, **k: None
+        loop.draft_calls = calls
+        return loop
+
+    build.profile_path = profile_path
+    build.gate_reply = gate_reply
+    try:
+        yield build
+    finally:
+        agent_loop.acheck_gate = saved_gate
+        get_profile_store.cache_clear()
+
+
+def _run(loop, message):
+    return asyncio.run(loop.aprocess(message))
+
+
+def test_repeated_normalized_message_hits(make_loop):
+    loop = make_loop()
+    first = _run(loop, "FastAPI deneyiminiz var mı?")
+    second = _run(loop, "  fastapı   DENEYİMİNİZ var mı?  ")
+    assert "cached" not in first and second["cached"] is True
+    assert second["response"] == first["response"] and loop.draft_calls["draft"] == 1
+    assert loop.cache.responses.stats()["hits"] == 1
+
+
+def test_profile_version_bump_misses(make_loop):
+    loop = make_loop()
+    _run(loop, "FastAPI deneyiminiz var mı?")
+    data = json.loads(make_loop.profile_path.read_text(encoding="utf-8"))
+    data["candidate_profile"]["personal_info"]["name"] = "Test Aday"
+    make_loop.profile_path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+    again = _run(loop, "FastAPI deneyiminiz var mı?")
+    assert "cached" not in again and loop.draft_calls["draft"] == 2
+
+
+def test_prompt_or_threshold_change_changes_the_key(monkeypatch):
+    import prompts.career_agent_prompts as prompts
+
+    base = ResponseCache(8, 60, threshold=70).key("Merhaba", "v1")
+    assert ResponseCache(8, 60, threshold=70).key("Merhaba", "v1") == base
+    assert ResponseCache(8, 60, threshold=80).key("Merhaba", "v1") != base
+    monkeypatch.setattr(prompts, "CAREER_SYSTEM_PROMPT", prompts.CAREER_SYSTEM_PROMPT + " ")
+    assert ResponseCache(8, 60, threshold=70).key("Merhaba", "v1") != base
+
+
+def test_ttl_expiry():
+    cache = TTLCache(max_entries=8, ttl=0.05)
+    cache.set("k", 1)
+    assert cache.get("k") == 1
+    time.sleep(0.08)
+    assert cache.get("k") is None and cache.stats()["entries"] == 0
+
+
+def test_lru_eviction_at_max_entries(make_loop, llm_env):
+    llm_env.override(response_cache_max_entries=2)
+    loop = make_loop()
+    for message in ("Soru bir?", "Soru iki?"):
+        _run(loop, message)
+    _run(loop, "Soru bir?")  # en son kullanilan olur
+    _run(loop, "Soru üç?")   # "Soru iki?" atilir
+    assert loop.cache.responses.stats()["entries"] == 2
+    assert _run(loop, "Soru bir?")["cached"] is True
+    assert "cached" not in _run(loop, "Soru iki?")
+
+
+def test_escalated_and_failed_results_are_not_cached(make_loop):
+    loop = make_loop(approve=False)
+    assert _run(loop, "Maaş beklentiniz nedir?")["human_intervention"] is True
+    assert _run(loop, "FastAPI deneyiminiz var mı?")["max_revisions_reached"] is True
+
+    make_loop.gate_reply.update(can_respond=False, reason="Kapsam dışı", category="other")
+    assert _run(loop, "Kubernetes cluster'ı kurar mısınız?")["human_intervention"] is True
+    assert loop.cache.responses.stats()["entries"] == 0
+
+    failing = make_loop(fail_draft=True)
+    make_loop.gate_reply.update(can_respond=True)
+    with pytest.raises(RuntimeError):
+        _run(failing, "Docker deneyiminiz var mı?")
+    assert failing.cache.responses.stats()["entries"] == 0
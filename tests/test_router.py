@@ -0,0 +1,128 @@
+"""
+Multi-backend routing: EWMA ordering, circuit breaker (open -> half-open probe
+-> closed), request errors without failover, and failover between two
+configured backends (one down) through generate_gemini + GET /llm/routing.
+Run with: python -m pytest tests/test_router.py -v
+"""
+import asyncio
+import os
+import socket
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm.router import Backend, Router, parse_backends  # noqa: E402
+
+A = Backend("a", "openrouter", "sk-or-a", "m")
+B = Backend("b", "openrouter", "sk-or-b", "m")
+
+
+class _BadRequest(Exception):
+    status_code = 400
+
+
+def _boom(backend):
+    raise ConnectionError(f"{backend.name} down")
+
+
+def test_routes_to_fastest_and_fails_over():
+    router = Router([A, B], failure_threshold=2)
+    router.record(A, 0.5, ok=True)
+    router.record(B, 0.1, ok=True)
+    assert router.route([A, B]) == [B, A]
+
+    calls: list[str] = []
+
+    def flaky(backend):
+        calls.append(backend.name)
+        if backend is B:
+            raise ConnectionError("b down")
+        return backend.name
+
+    assert router.call([A, B], flaky) == "a"
+    assert calls == ["b", "a"]
+    stats = {b["name"]: b for b in router.stats()["backends"]}
+    assert stats["b"]["failovers"] == 1 and stats["b"]["error_rate"] > 0
+    assert router.stats()["failovers"] == 1
+
+    # Istegin kendisi hataliysa diger backend denenmez ve backend cezalandirilmaz
+    with pytest.raises(_BadRequest):
+        router.call([A], lambda b: (_ for _ in ()).throw(_BadRequest()))
+    assert {b["name"]: b for b in router.stats()["backends"]}["a"]["failures"] == 0
+
+
+def test_breaker_opens_probes_half_open_and_closes():
+    router = Router([A, B], failure_threshold=2, open_seconds=0.1)
+    for _ in range(2):
+        router.record(A, None, ok=False)
+    assert {b["name"]: b["state"] for b in router.stats()["backends"]}["a"] == "open"
+    assert router.route([A, B]) == [B]
+
+    time.sleep(0.12)
+    # Tek bir istek probe olur, ayni anda gelen digeri A'yi atlar
+    assert router.route([A, B]) == [A, B]
+    assert router.route([A, B]) == [B]
+    router.record(A, None, ok=False)
+    assert router.route([A, B]) == [B]
+
+    time.sleep(0.12)
+    assert asyncio.run(router.acall([A, B], _ok_async)) == "a"
+    assert {b["name"]: b["state"] for b in router.stats()["backends"]}["a"] == "closed"
+
+    # Tum devreler acikken yine de denenir (en once acilan ilk)
+    lone = Router([A], failure_threshold=1)
+    with pytest.raises(ConnectionError):
+        lone.call([A], _boom)
+    assert lone.route([A]) == [A]
+
+
+async def _ok_async(backend):
+    return backend.name
+
+
+def test_parse_backends():
+    backends = parse_backends(
+        [{"base_url": "http://x/v1", "api_key": "k"}, {"name": "openrouter", "api_key": "sk-or-2"}, {"api_key": "AIza"}],
+        {"openrouter": "default-or", "gemini": "default-gem"},
+    )
+    assert [(b.name, b.provider, b.model) for b in backends] == [
+        ("openrouter", "openrouter", "default-or"),
+        ("openrouter-2", "openrouter", "default-or"),
+        ("gemini", "gemini", "default-gem"),
+    ]
+    with pytest.raises(ValueError):
+        parse_backends([{"name": "x"}], {})
+
+
+def _closed_port_url() -> str:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}/v1"
+
+
+def test_generate_gemini_fails_over_to_healthy_backend(llm_env):
+    from fastapi.testclient import TestClient
+
+    import main
+    from llm import gemini_client
+
+    stub = llm_env.start("Tamam", llm_breaker_failures=1)
+    llm_env.override(llm_backends=[
+        {"name": "down", "base_url": _closed_port_url(), "api_key": "sk-or-down", "model": "m"},
+        {"name": "up", "base_url": stub.base_url, "api_key": "sk-or-up", "model": "m"},
+    ])
+    assert gemini_client.generate_gemini("Merhaba", api_key="", stage="gate") == "Tamam"
+    # Devre acik: ikinci cagri dogrudan saglikli backend'e gider
+    assert gemini_client.generate_gemini("Merhaba", api_key="", stage="gate") == "Tamam"
+    assert len(stub.requests) == 2
+
+    routing = TestClient(main.app).get("/llm/routing").json()
+    by_name = {b["name"]: b for b in routing["backends"]}
+    assert routing["configured"] and routing["failovers"] == 1
+    assert by_name["down"]["state"] == "open" and by_name["down"]["retry_in_s"] > 0
+    assert by_name["up"]["state"] == "closed" and by_name["up"]["calls"] == 2
+    assert by_name["up"]["latency_ms"] is not None
+    assert "api_key" not in by_name["up"]
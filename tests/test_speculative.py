@@ -0,0 +1,69 @@
+"""
+Speculative drafting against the local LLM stub (tests/llm_stub.py): when the
+gate escalates, the in-flight draft is cancelled, counted as wasted and never
+sent.
+Run with: python -m pytest tests/test_speculative.py -v
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DRAFT = "Merhaba, Kubernetes cluster'ını sıfırdan şöyle kurarım. Saygılarımla."
+DRAFT_DELAY = 2.0
+ESCALATE = {"can_respond": False, "reason": "Profilde olmayan mimari soru", "category": "technical"}
+
+
+def _responder(req: dict) -> tuple[str, float]:
+    system = req["messages"][0]["content"]
+    text = system[0]["text"] if isinstance(system, list) else system
+    if text.startswith("Sen bir karar mekanizmasısın"):
+        # Taslak istegi gate cevabindan once yola ciksin
+        return json.dumps(ESCALATE, ensure_ascii=False), 0.2
+    return DRAFT, DRAFT_DELAY
+
+
+def test_gate_escalation_cancels_in_flight_draft(llm_env):
+    import agent_loop
+
+    stub = llm_env.start(**{**llm_env.PIPELINE, "speculative_drafting": True})
+    stub.responder = _responder
+    drafts: list = []
+
+    class RecordingDraft(agent_loop._SpeculativeDraft):
+        def __init__(self):
+            super().__init__()
+            drafts.append(self)
+
+    saved = agent_loop._SpeculativeDraft
+    agent_loop._SpeculativeDraft = RecordingDraft
+    try:
+        loop = agent_loop.AgentLoop()
+        sent: list = []
+        loop.notification.notify_new_employer_message = lambda *a, **k: None
+        loop.notification.notify_unknown_question = lambda *a, **k: None
+        loop.notification.notify_response_sent = lambda *a, **k: sent.append(a)
+
+        async def main():
+            started = time.perf_counter()
+            result = await loop.aprocess("Kubernetes cluster'ını sıfırdan nasıl ayağa kaldırırsınız?")
+            elapsed = time.perf_counter() - started
+            # Iptal edilen gorevin bitmesini bekle
+            await asyncio.gather(drafts[0].task, return_exceptions=True)
+            return result, elapsed
+
+        result, elapsed = asyncio.run(main())
+    finally:
+        agent_loop._SpeculativeDraft = saved
+
+    assert result["human_intervention"] is True and result["unknown_result"]["category"] == "technical"
+    assert DRAFT not in result["response"] and sent == []
+    assert len(drafts) == 1 and drafts[0].discarded and drafts[0].task.cancelled()
+    # Gate taslagi beklemeden eskale etti
+    assert elapsed < DRAFT_DELAY
+    assert loop.stats["speculative_drafts"] == 1 and loop.stats["speculative_drafts_wasted"] == 1
+    # Taslak istegi gercekten yola cikmisti
+    assert len(stub.requests) == 2
@@ -0,0 +1,86 @@
+"""
+Streaming pipeline: provider deltas (tests/llm_stub.py) and the
+POST /process/stream stage events.
+Run with: python -m pytest tests/test_streaming.py -v
+"""
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+REPLY = (
+    "Merhaba, mesajınız için teşekkür ederim. FastAPI ile REST API'ler geliştirdim ve "
+    "PostgreSQL ile üretimde kullandım. Saygılarımla."
+)
+
+
+@pytest.fixture
+def stub_llm(llm_env):
+    return llm_env.start(REPLY, **llm_env.PIPELINE)
+
+
+def _sse_events(text: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in text.split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line)
+        if "event" in lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_astream_gemini_yields_deltas_and_records_usage(stub_llm):
+    from llm.gemini_client import astream_gemini
+    from llm.prefix_cache import get_prefix_cache
+
+    async def collect():
+        return [d async for d in astream_gemini("Merhaba", system_instruction="Sistem")]
+
+    deltas = asyncio.run(collect())
+    assert len(deltas) > 1
+    assert "".join(deltas) == REPLY
+    assert stub_llm.requests[0]["stream"] is True
+    assert get_prefix_cache().stats()["providers"]["openrouter"]["requests"] == 1
+
+
+@pytest.mark.parametrize("speculative", [False, True])
+def test_stream_endpoint_emits_stages_in_order(stub_llm, llm_env, speculative):
+    from fastapi.testclient import TestClient
+
+    import agent_loop
+    import main
+
+    llm_env.override(speculative_drafting=speculative)
+
+    async def gate(*args, **kwargs):
+        return {"can_respond": True, "reason": "", "category": "safe"}
+
+    async def judge(message, response):
+        return {"scores": {}, "total_score": 90, "feedback": "", "approved": True}
+
+    saved_gate = agent_loop.acheck_gate
+    agent_loop.acheck_gate = gate
+    loop = agent_loop.AgentLoop()
+    loop.evaluator.aevaluate = judge
+    main.agent_loop = loop
+    try:
+        res = TestClient(main.app).post("/process/stream", json={"message": "FastAPI deneyiminiz var mı?"})
+    finally:
+        agent_loop.acheck_gate = saved_gate
+        main.agent_loop = None
+
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/event-stream")
+    events = _sse_events(res.text)
+    stages = [name for name, _ in events]
+    assert stages[0] == "keyword" and stages[-1] == "final"
+    assert stages.index("gate") < stages.index("token") < stages.index("evaluation")
+    tokens = "".join(data["text"] for name, data in events if name == "token")
+    assert tokens.strip() == REPLY
+    final = events[-1][1]
+    assert final["response"] == REPLY
+    assert final["human_intervention"] is False
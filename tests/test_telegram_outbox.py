@@ -0,0 +1,98 @@
+"""
+Telegram outbox delivery against a local Bot API stand-in (tests/telegram_stub.py):
+retries with backoff, 429 retry_after, giving up, full-queue drops, flushing
+shutdown and message_id futures.
+Run with: python -m pytest tests/test_telegram_outbox.py -v
+"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.telegram_outbox import TelegramOutbox  # noqa: E402
+
+BACKOFF = 0.05
+
+
+@pytest.fixture
+def make_outbox(telegram_stub):
+    outboxes = []
+
+    def build(**kwargs) -> TelegramOutbox:
+        opts = {"backoff": BACKOFF, "max_backoff": 1.0, "timeout": 2.0, **kwargs}
+        outboxes.append(TelegramOutbox(telegram_stub.base_url, **opts))
+        return outboxes[-1]
+
+    try:
+        yield build
+    finally:
+        for outbox in outboxes:
+            outbox.shutdown(flush=False, timeout=2.0)
+
+
+def _gaps(telegram_stub) -> list[float]:
+    times = [t for t, _ in telegram_stub.calls("sendMessage")]
+    return [b - a for a, b in zip(times, times[1:])]
+
+
+def test_future_resolves_with_message_id(make_outbox, telegram_stub):
+    outbox = make_outbox()
+    futures = [outbox.submit("sendMessage", {"chat_id": "1", "text": f"m{i}"}) for i in range(3)]
+    assert [f.result(timeout=5) for f in futures] == [101, 102, 103]
+    assert [p["text"] for _, p in telegram_stub.calls("sendMessage")] == ["m0", "m1", "m2"]
+    assert outbox.stats()["sent"] == 3
+
+
+def test_retries_5xx_and_transport_errors_with_backoff(make_outbox, telegram_stub):
+    telegram_stub.script = [(502, {"ok": False}), "reset", (500, {"ok": False})]
+    outbox = make_outbox()
+    assert outbox.submit("sendMessage", {"text": "x"}).result(timeout=5) == 101
+    gaps = _gaps(telegram_stub)
+    assert len(gaps) == 3
+    # Ustel geri cekilme: 1x, 2x, 4x BACKOFF
+    for gap, factor in zip(gaps, (1, 2, 4)):
+        assert gap >= BACKOFF * factor * 0.9
+
+
+def test_429_honours_retry_after(make_outbox, telegram_stub):
+    telegram_stub.script = [(429, {"ok": False, "parameters": {"retry_after": 0.4}})]
+    outbox = make_outbox()
+    assert outbox.submit("sendMessage", {"text": "x"}).result(timeout=5) == 101
+    assert _gaps(telegram_stub)[0] >= 0.4 * 0.9
+
+
+def test_gives_up_after_max_retries(make_outbox, telegram_stub):
+    telegram_stub.script = [(503, {"ok": False})] * 10
+    outbox = make_outbox(max_retries=2)
+    assert outbox.submit("sendMessage", {"text": "x"}).result(timeout=5) is None
+    assert len(telegram_stub.calls("sendMessage")) == 3
+    assert outbox.stats()["failed"] == 1 and outbox.stats()["sent"] == 0
+
+
+def test_full_queue_drops_and_counts(make_outbox, telegram_stub):
+    telegram_stub.script = [0.5]
+    outbox = make_outbox(max_queue=1)
+    in_flight = outbox.submit("sendMessage", {"text": "1"})
+    deadline = time.monotonic() + 2
+    while not telegram_stub.calls("sendMessage") and time.monotonic() < deadline:
+        time.sleep(0.01)
+    queued = outbox.submit("sendMessage", {"text": "2"})
+    dropped = outbox.submit("sendMessage", {"text": "3"})
+    assert dropped.done() and dropped.result() is None
+    assert outbox.stats()["dropped"] == 1
+    assert in_flight.result(timeout=5) == 101 and queued.result(timeout=5) == 102
+
+
+def test_shutdown_flushes_queued_messages(make_outbox, telegram_stub):
+    telegram_stub.script = [0.1, 0.1, 0.1]
+    outbox = make_outbox()
+    futures = [outbox.submit("sendMessage", {"text": str(i)}) for i in range(3)]
+    outbox.shutdown(flush=True, timeout=5)
+    assert all(f.done() for f in futures)
+    assert [f.result() for f in futures] == [101, 102, 103]
+    # Kapandiktan sonra gelen mesaj gonderilmez
+    assert outbox.submit("sendMessage", {"text": "late"}).result(timeout=1) is None
+    assert len(telegram_stub.calls("sendMessage")) == 3
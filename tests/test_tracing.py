@@ -0,0 +1,118 @@
+"""
+Per-request traces: request_id on /process, span waterfall at /trace/{id},
+escalation -> Telegram reply linkage, ring buffer and rotating JSONL export.
+Run with: python -m pytest tests/test_tracing.py -v
+"""
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+REPLY = "Merhaba, mesajınız için teşekkür ederim. FastAPI ile REST API'ler geliştirdim. Saygılarımla."
+
+
+@pytest.fixture
+def client(llm_env):
+    from fastapi.testclient import TestClient
+
+    import agent_loop
+    import main
+
+    llm_env.start(REPLY, pre_evaluator_enabled=False, **llm_env.PIPELINE)
+    main.agent_loop = agent_loop.AgentLoop()
+    try:
+        yield TestClient(main.app)
+    finally:
+        main.agent_loop = None
+
+
+def _spans(trace: dict) -> dict[str, list[dict]]:
+    by_name: dict[str, list[dict]] = {}
+    for span in trace["spans"]:
+        by_name.setdefault(span["name"], []).append(span)
+    return by_name
+
+
+def test_process_returns_request_id_and_waterfall(client):
+    res = client.post("/process", json={"message": "FastAPI deneyiminizden bahseder misiniz?"})
+    assert res.status_code == 200
+    request_id = res.json()["request_id"]
+    assert res.headers["x-request-id"] == request_id
+
+    trace = client.get(f"/trace/{request_id}").json()
+    assert trace["trace_id"] == request_id and trace["outcome"] == "approved"
+    spans = _spans(trace)
+    assert {"notification", "telegram", "keyword", "gate", "gate_agent", "draft", "career_agent",
+            "evaluation", "evaluator_agent", "llm"} <= set(spans)
+    ids = {s["id"]: s for s in trace["spans"]}
+    # gate -> gate_agent -> llm; draft -> career_agent -> llm
+    for llm in spans["llm"]:
+        assert llm["attrs"]["provider"] == "openrouter"
+        assert llm["attrs"]["prompt_chars"] > 0 and llm["outcome"] == "ok"
+        assert ids[ids[llm["parent"]]["parent"]]["name"] in ("gate", "draft", "evaluation")
+    draft_llm = next(s for s in spans["llm"] if ids[s["parent"]]["name"] == "career_agent")
+    assert draft_llm["attrs"]["response_chars"] == len(REPLY)
+    assert spans["telegram"][0]["outcome"] == "disabled"
+    assert all(s["end_ms"] >= s["start_ms"] >= 0 for s in trace["spans"])
+
+    # Gecerli bir X-Request-ID tekrar kullanilir
+    res = client.post("/process", json={"message": "Mülakat için uygun musunuz?"},
+                      headers={"X-Request-ID": "client-req-42"})
+    assert res.json()["request_id"] == "client-req-42"
+    assert client.get("/trace/client-req-42").status_code == 200
+    assert client.get("/trace/bilinmeyen").status_code == 404
+
+
+def test_telegram_reply_links_to_originating_trace(client):
+    from tools.escalation_store import get_escalation, link_telegram_msg
+    from tools.telegram_listener import TelegramReplyListener
+
+    body = client.post("/process", json={"message": "Maaş beklentiniz nedir?"}).json()
+    esc_id, request_id = body["escalation_id"], body["request_id"]
+    assert get_escalation(esc_id)["trace_id"] == request_id
+    assert client.get(f"/escalation/{esc_id}").json()["trace_id"] == request_id
+    link_telegram_msg(esc_id, 9001)
+
+    listener = TelegramReplyListener()
+    listener._send_message = lambda *args, **kwargs: None
+    listener._process_update({"update_id": 1, "message": {
+        "message_id": 9002, "text": "80k istiyorum", "reply_to_message": {"message_id": 9001},
+    }})
+    assert get_escalation(esc_id)["status"] == "resolved"
+
+    origin = client.get(f"/trace/{request_id}").json()
+    assert origin["outcome"] == "escalated"
+    assert _spans(origin)["escalation"][0]["attrs"]["escalation_id"] == esc_id
+    assert len(origin["links"]) == 1
+    reply = client.get(f"/trace/{origin['links'][0]}").json()
+    assert reply["name"] == "telegram_reply"
+    assert reply["attrs"] == {"escalation_id": esc_id, "origin_trace_id": request_id}
+    assert [s["name"] for s in reply["spans"]] == ["professionalize", "llm", "resolve"]
+
+
+def test_ring_buffer_and_rotating_export(tmp_path):
+    from tools.tracing import Tracer
+
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(buffer_size=2, export_path=str(path), export_max_bytes=400, export_backups=2)
+    traces = []
+    for i in range(4):
+        tr = tracer.new_trace("process", f"t{i}", index=i)
+        tr.open_span("keyword", None, {}).finish()
+        tracer.finish(tr)
+        traces.append(tr)
+    assert tracer.get("t0") is None and tracer.get("t1") is None
+    assert tracer.get("t3") is traces[3]
+    assert tracer.stats()["buffered"] == 2
+
+    exported = []
+    for f in sorted(tmp_path.iterdir(), reverse=True):
+        with open(f, encoding="utf-8") as fh:
+            exported += [json.loads(line) for line in fh]
+    assert os.path.exists(f"{path}.1")
+    assert [t["trace_id"] for t in exported][-1] == "t3"
+    assert exported[-1]["spans"][0]["name"] == "keyword"
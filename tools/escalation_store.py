@@ -3,53 +3,305 @@ Shared in-memory store for escalation tracking.
 Used by: agent_loop (create), telegram_listener (resolve), main.py (poll endpoint).
 
 States: pending -> resolved
+
+Records are indexed by esc_id and by telegram_msg_id (O(1) reply lookup).
+Resolved records are evicted after a TTL or when there are too many of them;
+pending records are kept until a human answers, up to max_pending (the oldest
+unanswered one is dropped beyond that). All access is lock-protected because
+the Telegram listener thread and request threads share the store.
+Subscribers (the SSE endpoint) wait on per-escalation asyncio events that
+resolve() sets thread-safely on their own event loop.
+When the Telegram listener runs, every change is appended as one line to the
+ESCALATION_STATE_PATH journal (persist_to), so a reply that arrives around a
+restart still matches its escalation. The journal is compacted to the pending
+records on load and whenever it grows well past them; resolved records stay
+in memory only.
 """
-import uuid
+import asyncio
+import json
+import logging
+import os
+import threading
 import time
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
 from typing import Any
 
-_store: dict[str, dict[str, Any]] = {}
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class EscalationStore:
+    def __init__(self, max_resolved: int = 10_000, resolved_ttl: float = 24 * 3600, max_pending: int = 10_000):
+        self.max_resolved = max_resolved
+        self.resolved_ttl = resolved_ttl
+        self.max_pending = max(1, max_pending)
+        self._lock = threading.RLock()
+        self._records: dict[str, dict[str, Any]] = {}
+        self._by_telegram: dict[int, str] = {}
+        # esc_id -> resolved_at, in resolution order (oldest first)
+        self._resolved: "OrderedDict[str, float]" = OrderedDict()
+        # esc_id -> None, in creation order (oldest first)
+        self._pending: "OrderedDict[str, None]" = OrderedDict()
+        self._waiters: dict[str, list[tuple[asyncio.AbstractEventLoop, asyncio.Event]]] = {}
+        self._path: Path | None = None
+        self._journal = None
+        self._journal_lines = 0
+        self.dropped_pending = 0
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def create(self, employer_message: str, reason: str, category: str, trace_id: str | None = None) -> str:
+        """Create a pending escalation, return its ID. trace_id links it to the originating request."""
+        esc_id = uuid.uuid4().hex[:12]
+        record = {
+            "status": "pending",
+            "employer_message": employer_message,
+            "reason": reason,
+            "category": category,
+            "created_at": time.time(),
+            "trace_id": trace_id,
+            "telegram_msg_id": None,
+            "professional_response": None,
+            "original_reply": None,
+            "resolved_at": None,
+        }
+        with self._lock:
+            self._records[esc_id] = record
+            self._pending[esc_id] = None
+            self._append_locked({"op": "create", "id": esc_id, "record": record})
+            self._evict(record["created_at"])
+            while len(self._pending) > self.max_pending:
+                self._drop_oldest_pending_locked()
+        return esc_id
+
+    def link_telegram_msg(self, esc_id: str, telegram_msg_id: int):
+        """Link a Telegram message_id to an escalation."""
+        with self._lock:
+            record = self._records.get(esc_id)
+            if record is None:
+                return
+            old = record["telegram_msg_id"]
+            if old is not None:
+                self._by_telegram.pop(old, None)
+            record["telegram_msg_id"] = telegram_msg_id
+            self._by_telegram[telegram_msg_id] = esc_id
+            if esc_id in self._pending:
+                self._append_locked({"op": "link", "id": esc_id, "telegram_msg_id": telegram_msg_id})
+
+    def resolve(self, esc_id: str, professional_response: str, original_reply: str):
+        """Mark escalation as resolved with the professional response."""
+        now = time.time()
+        with self._lock:
+            record = self._records.get(esc_id)
+            if record is None:
+                return
+            if esc_id in self._pending:
+                del self._pending[esc_id]
+                self._append_locked({"op": "resolve", "id": esc_id})
+            record["status"] = "resolved"
+            record["professional_response"] = professional_response
+            record["original_reply"] = original_reply
+            record["resolved_at"] = now
+            self._resolved.pop(esc_id, None)
+            self._resolved[esc_id] = now
+            self._evict(now)
+            waiters = self._waiters.pop(esc_id, [])
+        _wake(waiters)
+
+    def subscribe(self, esc_id: str) -> asyncio.Event | None:
+        """Event set when esc_id resolves; must be called from a coroutine. None if unknown."""
+        event = asyncio.Event()
+        with self._lock:
+            record = self._records.get(esc_id)
+            if record is None:
+                return None
+            if record["status"] == "resolved":
+                event.set()
+            else:
+                self._waiters.setdefault(esc_id, []).append((asyncio.get_running_loop(), event))
+        return event
+
+    def unsubscribe(self, esc_id: str, event: asyncio.Event):
+        with self._lock:
+            waiters = self._waiters.get(esc_id)
+            if not waiters:
+                return
+            waiters[:] = [w for w in waiters if w[1] is not event]
+            if not waiters:
+                del self._waiters[esc_id]
+
+    def get(self, esc_id: str) -> dict[str, Any] | None:
+        """Snapshot copy of a record, or None."""
+        with self._lock:
+            record = self._records.get(esc_id)
+            return dict(record) if record is not None else None
+
+    def find_by_telegram_msg_id(self, telegram_msg_id: int) -> tuple[str, dict] | None:
+        """Find escalation by its linked Telegram message_id."""
+        with self._lock:
+            esc_id = self._by_telegram.get(telegram_msg_id)
+            if esc_id is None:
+                return None
+            return esc_id, dict(self._records[esc_id])
 
+    def persist_to(self, path: str | Path):
+        """Replay the journal of a previous run, compact it to the pending records and append from now on."""
+        path = Path(path)
+        saved: "OrderedDict[str, dict[str, Any]]" = OrderedDict()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # yarim yazilmis son satir
+                    _replay(saved, entry)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning("Escalation journal unreadable, starting empty: %s", e)
+        with self._lock:
+            for esc_id, record in saved.items():
+                if esc_id in self._records:
+                    continue
+                self._records[esc_id] = record
+                self._pending[esc_id] = None
+                if record.get("telegram_msg_id") is not None:
+                    self._by_telegram[record["telegram_msg_id"]] = esc_id
+            while len(self._pending) > self.max_pending:
+                self._drop_oldest_pending_locked()
+            self._path = path
+            self._compact_locked()
 
-def create_escalation(employer_message: str, reason: str, category: str) -> str:
-    """Create a pending escalation, return its ID."""
-    esc_id = uuid.uuid4().hex[:12]
-    _store[esc_id] = {
-        "status": "pending",
-        "employer_message": employer_message,
-        "reason": reason,
-        "category": category,
-        "created_at": time.time(),
-        "telegram_msg_id": None,
-        "professional_response": None,
-        "original_reply": None,
-        "resolved_at": None,
-    }
-    return esc_id
+    def close(self):
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            self._path = None
+
+    def _append_locked(self, entry: dict[str, Any]):
+        # Degisiklik basina tek satir: maliyet bekleyen kayit sayisindan bagimsiz
+        if self._journal is None:
+            return
+        try:
+            self._journal.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._journal.flush()
+            self._journal_lines += 1
+        except Exception as e:
+            logger.warning("Escalation journal write failed: %s", e)
+            return
+        # Gunluk bekleyenlerin cok otesine buyuyunce sikistirilir (amortize sabit maliyet)
+        if self._journal_lines > max(1000, 4 * len(self._pending)):
+            self._compact_locked()
+
+    def _compact_locked(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        tmp = self._path.with_suffix(".tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                for esc_id in self._pending:
+                    f.write(json.dumps({"op": "create", "id": esc_id, "record": self._records[esc_id]},
+                                       ensure_ascii=False) + "\n")
+            os.replace(tmp, self._path)
+            self._journal_lines = len(self._pending)
+        except Exception as e:
+            logger.warning("Escalation journal compaction failed: %s", e)
+        try:
+            self._journal = open(self._path, "a", encoding="utf-8")
+        except Exception as e:
+            logger.warning("Escalation journal unavailable: %s", e)
+
+    def _drop_oldest_pending_locked(self):
+        esc_id, _ = self._pending.popitem(last=False)
+        record = self._records.pop(esc_id, None)
+        if record and record["telegram_msg_id"] is not None:
+            self._by_telegram.pop(record["telegram_msg_id"], None)
+        self._append_locked({"op": "drop", "id": esc_id})
+        self.dropped_pending += 1
+        logger.warning("Pending escalation limit reached, dropped oldest: %s", esc_id)
+        # Bekleyen SSE istemcileri "gone" alir
+        _wake(self._waiters.pop(esc_id, []))
+
+    def _evict(self, now: float):
+        # Sadece cozulmus kayitlar silinir; en eski cozulen en basta
+        cutoff = now - self.resolved_ttl
+        while self._resolved:
+            esc_id, resolved_at = next(iter(self._resolved.items()))
+            if resolved_at >= cutoff and len(self._resolved) <= self.max_resolved:
+                break
+            self._resolved.popitem(last=False)
+            record = self._records.pop(esc_id, None)
+            if record and record["telegram_msg_id"] is not None:
+                self._by_telegram.pop(record["telegram_msg_id"], None)
+
+
+def _replay(saved: "OrderedDict[str, dict[str, Any]]", entry: dict[str, Any]):
+    op, esc_id = entry.get("op"), entry.get("id")
+    if op == "create":
+        saved[esc_id] = entry["record"]
+    elif op == "link" and esc_id in saved:
+        saved[esc_id]["telegram_msg_id"] = entry["telegram_msg_id"]
+    elif op in ("resolve", "drop"):
+        saved.pop(esc_id, None)
+
+
+def _wake(waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Event]]):
+    # Listener thread'inden cagrilir; her event kendi loop'unda set edilir
+    for loop, event in waiters:
+        try:
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:
+            pass  # loop kapanmis
+
+
+@lru_cache()
+def get_store() -> EscalationStore:
+    s = get_settings()
+    return EscalationStore(
+        max_resolved=s.escalation_max_resolved,
+        resolved_ttl=s.escalation_resolved_ttl_seconds,
+        max_pending=s.escalation_max_pending,
+    )
+
+
+def create_escalation(employer_message: str, reason: str, category: str, trace_id: str | None = None) -> str:
+    return get_store().create(employer_message, reason, category, trace_id)
 
 
 def link_telegram_msg(esc_id: str, telegram_msg_id: int):
-    """Link a Telegram message_id to an escalation."""
-    if esc_id in _store:
-        _store[esc_id]["telegram_msg_id"] = telegram_msg_id
+    get_store().link_telegram_msg(esc_id, telegram_msg_id)
 
 
 def resolve_escalation(esc_id: str, professional_response: str, original_reply: str):
-    """Mark escalation as resolved with the professional response."""
-    if esc_id in _store:
-        _store[esc_id]["status"] = "resolved"
-        _store[esc_id]["professional_response"] = professional_response
-        _store[esc_id]["original_reply"] = original_reply
-        _store[esc_id]["resolved_at"] = time.time()
+    get_store().resolve(esc_id, professional_response, original_reply)
 
 
 def get_escalation(esc_id: str) -> dict[str, Any] | None:
-    return _store.get(esc_id)
+    return get_store().get(esc_id)
 
 
 def find_by_telegram_msg_id(telegram_msg_id: int) -> tuple[str, dict] | None:
-    """Find escalation by its linked Telegram message_id."""
-    for esc_id, data in _store.items():
-        if data.get("telegram_msg_id") == telegram_msg_id:
-            return esc_id, data
-    return None
+    return get_store().find_by_telegram_msg_id(telegram_msg_id)
+
+
+async def wait_for_resolution(esc_id: str, timeout: float) -> dict[str, Any] | None:
+    """Wait up to timeout seconds; returns the current record (resolved or not), None if unknown."""
+    store = get_store()
+    event = store.subscribe(esc_id)
+    if event is None:
+        return None
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        store.unsubscribe(esc_id, event)
+    return store.get(esc_id)
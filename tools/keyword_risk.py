@@ -0,0 +1,146 @@
+"""
+Keyword risk engine (fast, no API).
+All rules are compiled into one alternation and the message is scanned once;
+every matched category is reported with its span in the original text.
+Matching runs on Turkish-aware folded text so "İ", "I" and "ı" all match "i"
+(I/İ/ı in rule patterns are collapsed the same way).
+
+Extra rules can be declared in profile.json under
+ai_interview_agent_config.escalation_triggers_to_human[*] as
+{"category": "...", "keywords": ["...", ...]}.
+"""
+import re
+from dataclasses import dataclass
+from typing import Any, Mapping
+
+RISK_PATTERNS = [
+    (r"maa[sş]", "salary"),
+    (r"[üu]cret", "salary"),
+    (r"br[üu]t", "salary"),
+    (r"salary", "salary"),
+    (r"s[öo]zle[sş]me", "legal"),
+    (r"contract\b", "legal"),
+    (r"hukuk", "legal"),
+    (r"avukat", "legal"),
+    (r"non[\s-]?compete", "legal"),
+    (r"non[\s-]?disclosure", "legal"),
+    (r"fikri m[üu]lkiyet", "legal"),
+    (r"tazminat", "legal"),
+    # (?<!\w)nda(?!\w); lookbehind ilk harften sonra ki regex ilk-karakter filtresini kullanabilsin
+    (r"n(?<!\wn)da(?!\w)", "legal"),
+]
+
+
+def turkish_fold(text: str) -> str:
+    """Case-fold with Turkish I/ı/İ collapsed to "i"; output keeps the input length."""
+    if "İ" in text or "I" in text:
+        text = text.replace("İ", "i").replace("I", "i")
+    folded = text.lower()
+    if len(folded) != len(text):
+        # Nadir: lower() karakter sayisini degistirdi; span'ler kaymasin
+        folded = "".join(c.lower()[:1] for c in text)
+    if "ı" in folded:
+        folded = folded.replace("ı", "i")
+    return folded
+
+
+@dataclass(frozen=True)
+class RiskRule:
+    pattern: str
+    category: str
+    source: str = "builtin"
+
+
+def load_profile_rules(data: Mapping[str, Any] | None) -> list[RiskRule]:
+    """Keyword rules declared on escalation triggers in profile.json."""
+    cfg = (data or {}).get("ai_interview_agent_config", {})
+    rules = []
+    for trigger in cfg.get("escalation_triggers_to_human", []):
+        category = trigger.get("category") or "other"
+        for kw in trigger.get("keywords", []) or []:
+            kw = " ".join(turkish_fold(str(kw)).split())
+            if not kw:
+                continue
+            first = re.escape(kw[0])
+            pattern = first + rf"(?<!\w{first})" + r"\s+".join(re.escape(part) for part in kw[1:].split(" "))
+            rules.append(RiskRule(pattern, category, "profile"))
+    return rules
+
+
+class RiskMatcher:
+    """Single-pass matcher over a fixed, ordered rule list."""
+
+    def __init__(self, rules: list[RiskRule]):
+        self.rules = list(rules)
+        # Desenlerde sadece I/İ/ı katlanir; lower() \S, \W gibi kacislari bozardi
+        patterns = [r.pattern.replace("İ", "i").replace("I", "i").replace("ı", "i") for r in self.rules]
+        # Tarama tek, gruplanmamis alternation ile; hangi kuralin eslestigi sadece isabetlerde bulunur
+        self._regex = re.compile("|".join(f"(?:{p})" for p in patterns)) if patterns else None
+        self._rule_regexes = [re.compile(p) for p in patterns]
+        # Kategori onceligi: kural sirasi (salary legal'dan once gelir)
+        self._priority: dict[str, int] = {}
+        for r in self.rules:
+            self._priority.setdefault(r.category, len(self._priority))
+
+    def scan(self, message: str) -> list[dict[str, Any]]:
+        if self._regex is None or not message:
+            return []
+        folded = turkish_fold(message)
+        matches = []
+        for m in self._regex.finditer(folded):
+            start, end = m.span()
+            rule = self._rule_at(folded, start, end)
+            matches.append({
+                "category": rule.category,
+                "text": message[start:end],
+                "start": start,
+                "end": end,
+                "source": rule.source,
+            })
+        return matches
+
+    def _rule_at(self, folded: str, start: int, end: int) -> RiskRule:
+        # Alternation ilk eslesen dali secer; ayni sirayla dene
+        for rule, regex in zip(self.rules, self._rule_regexes):
+            m = regex.match(folded, start)
+            if m is not None and m.end() == end:
+                return rule
+        return self.rules[0]
+
+    def check(self, message: str) -> dict[str, Any] | None:
+        matches = self.scan(message or "")
+        if not matches:
+            return None
+        categories = sorted({m["category"] for m in matches}, key=self._priority.__getitem__)
+        return {
+            "is_unknown_or_unsafe": True,
+            "confidence": 0.95,
+            "reason": f"Anahtar kelime tespiti ({', '.join(categories)})",
+            "category": categories[0],
+            "categories": categories,
+            "matches": matches,
+            "source": "keyword",
+        }
+
+
+def build_matcher(profile: Mapping[str, Any] | None = None) -> RiskMatcher:
+    builtin = [RiskRule(p, c) for p, c in RISK_PATTERNS]
+    return RiskMatcher(builtin + load_profile_rules(profile))
+
+
+# (profile version, matcher); profil degisince yeniden derlenir
+_default_matcher: tuple[str, RiskMatcher] | None = None
+
+
+def get_matcher() -> RiskMatcher:
+    global _default_matcher
+    from tools.profile_store import get_profile
+    profile = get_profile()
+    cached = _default_matcher
+    if cached is None or cached[0] != profile.version:
+        cached = _default_matcher = (profile.version, build_matcher(profile.data))
+    return cached[1]
+
+
+def keyword_risk_check(message: str) -> dict[str, Any] | None:
+    return get_matcher().check(message)
@@ -0,0 +1,147 @@
+"""
+Prometheus metrics for the agent pipeline (GET /metrics).
+- career_agent_stage_seconds{stage}: notification, keyword, gate, draft,
+  pre_evaluation, evaluation, professionalize
+- career_agent_llm_request_seconds{provider, model}: every LLM call
+- counters: escalations{source, category}, revisions, approvals{evaluator},
+  max_revisions_reached, parse_fallbacks{component}, llm_hedges{stage, outcome}
+Label children are resolved once (fixed stages up front, dynamic labels on
+first use) so the hot path is a dict lookup plus observe()/inc().
+
+Multi-worker uvicorn: set PROMETHEUS_MULTIPROC_DIR to an empty writable
+directory before start; each worker writes its own files and /metrics
+aggregates them. prometheus_client is optional; without it (or with
+METRICS_ENABLED=false) every call is a no-op and /metrics returns 503.
+"""
+import os
+import threading
+from functools import lru_cache
+from typing import Any
+
+from config import get_settings
+
+try:
+    import prometheus_client
+    from prometheus_client import CollectorRegistry, Counter, Histogram, multiprocess
+except ImportError:  # pragma: no cover - optional dependency
+    prometheus_client = None
+
+STAGES = ("notification", "keyword", "gate", "draft", "pre_evaluation", "evaluation", "professionalize")
+STAGE_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0)
+EVALUATORS = ("llm", "pre_evaluator")
+PARSE_COMPONENTS = ("gate", "evaluator")
+
+
+class _Noop:
+    def observe(self, value: float) -> None:
+        pass
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+
+_NOOP = _Noop()
+
+
+class Metrics:
+    """Pipeline metrics; a disabled instance accepts every call and records nothing."""
+
+    def __init__(self, enabled: bool = True, registry: Any = None):
+        self.enabled = bool(enabled and prometheus_client is not None)
+        self._lock = threading.Lock()
+        self._llm: dict[tuple[str, str], Any] = {}
+        self._escalations: dict[tuple[str, str], Any] = {}
+        self._hedges: dict[tuple[str, str], Any] = {}
+        if not self.enabled:
+            self.stage = {s: _NOOP for s in STAGES}
+            self.revisions = self.max_revisions_reached = _NOOP
+            self.approvals = {e: _NOOP for e in EVALUATORS}
+            self.parse_fallbacks = {c: _NOOP for c in PARSE_COMPONENTS}
+            return
+        self.registry = registry if registry is not None else CollectorRegistry()
+        stage = Histogram(
+            "career_agent_stage_seconds", "Latency of one pipeline stage",
+            ["stage"], buckets=STAGE_BUCKETS, registry=self.registry,
+        )
+        self._llm_hist = Histogram(
+            "career_agent_llm_request_seconds", "Latency of one LLM call",
+            ["provider", "model"], buckets=LLM_BUCKETS, registry=self.registry,
+        )
+        self._escalation_counter = Counter(
+            "career_agent_escalations", "Messages forwarded to the human",
+            ["source", "category"], registry=self.registry,
+        )
+        approvals = Counter(
+            "career_agent_approvals", "Approved responses by the evaluator that approved them",
+            ["evaluator"], registry=self.registry,
+        )
+        parse = Counter(
+            "career_agent_parse_fallbacks", "LLM outputs that were not valid JSON (default decision used)",
+            ["component"], registry=self.registry,
+        )
+        self._hedge_counter = Counter(
+            "career_agent_llm_hedges", "Hedged LLM requests: fired duplicates and duplicates that won",
+            ["stage", "outcome"], registry=self.registry,
+        )
+        self.revisions = Counter(
+            "career_agent_revisions", "Revision attempts after a rejected draft", registry=self.registry,
+        )
+        self.max_revisions_reached = Counter(
+            "career_agent_max_revisions_reached", "Responses returned without approval", registry=self.registry,
+        )
+        self.stage = {s: stage.labels(stage=s) for s in STAGES}
+        self.approvals = {e: approvals.labels(evaluator=e) for e in EVALUATORS}
+        self.parse_fallbacks = {c: parse.labels(component=c) for c in PARSE_COMPONENTS}
+
+    def observe_stage(self, stage: str, seconds: float) -> None:
+        self.stage[stage].observe(seconds)
+
+    def observe_llm(self, provider: str, model: str, seconds: float) -> None:
+        child = self._llm.get((provider, model))
+        if child is None:
+            if not self.enabled:
+                return
+            with self._lock:
+                child = self._llm.setdefault((provider, model), self._llm_hist.labels(provider=provider, model=model))
+        child.observe(seconds)
+
+    def escalation(self, source: str, category: str) -> None:
+        child = self._escalations.get((source, category))
+        if child is None:
+            if not self.enabled:
+                return
+            with self._lock:
+                child = self._escalations.setdefault(
+                    (source, category), self._escalation_counter.labels(source=source, category=category)
+                )
+        child.inc()
+
+    def hedge(self, stage: str, outcome: str) -> None:
+        child = self._hedges.get((stage, outcome))
+        if child is None:
+            if not self.enabled:
+                return
+            with self._lock:
+                child = self._hedges.setdefault(
+                    (stage, outcome), self._hedge_counter.labels(stage=stage, outcome=outcome)
+                )
+        child.inc()
+
+    def approved(self, evaluator: str) -> None:
+        self.approvals.get(evaluator, self.approvals["llm"]).inc()
+
+    def render(self) -> tuple[bytes, str]:
+        """Exposition text; aggregates all workers in multiprocess mode."""
+        if not self.enabled:
+            raise RuntimeError("metrics disabled")
+        registry = self.registry
+        if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
+
+
+@lru_cache()
+def get_metrics() -> Metrics:
+    return Metrics(enabled=get_settings().metrics_enabled)
@@ -1,61 +1,99 @@
 """
 Mobile Notification Tool.
 Sends notifications via Telegram Bot API.
+Messages go through the background outbox (tools/telegram_outbox.py);
+notify_* methods return immediately with a Future of the message_id.
+Each message is a "telegram" span of the current trace, finished when the
+outbox delivers it (or gives up).
 """
-import httpx
 import logging
+from concurrent.futures import Future
 from typing import Optional
 from config import get_settings
+from tools.telegram_outbox import get_outbox
+from tools.tracing import detached_span
 
 logger = logging.getLogger(__name__)
 
 
+def _finish_span(span, sent: "Future[Optional[int]]") -> None:
+    if sent.cancelled() or sent.exception() is not None:
+        span.finish("error")
+        return
+    msg_id = sent.result()
+    span.set(message_id=msg_id)
+    span.finish("ok" if msg_id else "not_sent")
+
+
 class NotificationTool:
     def __init__(self):
         self.settings = get_settings()
         t = (self.settings.telegram_bot_token or "").strip()
         c = (self.settings.telegram_chat_id or "").strip()
         self._enabled = bool(t and c and not t.startswith("your-") and not c.startswith("your-"))
-        self._base_url = f"https://api.telegram.org/bot{t}"
         self._chat_id = c
         if not self._enabled:
             logger.warning("Telegram not configured. Notifications will be logged only.")
 
-    def _send_telegram(self, text: str) -> Optional[int]:
-        """Send message, return message_id or None."""
+    def _send_telegram(self, text: str, kind: str = "message") -> "Future[Optional[int]]":
+        """Queue message; the future resolves to message_id or None."""
+        span = detached_span("telegram", kind=kind, chars=len(text))
         if not self._enabled:
-            return None
+            span.finish("disabled")
+            future: Future = Future()
+            future.set_result(None)
+            return future
         payload = {"chat_id": self._chat_id, "text": text, "parse_mode": "HTML"}
-        try:
-            with httpx.Client(timeout=10.0) as client:
-                r = client.post(f"{self._base_url}/sendMessage", json=payload)
-                r.raise_for_status()
-                return r.json().get("result", {}).get("message_id")
-        except Exception as e:
-            logger.exception("Telegram send failed: %s", e)
-            return None
-
-    def notify_new_employer_message(self, employer_message: str, sender: str = "İşveren") -> Optional[int]:
-        text = f"📌 <b>Yeni İşveren Mesajı</b>\n\nGönderen: {sender}\n\nMesaj: {employer_message[:500]}"
-        logger.info("Notification [new_message]: %s", employer_message[:80])
-        return self._send_telegram(text)
+        future = get_outbox().submit("sendMessage", payload)
+        if span.id is not None:
+            future.add_done_callback(lambda f: _finish_span(span, f))
+        return future
+
+    @staticmethod
+    def _new_employer_message_text(employer_message: str, sender: str) -> str:
+        return f"📌 <b>Yeni İşveren Mesajı</b>\n\nGönderen: {sender}\n\nMesaj: {employer_message[:500]}"
 
-    def notify_response_sent(self, response_preview: str, employer_preview: str) -> Optional[int]:
-        text = (
+    @staticmethod
+    def _response_sent_text(response_preview: str, employer_preview: str) -> str:
+        return (
             f"✅ <b>Yanıt Gönderildi</b>\n\n"
             f"İşveren: {employer_preview[:200]}\n\n"
             f"Gönderilen yanıt: {response_preview[:300]}"
         )
-        logger.info("Notification [response_sent]")
-        return self._send_telegram(text)
 
-    def notify_unknown_question(self, reason: str, employer_message: str) -> Optional[int]:
-        text = (
+    @staticmethod
+    def _unknown_question_text(reason: str, employer_message: str) -> str:
+        return (
             f"⚠️ <b>İnsan Müdahalesi Gerekli</b>\n\n"
             f"Sebep: {reason}\n\n"
             f"İşveren mesajı:\n{employer_message[:400]}\n\n"
             f"💬 Bu mesaja REPLY ile cevabınızı yazın, "
             f"bot profesyonel hale getirip gönderecek."
         )
+
+    @staticmethod
+    def _batch_summary_text(summary: dict) -> str:
+        return (
+            f"📦 <b>Toplu İşlem Tamamlandı</b>\n\n"
+            f"Mesaj: {summary['items']} (tekil: {summary['unique']})\n"
+            f"Otomatik yanıt: {summary['responded']}\n"
+            f"İnsana iletilen: {summary['escalated']}\n"
+            f"Onaylanmayan: {summary['unapproved']}\n"
+            f"Hata: {summary['errors']}"
+        )
+
+    def notify_new_employer_message(self, employer_message: str, sender: str = "İşveren") -> "Future[Optional[int]]":
+        logger.info("Notification [new_message]: %s", employer_message[:80])
+        return self._send_telegram(self._new_employer_message_text(employer_message, sender), "new_message")
+
+    def notify_response_sent(self, response_preview: str, employer_preview: str) -> "Future[Optional[int]]":
+        logger.info("Notification [response_sent]")
+        return self._send_telegram(self._response_sent_text(response_preview, employer_preview), "response_sent")
+
+    def notify_unknown_question(self, reason: str, employer_message: str) -> "Future[Optional[int]]":
         logger.info("Notification [escalation]: %s", reason)
-        return self._send_telegram(text)
+        return self._send_telegram(self._unknown_question_text(reason, employer_message), "escalation")
+
+    def notify_batch_summary(self, summary: dict) -> "Future[Optional[int]]":
+        logger.info("Notification [batch_summary]: %s", summary)
+        return self._send_telegram(self._batch_summary_text(summary), "batch_summary")
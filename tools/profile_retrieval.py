@@ -0,0 +1,280 @@
+"""
+Retrieval of relevant profile snippets (opt-in, PROFILE_RETRIEVAL_ENABLED).
+Instead of injecting the whole profile into the career and gate prompts, the
+profile.json sections are split into chunks (one per skill category, project,
+education and preferences) and a small in-process BM25 index is built once
+per profile version. For each employer message the top-k chunks that fit in
+PROFILE_RETRIEVAL_TOKEN_BUDGET are selected.
+
+- Identity (name, title, e-mail, availability) is always included and stays
+  in the system prompt, which is therefore still static per profile version
+  (provider prefix cache); the selected snippets go into the user content.
+- Escalation rules are always included: the gate keeps them in its system
+  prompt as before.
+- Tokens: Turkish-folded words cut to a 5 character prefix (cheap stemming
+  for the agglutinative suffixes), minus a few stopwords.
+
+Offline check on the answerable messages of data/gate_corpus.jsonl (prompt
+size, profile-term coverage and, with --judge, draft quality with the full
+vs. retrieved profile):
+  python -m tools.profile_retrieval check [--judge] [--top-k 4] [--budget 400]
+"""
+import argparse
+import math
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Mapping
+
+from config import get_settings
+from tools.keyword_risk import turkish_fold
+from tools.profile_store import ProfileSnapshot, get_profile
+
+_WORD = re.compile(r"\w+")
+_STEM = 5
+_STOPWORDS = frozenset(
+    "ve ile bir bu şu için gibi da de mi mu mü mi misiniz musunuz müsünüz nedir neler hangi nasil "
+    "ne ama veya ya siz sizin bizim biz ben benim olarak daha çok en var yok the and for with you your "
+    "are is of to in on a an".split()
+)
+# Bellekte tutulan profil versiyonu basina indeks sayisi
+_MAX_INDEXES = 4
+
+
+def tokenize(text: str) -> list[str]:
+    return [w[:_STEM] for w in _WORD.findall(turkish_fold(text)) if len(w) > 1 and w not in _STOPWORDS]
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4) if text else 0
+
+
+@dataclass(frozen=True)
+class Chunk:
+    section: str
+    text: str
+
+
+def build_identity(data: Mapping[str, Any]) -> str:
+    pi = data.get("candidate_profile", data).get("personal_info", {})
+    return "\n".join([
+        f"İsim: {pi.get('name', '')}",
+        f"Ünvan: {pi.get('title', '')}",
+        f"E-posta: {pi.get('email', '')}",
+        f"Müsaitlik: {pi.get('availability', '')}",
+    ])
+
+
+def build_chunks(data: Mapping[str, Any]) -> list[Chunk]:
+    """Retrievable chunks of a profile, in profile order (identity excluded)."""
+    cp = data.get("candidate_profile", data)
+    chunks: list[Chunk] = []
+    for category, skills in cp.get("technical_profile", {}).items():
+        if isinstance(skills, (list, tuple)) and skills:
+            label = category.replace("_", " ")
+            chunks.append(Chunk("skills", f"Yetenekler ({label}): {', '.join(skills)}"))
+    for p in cp.get("projects_and_experience", []):
+        chunks.append(Chunk("projects", f"Proje - {p.get('domain', '')}: {p.get('description', '')}"))
+    edu = cp.get("education", {})
+    if edu.get("degree"):
+        chunks.append(Chunk("education", f"Eğitim: {edu.get('degree', '')}"))
+    prefs = cp.get("personal_info", {}).get("work_preferences", {})
+    if prefs:
+        chunks.append(Chunk(
+            "preferences",
+            f"Tercihler: Remote={prefs.get('remote_ok', '?')}, Taşınma={prefs.get('relocation', '?')}, "
+            f"Maaş notu={prefs.get('salary_expectation_note', '')}",
+        ))
+    return chunks
+
+
+class ProfileIndex:
+    """BM25 (Okapi) over the profile chunks of one profile version."""
+
+    def __init__(self, identity: str, chunks: list[Chunk], k1: float = 1.2, b: float = 0.75):
+        self.identity = identity
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self._lengths: list[int] = []
+        self._postings: dict[str, list[tuple[int, int]]] = {}
+        for i, chunk in enumerate(chunks):
+            terms = Counter(tokenize(chunk.text))
+            self._lengths.append(sum(terms.values()))
+            for term, tf in terms.items():
+                self._postings.setdefault(term, []).append((i, tf))
+        n = len(chunks)
+        self._avg_len = (sum(self._lengths) / n) if n else 0.0
+        self._idf = {t: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for t, p in self._postings.items()}
+
+    def search(self, query: str) -> list[tuple[float, int]]:
+        """(score, chunk index) with score > 0, best first."""
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for i, tf in self._postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[i] / (self._avg_len or 1))
+                scores[i] = scores.get(i, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(((s, i) for i, s in scores.items()), key=lambda x: (-x[0], x[1]))
+
+    def select(self, query: str, top_k: int, token_budget: int) -> list[Chunk]:
+        """Top-k relevant chunks within the token budget, in profile order."""
+        picked: list[int] = []
+        used = 0
+        for _, i in self.search(query):
+            if len(picked) >= top_k:
+                break
+            cost = estimate_tokens(self.chunks[i].text)
+            if used + cost > token_budget:
+                continue
+            picked.append(i)
+            used += cost
+        return [self.chunks[i] for i in sorted(picked)]
+
+
+_lock = threading.Lock()
+_indexes: dict[str, ProfileIndex] = {}
+
+
+def profile_index(profile: ProfileSnapshot) -> ProfileIndex:
+    """Index of a snapshot, built once per profile version."""
+    index = _indexes.get(profile.version)
+    if index is not None:
+        return index
+    with _lock:
+        index = _indexes.get(profile.version)
+        if index is None:
+            index = ProfileIndex(build_identity(profile.data), build_chunks(profile.data))
+            if len(_indexes) >= _MAX_INDEXES:
+                _indexes.pop(next(iter(_indexes)))
+            _indexes[profile.version] = index
+        return index
+
+
+def format_snippets(chunks: list[Chunk]) -> str:
+    if not chunks:
+        return ""
+    return "İlgili profil bilgileri:\n" + "\n".join(f"- {c.text}" for c in chunks) + "\n\n"
+
+
+def prompt_context(profile: ProfileSnapshot, employer_message: str) -> tuple[str, str]:
+    """(profile context for the system prompt, snippet block to prepend to the user content)."""
+    s = get_settings()
+    if not s.profile_retrieval_enabled:
+        return profile.profile_context, ""
+    index = profile_index(profile)
+    chunks = index.select(employer_message, s.profile_retrieval_top_k, s.profile_retrieval_token_budget)
+    return index.identity, format_snippets(chunks)
+
+
+# --- offline check ---
+
+def _answerable_corpus() -> list[str]:
+    from agents.gate_classifier import SAFE, seed_corpus
+    return [text for text, label in seed_corpus() if label == SAFE]
+
+
+def _profile_terms(profile: ProfileSnapshot) -> set[str]:
+    return {t for c in build_chunks(profile.data) for t in tokenize(c.text)}
+
+
+def coverage_report(profile: ProfileSnapshot, messages: list[str], top_k: int, budget: int) -> dict[str, Any]:
+    """Prompt size and coverage of the profile terms a message mentions (no LLM)."""
+    index = profile_index(profile)
+    known = _profile_terms(profile)
+    full_tokens = retrieved_tokens = 0
+    hit = wanted = 0
+    for msg in messages:
+        chunks = index.select(msg, top_k, budget)
+        full_tokens += estimate_tokens(profile.profile_context)
+        retrieved_tokens += estimate_tokens(index.identity) + estimate_tokens(format_snippets(chunks))
+        asked = set(tokenize(msg)) & known
+        got = {t for c in chunks for t in tokenize(c.text)}
+        wanted += len(asked)
+        hit += len(asked & got)
+    n = len(messages) or 1
+    return {
+        "messages": len(messages),
+        "avg_profile_tokens_full": round(full_tokens / n, 1),
+        "avg_profile_tokens_retrieved": round(retrieved_tokens / n, 1),
+        "token_reduction": round(1 - retrieved_tokens / full_tokens, 3) if full_tokens else 0.0,
+        "term_coverage": round(hit / wanted, 3) if wanted else 1.0,
+    }
+
+
+def judge_report(profile: ProfileSnapshot, messages: list[str]) -> dict[str, dict[str, Any]]:
+    """Drafts with the full vs. retrieved profile, scored by the pre-evaluator and the LLM judge."""
+    from agents.career_agent import CareerAgent
+    from agents.evaluator_agent import EvaluatorAgent
+    from agents.pre_evaluator import PreEvaluator
+
+    settings = get_settings()
+    saved = settings.profile_retrieval_enabled
+    career, judge = CareerAgent(), EvaluatorAgent()
+    pre = PreEvaluator(
+        settings.evaluation_threshold,
+        min_chars=settings.pre_evaluator_min_chars,
+        max_chars=settings.pre_evaluator_max_chars,
+    )
+    out: dict[str, dict[str, Any]] = {}
+    try:
+        for mode, enabled in (("full", False), ("retrieval", True)):
+            settings.profile_retrieval_enabled = enabled
+            scores, approved, rejected, latency = [], 0, 0, 0.0
+            for msg in messages:
+                started = time.perf_counter()
+                draft = career.generate_response(msg, profile=profile)
+                latency += time.perf_counter() - started
+                if pre.evaluate(msg, draft, profile)["verdict"] == "reject":
+                    rejected += 1
+                result = judge.evaluate(msg, draft)
+                scores.append(float(result.get("total_score", 0) or 0))
+                approved += bool(result.get("approved"))
+            n = len(messages) or 1
+            out[mode] = {
+                "avg_score": round(sum(scores) / n, 1),
+                "approved": round(approved / n, 3),
+                "pre_rejected": rejected,
+                "avg_draft_ms": round(latency / n * 1000, 1),
+            }
+    finally:
+        settings.profile_retrieval_enabled = saved
+    return out
+
+
+def main(argv: list[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(prog="python -m tools.profile_retrieval")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ck = sub.add_parser("check", help="compare the full profile with retrieved snippets on the test corpus")
+    ck.add_argument("--top-k", type=int, default=None)
+    ck.add_argument("--budget", type=int, default=None, help="snippet token budget")
+    ck.add_argument("--judge", action="store_true", help="also draft + judge with the LLM (GEMINI_API_KEY)")
+    args = ap.parse_args(argv)
+
+    s = get_settings()
+    if args.top_k is not None:
+        s.profile_retrieval_top_k = args.top_k
+    if args.budget is not None:
+        s.profile_retrieval_token_budget = args.budget
+    profile = get_profile()
+    messages = _answerable_corpus()
+    report = coverage_report(profile, messages, s.profile_retrieval_top_k, s.profile_retrieval_token_budget)
+    print(f"Mesaj sayısı: {report['messages']} (top_k={s.profile_retrieval_top_k}, "
+          f"bütçe={s.profile_retrieval_token_budget} token)")
+    print(f"Profil token'ı (ort.): tam {report['avg_profile_tokens_full']} -> "
+          f"retrieval {report['avg_profile_tokens_retrieved']} ({report['token_reduction']:.1%} azalma)")
+    print(f"Mesajdaki profil terimlerinin kapsanması: {report['term_coverage']:.1%}")
+    if args.judge:
+        print("")
+        print(f"{'mod':>10} {'ort. skor':>10} {'onay':>8} {'ön-red':>7} {'taslak ms':>10}")
+        for mode, row in judge_report(profile, messages).items():
+            print(f"{mode:>10} {row['avg_score']:>10} {row['approved']:>8.1%} "
+                  f"{row['pre_rejected']:>7} {row['avg_draft_ms']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+Central profile store.
+data/profile.json is parsed once per version; the derived texts (profile and
+escalation contexts, unknown-question scope, serialized /profile body) are
+precomputed on the snapshot. snapshot() checks (inode, mtime, size) at most
+once per check interval and swaps in a new immutable snapshot when the file
+changed, so an edit is picked up without a restart while requests that already
+hold a snapshot keep using a consistent version. A broken edit (e.g. half
+written JSON) keeps the previous snapshot.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Mapping
+
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_PROJECT_ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def build_profile_context(data: Mapping[str, Any] | None = None) -> str:
+    if data is None:
+        return get_profile().profile_context
+    cp = data.get("candidate_profile", data)
+    pi = cp.get("personal_info", {})
+    proj = cp.get("projects_and_experience", [])
+    edu = cp.get("education", {})
+    prefs = pi.get("work_preferences", {})
+
+    skills_flat = _flat_skills(data)
+    proj_lines = [f"  - {p.get('domain','')}: {p.get('description','')}" for p in proj]
+
+    return "\n".join([
+        f"İsim: {pi.get('name', '')}",
+        f"Ünvan: {pi.get('title', '')}",
+        f"E-posta: {pi.get('email', '')}",
+        f"Müsaitlik: {pi.get('availability', '')}",
+        f"Yetenekler: {', '.join(skills_flat)}",
+        f"Projeler:\n" + "\n".join(proj_lines),
+        f"Eğitim: {edu.get('degree', '')}",
+        f"Tercihler: Remote={prefs.get('remote_ok','?')}, Taşınma={prefs.get('relocation','?')}, Maaş notu={prefs.get('salary_expectation_note','')}",
+    ])
+
+
+def build_escalation_context(data: Mapping[str, Any] | None = None) -> str:
+    if data is None:
+        return get_profile().escalation_context
+    cfg = data.get("ai_interview_agent_config", {})
+    triggers = cfg.get("escalation_triggers_to_human", [])
+    oos = cfg.get("out_of_scope_topics", [])
+    default_msg = cfg.get("default_handoff_message", "")
+
+    lines = ["ESKALASYON KURALLARI (bu durumlarda sen cevap verme, sahibine ilet):"]
+    for t in triggers:
+        lines.append(f"  - Tetik: {t.get('trigger','')} -> Aksiyon: {t.get('action','')}")
+    lines.append("\nKAPSAM DIŞI KONULAR (cevap verme):")
+    for o in oos:
+        lines.append(f"  - {o}")
+    lines.append(f"\nVarsayılan devir mesajı: {default_msg}")
+    return "\n".join(lines)
+
+
+def _flat_skills(data: Mapping[str, Any]) -> list[str]:
+    cp = data.get("candidate_profile", data)
+    skills: list[str] = []
+    for cat_skills in cp.get("technical_profile", {}).values():
+        if isinstance(cat_skills, list):
+            skills.extend(cat_skills)
+    return skills
+
+
+def build_profile_scope(data: Mapping[str, Any]) -> str:
+    """Short scope line for the unknown-question detector."""
+    skills = _flat_skills(data) or list(data.get("skills", []))
+    out = data.get("ai_interview_agent_config", {}).get("out_of_scope_topics") \
+        or data.get("preferences", {}).get("out_of_scope", [])
+    if not skills and not out:
+        return "Yazılım geliştirme, backend, API."
+    return f"Yetkinlikler: {', '.join(skills)}. Kapsam dışı: {', '.join(out)}"
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+@dataclass(frozen=True)
+class ProfileSnapshot:
+    version: str
+    data: Mapping[str, Any]
+    profile_context: str
+    escalation_context: str
+    profile_scope: str
+    json_body: bytes
+    stat_key: tuple[int, int, int] = (0, 0, 0)
+    loaded_at: float = field(default_factory=time.time)
+
+    @classmethod
+    def from_bytes(cls, raw: bytes, stat_key: tuple[int, int, int] = (0, 0, 0)) -> "ProfileSnapshot":
+        data = json.loads(raw.decode("utf-8")) if raw.strip() else {}
+        if not isinstance(data, dict):
+            raise ValueError("profile.json bir JSON nesnesi olmalı")
+        return cls(
+            version=hashlib.sha256(raw).hexdigest()[:16],
+            data=_freeze(data),
+            profile_context=build_profile_context(data),
+            escalation_context=build_escalation_context(data),
+            profile_scope=build_profile_scope(data),
+            json_body=json.dumps(data, ensure_ascii=False).encode("utf-8"),
+            stat_key=stat_key,
+        )
+
+
+class ProfileStore:
+    """Parse-once profile holder with cheap mtime/inode based hot reload."""
+
+    def __init__(self, path: str, check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+        self.reloads = 0
+        self._snapshot = self._load(self._stat()) or ProfileSnapshot.from_bytes(b"")
+
+    def _stat(self) -> tuple[int, int, int]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return (0, 0, 0)
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _load(self, stat_key: tuple[int, int, int]) -> ProfileSnapshot | None:
+        try:
+            with open(self.path, "rb") as f:
+                raw = f.read()
+            return ProfileSnapshot.from_bytes(raw, stat_key)
+        except Exception as e:
+            logger.warning("Profile load failed: %s", e)
+            return None
+
+    def snapshot(self) -> ProfileSnapshot:
+        """Current snapshot; stats the file at most once per check interval."""
+        now = time.monotonic()
+        if now < self._next_check:
+            return self._snapshot
+        with self._lock:
+            if now < self._next_check:
+                return self._snapshot
+            self._next_check = now + self.check_interval
+            stat_key = self._stat()
+            if stat_key != self._snapshot.stat_key:
+                self._swap(stat_key)
+            return self._snapshot
+
+    def reload(self) -> ProfileSnapshot:
+        with self._lock:
+            self._next_check = time.monotonic() + self.check_interval
+            self._swap(self._stat())
+            return self._snapshot
+
+    def _swap(self, stat_key: tuple[int, int, int]) -> None:
+        snap = self._load(stat_key)
+        if snap is None:
+            # Bozuk dosyayi her istekte tekrar okumamak icin stat bilgisi kaydedilir
+            snap = replace(self._snapshot, stat_key=stat_key)
+        elif snap.version != self._snapshot.version:
+            self.reloads += 1
+            logger.info("Profile reloaded (version %s)", snap.version)
+        self._snapshot = snap
+
+    def stats(self) -> dict[str, Any]:
+        snap = self._snapshot
+        return {"version": snap.version, "reloads": self.reloads, "loaded_at": snap.loaded_at}
+
+
+@lru_cache()
+def get_profile_store() -> ProfileStore:
+    s = get_settings()
+    return ProfileStore(
+        os.path.normpath(os.path.join(_PROJECT_ROOT, s.profile_path)),
+        check_interval=s.profile_check_interval_seconds,
+    )
+
+
+def get_profile() -> ProfileSnapshot:
+    return get_profile_store().snapshot()
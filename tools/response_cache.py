@@ -0,0 +1,110 @@
+"""
+Exact-match cache for gate decisions and approved responses.
+Keys are sha256(normalized message) prefixed with a content version built from
+the profile snapshot version, the system prompts and the evaluation threshold,
+so editing any of them makes old entries unreachable (they then age out via
+LRU/TTL).
+"""
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from tools.keyword_risk import turkish_fold
+from tools.profile_store import get_profile
+_WS = re.compile(r"\s+")
+
+
+def normalize_message(message: str) -> str:
+    """Case/whitespace-insensitive form used for cache keys."""
+    return _WS.sub(" ", turkish_fold(message or "")).strip()
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry expiry and hit/miss counters."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Any | None:
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < now:
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: str, value: Any) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int, ttl: float, threshold: int):
+        self.gates = TTLCache(max_entries, ttl)
+        self.responses = TTLCache(max_entries, ttl)
+        self._threshold = threshold
+        self._lock = threading.Lock()
+        self._prompts: bytes | None = None
+        self._versions: dict[str, str] = {}
+
+    def _prompts_digest(self) -> bytes:
+        if self._prompts is None:
+            from agents.gate_agent import GATE_SYSTEM_PROMPT
+            from prompts.career_agent_prompts import CAREER_SYSTEM_PROMPT, EVALUATOR_SYSTEM_PROMPT
+            h = hashlib.sha256()
+            for part in (CAREER_SYSTEM_PROMPT, EVALUATOR_SYSTEM_PROMPT, GATE_SYSTEM_PROMPT, str(self._threshold)):
+                h.update(part.encode("utf-8"))
+                h.update(b"\0")
+            self._prompts = h.digest()
+        return self._prompts
+
+    def version(self, profile_version: str | None = None) -> str:
+        """Content version for a profile snapshot (current one if not given)."""
+        profile_version = profile_version or get_profile().version
+        with self._lock:
+            version = self._versions.get(profile_version)
+            if version is None:
+                version = hashlib.sha256(self._prompts_digest() + profile_version.encode()).hexdigest()[:16]
+                if len(self._versions) > 16:
+                    self._versions.clear()
+                self._versions[profile_version] = version
+            return version
+
+    def key(self, message: str, profile_version: str | None = None) -> str:
+        digest = hashlib.sha256(normalize_message(message).encode("utf-8")).hexdigest()
+        return f"{self.version(profile_version)}:{digest}"
+
+    def stats(self) -> dict[str, Any]:
+        return {"version": self.version(), "gate": self.gates.stats(), "response": self.responses.stats()}
@@ -6,16 +6,37 @@ When the human replies:
 2. Uses LLM to make it professional
 3. Sends the professional version back on Telegram
 4. Updates escalation store so the web UI picks it up
+
+The poll thread only long-polls and dispatches; replies are handled by a
+bounded worker pool so a burst of answers is professionalized in parallel.
+The update offset and not-yet-finished replies are persisted to a small
+state file, so a restart resumes where it stopped instead of skipping.
+Replies can only be matched after a restart because the escalation store
+persists its pending records while the listener runs (persist_to).
+Each handled reply is traced ("telegram_reply") and linked to the trace of
+the request that created the escalation.
 """
+import json
+import os
 import threading
 import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 import httpx
 from config import get_settings
-from tools.escalation_store import find_by_telegram_msg_id, resolve_escalation
+from tools.escalation_store import find_by_telegram_msg_id, get_store, resolve_escalation
+from tools.metrics import get_metrics
+from tools.telegram_outbox import get_outbox
+from tools import tracing
 
 logger = logging.getLogger(__name__)
 
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+LONG_POLL_SECONDS = 10
+MAX_ERROR_BACKOFF = 30.0
+
 PROFESSIONALIZE_PROMPT = """Sen bir kariyer asistanısın. Aday, bir işverenin sorusuna kendi cevabını yazdı.
 Senin görevin bu cevabı profesyonel, nazik ve iş dünyasına uygun bir dille yeniden yazmak.
 
@@ -44,80 +65,161 @@ class TelegramReplyListener:
         self._offset = 0
         self._running = False
         self._thread: threading.Thread | None = None
+        self._client: httpx.Client | None = None
+        self._workers: ThreadPoolExecutor | None = None
+        self._slots = threading.BoundedSemaphore(max(1, self.settings.telegram_reply_queue))
+        self._state_path = _PROJECT_ROOT / self.settings.telegram_state_path
+        self._state_lock = threading.Lock()
+        # update_id -> update; islenmemis reply'lar yeniden baslatmada tekrar islenir
+        self._pending: dict[int, dict] = {}
 
     def start(self):
         if not self._enabled:
             logger.warning("Telegram listener disabled (not configured)")
             return
-        self._flush_old_updates()
+        self._client = httpx.Client(timeout=LONG_POLL_SECONDS + 5.0)
+        self._workers = ThreadPoolExecutor(
+            max_workers=max(1, self.settings.telegram_reply_workers),
+            thread_name_prefix="telegram-reply",
+        )
+        # Yeniden oynatilan reply'lar eslesebilsin diye once bekleyen eskalasyonlar yuklenir
+        get_store().persist_to(_PROJECT_ROOT / self.settings.escalation_state_path)
+        if not self._load_state():
+            # Ilk calistirma: eski birikmis update'leri atla
+            self._flush_old_updates()
+            self._save_state()
+        for update in list(self._pending.values()):
+            self._dispatch(update)
         self._running = True
         self._thread = threading.Thread(target=self._poll_loop, daemon=True)
         self._thread.start()
-        logger.info("Telegram reply listener started")
+        logger.info("Telegram reply listener started (offset=%s, pending=%s)", self._offset, len(self._pending))
 
     def stop(self):
         self._running = False
+        if self._client:
+            # Devam eden long-poll'u keser
+            self._client.close()
         if self._thread:
             self._thread.join(timeout=5)
+        if self._workers:
+            self._workers.shutdown(wait=True, cancel_futures=False)
         logger.info("Telegram reply listener stopped")
 
+    def _load_state(self) -> bool:
+        try:
+            with open(self._state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.warning("Telegram state unreadable, starting fresh: %s", e)
+            return False
+        self._offset = int(state.get("offset", 0))
+        self._pending = {int(u["update_id"]): u for u in state.get("pending", [])}
+        return True
+
+    def _save_state(self):
+        with self._state_lock:
+            state = {"offset": self._offset, "pending": list(self._pending.values())}
+            tmp = self._state_path.with_suffix(".tmp")
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(state, f, ensure_ascii=False)
+                os.replace(tmp, self._state_path)
+            except Exception as e:
+                logger.warning("Telegram state save failed: %s", e)
+
     def _flush_old_updates(self):
         """Skip all old pending updates so we only handle new ones."""
         try:
-            with httpx.Client(timeout=5.0) as client:
-                r = client.get(f"{self._base_url}/getUpdates", params={"offset": -1, "timeout": 0})
-                results = r.json().get("result", [])
-                if results:
-                    self._offset = results[-1]["update_id"] + 1
-                    logger.info("Flushed old updates, offset=%s", self._offset)
+            r = self._client.get(f"{self._base_url}/getUpdates", params={"offset": -1, "timeout": 0})
+            results = r.json().get("result", [])
+            if results:
+                self._offset = results[-1]["update_id"] + 1
+                logger.info("Flushed old updates, offset=%s", self._offset)
         except Exception:
             pass
 
     def _poll_loop(self):
+        errors = 0
         while self._running:
             try:
                 self._poll_once()
+                errors = 0
             except Exception as e:
+                if not self._running:
+                    break
+                errors += 1
                 logger.warning("Telegram poll error: %s", e)
-            time.sleep(2)
+                # Long-poll zaten bekliyor; sadece hata durumunda geri cekil
+                time.sleep(min(2 ** errors, MAX_ERROR_BACKOFF))
 
     def _poll_once(self):
-        try:
-            with httpx.Client(timeout=15.0) as client:
-                r = client.get(
-                    f"{self._base_url}/getUpdates",
-                    params={"offset": self._offset, "timeout": 10},
-                )
-                r.raise_for_status()
-                data = r.json()
-        except Exception as e:
-            logger.warning("getUpdates failed: %s", e)
-            return
+        r = self._client.get(
+            f"{self._base_url}/getUpdates",
+            params={"offset": self._offset, "timeout": LONG_POLL_SECONDS},
+        )
+        r.raise_for_status()
+        data = r.json()
 
-        for update in data.get("result", []):
+        updates = data.get("result", [])
+        if not updates:
+            return
+        for update in updates:
             update_id = update.get("update_id", 0)
-            self._offset = max(self._offset, update_id + 1)
+            if self._is_candidate_reply(update):
+                self._dispatch(update)
+            # Offset ancak update _pending'e girdikten sonra ilerler; worker'larin
+            # ara kayitlari islenmemis bir update'i onaylamis olmaz
+            with self._state_lock:
+                self._offset = max(self._offset, update_id + 1)
+        self._save_state()
+
+    def _is_candidate_reply(self, update: dict) -> bool:
+        msg = update.get("message", {})
+        chat_id = str(msg.get("chat", {}).get("id", ""))
+        return bool(msg.get("reply_to_message")) and chat_id == self._chat_id and bool((msg.get("text") or "").strip())
 
-            msg = update.get("message", {})
-            reply_to = msg.get("reply_to_message")
-            if not reply_to:
-                continue
+    def _dispatch(self, update: dict):
+        """Hand a reply to the worker pool; the caller persists state afterwards."""
+        update_id = int(update.get("update_id", 0))
+        # Kuyruk doluysa poll thread'i bekler (backpressure)
+        self._slots.acquire()
+        with self._state_lock:
+            self._pending[update_id] = update
+        try:
+            future = self._workers.submit(self._process_update, update)
+        except RuntimeError:
+            self._slots.release()
+            return
+        future.add_done_callback(lambda _f: self._finish(update_id))
 
-            reply_to_id = reply_to.get("message_id")
-            human_text = (msg.get("text") or "").strip()
-            chat_id = str(msg.get("chat", {}).get("id", ""))
+    def _finish(self, update_id: int):
+        self._slots.release()
+        with self._state_lock:
+            self._pending.pop(update_id, None)
+        self._save_state()
 
-            if chat_id != self._chat_id or not human_text:
-                continue
+    def _process_update(self, update: dict):
+        msg = update.get("message", {})
+        reply_to_id = msg["reply_to_message"].get("message_id")
+        human_text = (msg.get("text") or "").strip()
 
-            match = find_by_telegram_msg_id(reply_to_id)
-            if not match:
-                continue
+        match = find_by_telegram_msg_id(reply_to_id)
+        if not match:
+            return
 
-            esc_id, esc_data = match
-            employer_message = esc_data["employer_message"]
-            logger.info("Reply received for escalation %s: %s", esc_id, human_text[:80])
-            self._handle_reply(esc_id, msg["message_id"], employer_message, human_text)
+        esc_id, esc_data = match
+        employer_message = esc_data["employer_message"]
+        logger.info("Reply received for escalation %s: %s", esc_id, human_text[:80])
+        origin = esc_data.get("trace_id")
+        try:
+            with tracing.trace("telegram_reply", escalation_id=esc_id, origin_trace_id=origin) as tr:
+                tracing.link(origin, tr.trace_id)
+                self._handle_reply(esc_id, msg["message_id"], employer_message, human_text)
+        except Exception as e:
+            logger.exception("Reply handling failed for %s: %s", esc_id, e)
 
     def _handle_reply(self, esc_id: str, user_msg_id: int, employer_message: str, human_reply: str):
         from llm.gemini_client import generate_gemini
@@ -126,15 +228,20 @@ class TelegramReplyListener:
             employer_message=employer_message,
             human_reply=human_reply,
         )
-        try:
-            professional = generate_gemini(
-                prompt,
-                temperature=0.3,
-                api_key=self.settings.gemini_api_key,
-            )
-        except Exception as e:
-            logger.exception("Professionalize LLM failed: %s", e)
-            professional = ""
+        started = time.perf_counter()
+        with tracing.span("professionalize", reply_chars=len(human_reply)) as span:
+            try:
+                professional = generate_gemini(
+                    prompt,
+                    temperature=0.3,
+                    api_key=self.settings.gemini_api_key,
+                    stage="professionalize",
+                )
+            except Exception as e:
+                logger.exception("Professionalize LLM failed: %s", e)
+                professional = ""
+                span.finish(f"error: {e}"[:300])
+        get_metrics().observe_stage("professionalize", time.perf_counter() - started)
 
         if not professional.strip():
             self._send_message(
@@ -143,7 +250,8 @@ class TelegramReplyListener:
             )
             return
 
-        resolve_escalation(esc_id, professional.strip(), human_reply)
+        with tracing.span("resolve", escalation_id=esc_id, response_chars=len(professional.strip())):
+            resolve_escalation(esc_id, professional.strip(), human_reply)
 
         response_text = (
             f"✅ <b>Profesyonel Yanıt (İşverene gönderildi):</b>\n\n"
@@ -162,8 +270,4 @@ class TelegramReplyListener:
         }
         if reply_to:
             payload["reply_to_message_id"] = reply_to
-        try:
-            with httpx.Client(timeout=10.0) as client:
-                client.post(f"{self._base_url}/sendMessage", json=payload).raise_for_status()
-        except Exception as e:
-            logger.exception("Telegram send failed: %s", e)
+        get_outbox().submit("sendMessage", payload)
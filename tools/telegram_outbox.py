@@ -0,0 +1,164 @@
+"""
+Telegram outbound dispatcher.
+Messages are queued and sent by a single background thread over one
+persistent connection, so a slow Telegram never blocks an HTTP request.
+Each submit() returns a Future resolving to the sent message_id (or None).
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import Optional
+
+import httpx
+
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class TelegramOutbox:
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        max_queue: int = 500,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+        max_backoff: float = 30.0,
+        timeout: float = 10.0,
+    ):
+        self._base_url = base_url
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._max_retries = max_retries
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._timeout = timeout
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="telegram-outbox", daemon=True)
+            self._thread.start()
+
+    def submit(self, method: str, payload: dict) -> "Future[Optional[int]]":
+        """Queue a Bot API call; never blocks. Full queue drops the message."""
+        future: Future = Future()
+        if self._stopping.is_set():
+            future.set_result(None)
+            return future
+        self.start()
+        try:
+            self._queue.put_nowait((method, payload, future))
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("Telegram outbox full, message dropped")
+            future.set_result(None)
+        return future
+
+    def shutdown(self, flush: bool = True, timeout: float = 10.0):
+        """Stop the worker; with flush=True pending messages are sent first."""
+        self._stopping.set()
+        if not flush:
+            self._drain()
+        thread = self._thread
+        if thread is None:
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            self._drain()
+            self._queue.put_nowait(_STOP)
+        thread.join(timeout=timeout)
+        if thread.is_alive():
+            logger.warning("Telegram outbox did not flush within %.1fs", timeout)
+        self._thread = None
+
+    def _drain(self):
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not _STOP:
+                item[2].set_result(None)
+
+    def _run(self):
+        with httpx.Client(timeout=self._timeout) as client:
+            while True:
+                item = self._queue.get()
+                if item is _STOP:
+                    return
+                method, payload, future = item
+                try:
+                    future.set_result(self._deliver(client, method, payload))
+                except Exception as e:
+                    logger.exception("Telegram send failed: %s", e)
+                    self.failed += 1
+                    future.set_result(None)
+
+    def _deliver(self, client: httpx.Client, method: str, payload: dict) -> Optional[int]:
+        url = f"{self._base_url}/{method}"
+        for attempt in range(self._max_retries + 1):
+            delay = min(self._backoff * (2 ** attempt), self._max_backoff)
+            try:
+                r = client.post(url, json=payload)
+            except httpx.TransportError as e:
+                logger.warning("Telegram transport error (attempt %s): %s", attempt + 1, e)
+            else:
+                if r.status_code == 429:
+                    delay = self._retry_after(r, delay)
+                    logger.warning("Telegram rate limited, retry in %.1fs", delay)
+                elif r.status_code >= 500:
+                    logger.warning("Telegram %s (attempt %s)", r.status_code, attempt + 1)
+                else:
+                    r.raise_for_status()
+                    self.sent += 1
+                    return r.json().get("result", {}).get("message_id")
+            if attempt < self._max_retries:
+                time.sleep(delay)
+        self.failed += 1
+        logger.error("Telegram send gave up after %s attempts", self._max_retries + 1)
+        return None
+
+    @staticmethod
+    def _retry_after(r: httpx.Response, default: float) -> float:
+        try:
+            return float(r.json().get("parameters", {}).get("retry_after"))
+        except Exception:
+            pass
+        try:
+            return float(r.headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            return default
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "queued": self._queue.qsize(),
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
+
+
+@lru_cache()
+def get_outbox() -> TelegramOutbox:
+    s = get_settings()
+    token = (s.telegram_bot_token or "").strip()
+    return TelegramOutbox(
+        f"https://api.telegram.org/bot{token}",
+        max_queue=s.telegram_outbox_size,
+        max_retries=s.telegram_max_retries,
+    )
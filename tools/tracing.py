@@ -0,0 +1,256 @@
+"""
+Per-request traces (GET /trace/{id}).
+Every AgentLoop.aprocess call opens a trace whose id is returned to the client
+as request_id. Code on the request path wraps its steps in span(...): start
+and end offsets, prompt/response sizes and outcome are recorded, and spans
+nest through a context variable (asyncio tasks inherit it, so concurrent
+best-of-N drafts keep the right parent). Outside a trace span() is a no-op.
+
+Finished traces go into a bounded in-memory ring buffer and, if
+TRACE_EXPORT_PATH is set, to a size-rotated JSONL file. Telegram delivery
+spans are added from the outbox callback, possibly after the trace finished;
+the reply -> professionalize -> resolve path gets its own trace linked to the
+originating one through the escalation record's trace_id.
+"""
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Iterator
+
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_PROJECT_ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+class Span:
+    __slots__ = ("id", "parent", "name", "start", "end", "outcome", "attrs")
+
+    def __init__(self, span_id: int, parent: int | None, name: str, attrs: dict[str, Any]):
+        self.id = span_id
+        self.parent = parent
+        self.name = name
+        self.start = time.perf_counter()
+        self.end: float | None = None
+        self.outcome = "ok"
+        self.attrs = attrs
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def finish(self, outcome: str | None = None) -> None:
+        if outcome is not None:
+            self.outcome = outcome
+        self.end = time.perf_counter()
+
+
+class _NoopSpan:
+    __slots__ = ()
+    id = None
+
+    def set(self, **attrs: Any) -> None:
+        pass
+
+    def finish(self, outcome: str | None = None) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Trace:
+    def __init__(self, trace_id: str, name: str, attrs: dict[str, Any]):
+        self.trace_id = trace_id
+        self.name = name
+        self.attrs = attrs
+        self.links: list[str] = []
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.end: float | None = None
+        self.outcome = "ok"
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def open_span(self, name: str, parent: int | None, attrs: dict[str, Any]) -> Span:
+        with self._lock:
+            span = Span(len(self.spans), parent, name, attrs)
+            self.spans.append(span)
+        return span
+
+    def to_dict(self) -> dict[str, Any]:
+        def ms(t: float | None) -> float | None:
+            return None if t is None else round((t - self.start) * 1000, 3)
+
+        with self._lock:
+            spans = list(self.spans)
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": ms(self.end),
+            "outcome": self.outcome,
+            "attrs": self.attrs,
+            "links": list(self.links),
+            "spans": [
+                {
+                    "id": s.id,
+                    "parent": s.parent,
+                    "name": s.name,
+                    "start_ms": ms(s.start),
+                    "end_ms": ms(s.end),
+                    "duration_ms": None if s.end is None else round((s.end - s.start) * 1000, 3),
+                    "outcome": s.outcome,
+                    "attrs": s.attrs,
+                }
+                for s in spans
+            ],
+        }
+
+
+_current_trace: ContextVar[Trace | None] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[int | None] = ContextVar("current_span", default=None)
+
+
+def _outcome_of(exc: BaseException) -> str:
+    if type(exc).__name__ == "CancelledError":
+        return "cancelled"
+    return f"error: {type(exc).__name__}: {exc}"[:300]
+
+
+class Tracer:
+    """Ring buffer of recent traces plus the optional rotating JSONL export."""
+
+    def __init__(self, enabled: bool = True, buffer_size: int = 1000, export_path: str = "",
+                 export_max_bytes: int = 10 * 1024 * 1024, export_backups: int = 3):
+        self.enabled = enabled
+        self.buffer_size = buffer_size
+        self._traces: "OrderedDict[str, Trace]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._export: logging.Logger | None = None
+        if enabled and export_path:
+            handler = logging.handlers.RotatingFileHandler(
+                export_path, maxBytes=export_max_bytes, backupCount=export_backups, encoding="utf-8"
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._export = logging.getLogger(f"{__name__}.export")
+            self._export.handlers[:] = [handler]
+            self._export.setLevel(logging.INFO)
+            self._export.propagate = False
+
+    def new_trace(self, name: str, trace_id: str | None = None, **attrs: Any) -> Trace:
+        trace = Trace(trace_id or uuid.uuid4().hex[:16], name, attrs)
+        if self.enabled:
+            with self._lock:
+                self._traces[trace.trace_id] = trace
+                while len(self._traces) > self.buffer_size:
+                    self._traces.popitem(last=False)
+        return trace
+
+    def finish(self, trace: Trace) -> None:
+        trace.end = time.perf_counter()
+        if self._export is not None:
+            try:
+                self._export.info(json.dumps(trace.to_dict(), ensure_ascii=False, default=str))
+            except Exception as e:
+                logger.warning("Trace export failed: %s", e)
+
+    def get(self, trace_id: str) -> Trace | None:
+        with self._lock:
+            return self._traces.get(trace_id)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {"enabled": self.enabled, "buffered": len(self._traces), "buffer_size": self.buffer_size}
+
+
+@lru_cache()
+def get_tracer() -> Tracer:
+    s = get_settings()
+    path = (s.trace_export_path or "").strip()
+    return Tracer(
+        enabled=s.tracing_enabled,
+        buffer_size=s.trace_buffer_size,
+        export_path=os.path.normpath(os.path.join(_PROJECT_ROOT, path)) if path else "",
+        export_max_bytes=s.trace_export_max_bytes,
+        export_backups=s.trace_export_backups,
+    )
+
+
+@contextmanager
+def trace(name: str, trace_id: str | None = None, **attrs: Any) -> Iterator[Trace]:
+    """Open a trace for the current context; it is buffered/exported on exit."""
+    tracer = get_tracer()
+    tr = tracer.new_trace(name, trace_id, **attrs)
+    if not tracer.enabled:
+        yield tr
+        return
+    trace_token = _current_trace.set(tr)
+    span_token = _current_span.set(None)
+    try:
+        yield tr
+    except BaseException as e:
+        tr.outcome = _outcome_of(e)
+        raise
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        tracer.finish(tr)
+
+
+@contextmanager
+def span(name: str, activate: bool = True, **attrs: Any) -> Iterator[Span | _NoopSpan]:
+    """
+    Record one step of the current trace. activate=False keeps it out of the
+    parent chain (use it inside async generators, which may be closed from
+    another context).
+    """
+    tr = _current_trace.get()
+    if tr is None:
+        yield NOOP_SPAN
+        return
+    s = tr.open_span(name, _current_span.get(), attrs)
+    token = _current_span.set(s.id) if activate else None
+    try:
+        yield s
+    except BaseException as e:
+        s.outcome = _outcome_of(e)
+        raise
+    finally:
+        if token is not None:
+            _current_span.reset(token)
+        s.end = time.perf_counter()
+
+
+def current_trace() -> Trace | None:
+    return _current_trace.get()
+
+
+def current_trace_id() -> str | None:
+    tr = _current_trace.get()
+    return tr.trace_id if tr is not None else None
+
+
+def detached_span(name: str, **attrs: Any) -> Span | _NoopSpan:
+    """Span finished later by the caller (e.g. from another thread's callback)."""
+    tr = _current_trace.get()
+    if tr is None:
+        return NOOP_SPAN
+    return tr.open_span(name, _current_span.get(), attrs)
+
+
+def link(trace_id: str | None, linked_id: str) -> None:
+    """Record on a buffered trace that linked_id continues it."""
+    if not trace_id:
+        return
+    tr = get_tracer().get(trace_id)
+    if tr is not None:
+        tr.links.append(linked_id)
@@ -11,6 +11,7 @@ from config import get_settings
 from prompts.career_agent_prompts import UNKNOWN_QUESTION_DETECTOR_PROMPT
 from tools.notification_tool import NotificationTool
 from llm.gemini_client import generate_gemini
+from tools.profile_store import get_profile
 
 logger = logging.getLogger(__name__)
 
@@ -25,18 +26,8 @@ class UnknownQuestionTool:
         self.notification = NotificationTool()
 
     def _get_profile_scope(self) -> str:
-        """Load profile scope from static data (skills, out_of_scope)."""
-        try:
-            import os
-            path = os.path.join(os.path.dirname(__file__), "..", "data", "profile.json")
-            with open(path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            skills = data.get("skills", [])
-            out = data.get("preferences", {}).get("out_of_scope", [])
-            return f"Yetkinlikler: {', '.join(skills)}. Kapsam dışı: {', '.join(out)}"
-        except Exception as e:
-            logger.warning("Profile load failed: %s", e)
-            return "Yazılım geliştirme, backend, API."
+        """Profile scope (skills, out_of_scope) precomputed on the profile snapshot."""
+        return get_profile().profile_scope
 
     def check(self, employer_message: str) -> dict[str, Any]:
         """